@@ -19,6 +19,18 @@ TWENTYMIN_NAME = '20min'
 TAGI_NAME = 'Tagesanzeiger'
 ZEIT_NAME = 'dieZeit'
 
+# fields of an article returned by the search endpoints, only these are read from the database
+SEARCH_COLUMNS = ['uid', 'source', 'publication_date', 'category', 'title', 'abstract', 'url']
+SEARCH_FIELDS = SEARCH_COLUMNS+['score']
+
+db = None
+
+def get_db() -> DBManager:
+    global db
+    if db is None:
+        db = DBManager()
+    return db
+
 @app.route('/is-alive', methods=['GET'])
 def is_alive():
     return "Program is running"
@@ -48,6 +60,19 @@ def create_video_for_specific_match(match_uid):
     # Implement logic here
     pass
 
+@app.route('/search', methods=['GET'])
+def search_articles():
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', 20, type=int)
+    results = get_db().search(query, limit=limit, since=request.args.get('since'), columns=SEARCH_COLUMNS)
+    return jsonify(results[SEARCH_FIELDS].to_dict('records'))
+
+@app.route('/articles/<uid>/related', methods=['GET'])
+def related_articles(uid):
+    limit = request.args.get('limit', 10, type=int)
+    results = get_db().more_like_this(uid, limit=limit, since=request.args.get('since'), columns=SEARCH_COLUMNS)
+    return jsonify(results[SEARCH_FIELDS].to_dict('records'))
+
 @app.route('/video/upload', methods=['POST'])
 def upload_video():
     # Implement logic here
@@ -0,0 +1,95 @@
+"""
+Local HTTP server for recorded scraper pages.
+
+Fixtures are stored as <fixture_dir>/pages/<sha1 of url>.html with an index.json
+mapping every url to its file. A request for /<host>/<path> answers with the page
+recorded for https://<host>/<path>, see httpUtils.set_host_override.
+"""
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from logUtils import info
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_index(fixture_dir:str=FIXTURE_DIR) -> dict:
+    with open(os.path.join(fixture_dir, 'index.json')) as f:
+        return json.load(f)
+
+def record(fixture_dir:str=FIXTURE_DIR, days:int=1):
+    """
+    Exports the newest version of every page archived in the last days as fixtures.
+    """
+    from scrapers.archive import get_archive
+
+    archive = get_archive()
+    since = (datetime.now()-timedelta(days=days)).timestamp()
+    urls = archive.urls(since)
+
+    os.makedirs(os.path.join(fixture_dir, 'pages'), exist_ok=True)
+    index = {}
+    for url in urls:
+        html = archive.load(url)
+        file_name = hashlib.sha1(url.encode('utf-8')).hexdigest()+'.html'
+        with open(os.path.join(fixture_dir, 'pages', file_name), 'w', encoding='utf-8') as f:
+            f.write(html)
+        index[url] = file_name
+
+    with open(os.path.join(fixture_dir, 'index.json'), 'w') as f:
+        json.dump(index, f, indent=1)
+    info(f'Recorded {len(index)} pages to {fixture_dir}')
+    return index
+
+
+class FixtureServer:
+    """
+    Serves the fixtures on 127.0.0.1 in a background thread.
+
+    Args:
+        fixture_dir (str, optional): Directory holding index.json and pages/.
+        port (int, optional): 0 picks a free port.
+    """
+    def __init__(self, fixture_dir:str=FIXTURE_DIR, port:int=0):
+        self.fixture_dir = fixture_dir
+        self.index = load_index(fixture_dir)
+        self.hosts = sorted({url.split('/')[2] for url in self.index})
+        self.served = 0
+        self.missing = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                host_path = self.path.lstrip('/')
+                url = 'https://'+host_path
+                file_name = server.index.get(url) or server.index.get(url.split('?')[0])
+                if file_name is None:
+                    server.missing += 1
+                    self.send_error(404)
+                    return
+                with open(os.path.join(server.fixture_dir, 'pages', file_name), 'rb') as f:
+                    body = f.read()
+                server.served += 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
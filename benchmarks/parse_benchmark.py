@@ -0,0 +1,71 @@
+"""
+Compares the parse time of the scraper parser (lxml + partial parsing) against the old
+full 'html.parser' parse on saved pages.
+
+The pages are expected as:
+    <html_dir>/<source>/category/*.html
+    <html_dir>/<source>/article/*.html
+
+Usage:
+    python -m benchmarks.parse_benchmark <html_dir> [--repeat 5]
+"""
+import os
+import argparse
+from time import perf_counter
+from bs4 import BeautifulSoup
+from scrapers.parsing import parse_html, ARTICLE_PARTS, CATEGORY_PARTS, PARSER
+
+# 20min links are read from the <article> teasers instead of <main>
+CATEGORY_ONLY = {
+    '20min': 'article',
+}
+
+
+def time_parse(pages:list, parse, repeat:int) -> float:
+    # mean ms per page
+    start = perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            parse(html)
+    return (perf_counter()-start)*1000/(repeat*len(pages))
+
+def load_pages(path:str) -> list:
+    if not os.path.isdir(path):
+        return []
+    pages = []
+    for file_name in sorted(os.listdir(path)):
+        if file_name.endswith('.html'):
+            with open(os.path.join(path, file_name), encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+    return pages
+
+def benchmark(html_dir:str, repeat:int=5) -> dict:
+    results = {}
+    for source in sorted(os.listdir(html_dir)):
+        if not os.path.isdir(os.path.join(html_dir, source)):
+            continue
+        results[source] = {}
+        for kind, only in [('category', CATEGORY_ONLY.get(source, CATEGORY_PARTS)), ('article', ARTICLE_PARTS)]:
+            pages = load_pages(os.path.join(html_dir, source, kind))
+            if len(pages) == 0:
+                continue
+            old_ms = time_parse(pages, lambda html: BeautifulSoup(html, 'html.parser'), repeat)
+            new_ms = time_parse(pages, lambda html: parse_html(html, only), repeat)
+            results[source][kind] = {
+                'pages': len(pages),
+                'old_ms': round(old_ms, 2),
+                'new_ms': round(new_ms, 2),
+                'speedup': round(old_ms/new_ms, 2) if new_ms > 0 else None,
+            }
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parse time comparison on saved html')
+    parser.add_argument('html_dir')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'parser backend: {PARSER}')
+    for source, kinds in benchmark(args.html_dir, args.repeat).items():
+        for kind, res in kinds.items():
+            print(f"{source:>15} {kind:>8}: {res['pages']:>4} pages | html.parser {res['old_ms']:>8.2f} ms | new {res['new_ms']:>8.2f} ms | x{res['speedup']}")
@@ -0,0 +1,193 @@
+"""
+Offline scraper benchmark. Runs every scraper against the recorded pages of the fixture
+server and reports pages/sec, parse ms per article and peak RSS per source.
+Only pages the server had recorded count as loaded, requests it answers with 404
+(feeds that were never archived) are reported separately as missing.
+Results are written to benchmarks/results/ as JSON and compared with the previous run.
+
+Usage:
+    python -m benchmarks.scraper_benchmark record [--days 1]
+    python -m benchmarks.scraper_benchmark run [--sources blick zeit] [--compare results/old.json]
+"""
+import os
+import json
+import argparse
+import tempfile
+import threading
+import subprocess
+import importlib
+import statistics
+import multiprocessing as mp
+from time import perf_counter
+from datetime import datetime
+from logUtils import info, warn, green, orange, reset
+from benchmarks.fixture_server import FixtureServer, FIXTURE_DIR, record
+
+try:
+    import resource
+except ImportError:
+    # not available on windows, peak RSS is not reported there
+    resource = None
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+SOURCES = {
+    'blick': ('scrapers.blick_scraper', 'iter_blick'),
+    '20min': ('scrapers.twentymin_scraper', 'iter_20min'),
+    'tagesanzeiger': ('scrapers.taggi_scraper', 'iter_taggi'),
+    'zeit': ('scrapers.zeit_scraper', 'iter_zeit'),
+}
+
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return None
+    # ru_maxrss is in KB on linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024, 1)
+
+def _run_source(name:str, base_url:str, hosts:list, result_queue):
+    import httpUtils
+    from scrapers import http_cache, archive, discovery
+
+    # keep the benchmark away from the real cache, archive and crawl state
+    work_dir = tempfile.mkdtemp(prefix='newsnoise-bench-')
+    http_cache._cache = http_cache.HttpCache(os.path.join(work_dir, 'cache'))
+    archive._archive = archive.PageArchive(os.path.join(work_dir, 'archive'))
+    discovery.STATE_DIR = os.path.join(work_dir, 'state')
+    for host in hosts:
+        httpUtils.set_host_override(host, base_url)
+
+    module_name, iter_name = SOURCES[name]
+    module = importlib.import_module(module_name)
+
+    local = threading.local()
+    # status codes of all requests the fixture server answered
+    statuses = []
+    parse_ms = []
+
+    real_request = httpUtils.request
+    def counted_request(method, url, **kwargs):
+        response = real_request(method, url, **kwargs)
+        statuses.append(response.status_code)
+        return response
+
+    real_fetch = http_cache.fetch
+    def timed_fetch(url, source=None):
+        start = perf_counter()
+        try:
+            return real_fetch(url, source)
+        finally:
+            local.fetch_time = getattr(local, 'fetch_time', 0.0)+perf_counter()-start
+
+    real_scrape = module.scrape_article
+    def timed_scrape(url, category):
+        local.fetch_time = 0.0
+        start = perf_counter()
+        try:
+            return real_scrape(url, category)
+        finally:
+            # everything but the download is parsing and markdown conversion
+            parse_ms.append((perf_counter()-start-local.fetch_time)*1000)
+
+    httpUtils.request = counted_request
+    http_cache.fetch = timed_fetch
+    module.scrape_article = timed_scrape
+
+    start = perf_counter()
+    articles = list(getattr(module, iter_name)(None))
+    seconds = perf_counter()-start
+
+    # a 404 is answered without any work and would inflate the rate of sources without recorded feeds
+    pages = len([status for status in statuses if 200 <= status < 300])
+    result_queue.put((name, {
+        'articles': len(articles),
+        'pages': pages,
+        'missing_pages': len([status for status in statuses if status == 404]),
+        'seconds': round(seconds, 3),
+        'pages_per_sec': round(pages/seconds, 2) if seconds > 0 else None,
+        'parse_ms_mean': round(statistics.mean(parse_ms), 2) if len(parse_ms) > 0 else None,
+        'parse_ms_median': round(statistics.median(parse_ms), 2) if len(parse_ms) > 0 else None,
+        'peak_rss_mb': _peak_rss_mb(),
+    }))
+
+def _version() -> str:
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def run(sources:list, fixture_dir:str=FIXTURE_DIR) -> dict:
+    server = FixtureServer(fixture_dir).start()
+    # a fresh interpreter per source, so peak RSS is not inherited from the others
+    ctx = mp.get_context('spawn')
+    result_queue = ctx.Queue()
+    results = {}
+    try:
+        for name in sources:
+            info(f'Benchmarking {name}')
+            proc = ctx.Process(target=_run_source, args=(name, server.base_url, server.hosts, result_queue))
+            proc.start()
+            proc.join()
+            if proc.exitcode != 0:
+                warn(f'{orange}Benchmark of {name} failed with exit code {proc.exitcode}{reset}')
+                continue
+            key, value = result_queue.get()
+            results[key] = value
+    finally:
+        server.stop()
+
+    return {
+        'version': _version(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'missing_fixtures': server.missing,
+        'sources': results,
+    }
+
+def save(result:dict) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{result['created'].replace(':', '-')}_{result['version']}.json")
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
+    return path
+
+def latest_result(exclude:str=None) -> str:
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    paths = sorted(os.path.join(RESULTS_DIR, name) for name in os.listdir(RESULTS_DIR) if name.endswith('.json'))
+    paths = [path for path in paths if path != exclude]
+    return paths[-1] if len(paths) > 0 else None
+
+def compare(result:dict, previous:dict):
+    for name, stats in result['sources'].items():
+        old = previous['sources'].get(name)
+        line = f"{name:>15}: {stats['pages_per_sec']} pages/s ({stats.get('missing_pages', 0)} missing) | {stats['parse_ms_mean']} ms/article | {stats['peak_rss_mb']} MB"
+        if old is not None:
+            changes = []
+            for key in ('pages_per_sec', 'parse_ms_mean', 'peak_rss_mb'):
+                if stats[key] and old.get(key):
+                    changes.append(f'{key} {(stats[key]-old[key])/old[key]*100:+.1f}%')
+            line += f" | vs {previous['version']}: " + ', '.join(changes)
+        print(line)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Offline scraper benchmark')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    record_parser = subparsers.add_parser('record', help='export archived pages as fixtures')
+    record_parser.add_argument('--days', type=int, default=1)
+    run_parser = subparsers.add_parser('run', help='run the scrapers against the fixtures')
+    run_parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=list(SOURCES))
+    run_parser.add_argument('--compare', default=None, help='result file to compare with (default: previous run)')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(days=args.days)
+    else:
+        result = run(args.sources)
+        path = save(result)
+        info(f'{green}Results saved to {path}{reset}')
+        previous_path = args.compare or latest_result(exclude=path)
+        previous = None
+        if previous_path is not None:
+            with open(previous_path) as f:
+                previous = json.load(f)
+        compare(result, previous or {'sources': {}})
@@ -3,32 +3,137 @@ import pandas as pd
 import json
 from logUtils import green, red, yellow, blue, reset
 import os
+import re
+import threading
+import unicodedata
+import weakref
+from collections import OrderedDict
+from database import migrations, compression
+from database.query import Query
 
+# WAL lets the readers of all processes run next to the single writer
+JOURNAL_MODE = 'WAL'
+# in WAL mode NORMAL only syncs on checkpoints, a crash loses at most the last transactions
+SYNCHRONOUS = 'NORMAL'
+# negative: size in KiB
+CACHE_SIZE = -64000
+MMAP_SIZE = 256*1024*1024
+# how long a connection waits for a lock before 'database is locked' is raised
+BUSY_TIMEOUT = 30
+# prepared statements kept per connection, the query builder produces the same sql for the same query shape
+STATEMENT_CACHE_SIZE = 512
+# records kept by get_by_uid/get_by_uids, matches load the same articles in every stage
+RECORD_CACHE_SIZE = 4096
+# sqlite allows 999 variables per statement in older versions
+MAX_VARIABLES = 900
+# bm25 weights of title, abstract, summary and text
+SEARCH_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+# number of distinctive terms of an article a 'more like this' query is built from
+MORE_LIKE_THIS_TERMS = 15
+WORD = re.compile(r'\w+')
 
 
-class DBManager:
+def search_terms(text:str) -> list:
+    """
+    Splits text into terms the way the FTS tokenizer does (lowercase, accents removed).
+    """
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return WORD.findall(text)
+
+def _match_expression(terms:list, operator:str=' ') -> str:
+    # every term quoted, user input never reaches the FTS query syntax
+    return operator.join('"'+term.replace('"', '""')+'"' for term in terms)
+
+def _connect(path:str) -> sqlite3.Connection:
+    # only used by the thread that opened it, but closed by whichever thread collects its pool
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    conn.execute(f'PRAGMA journal_mode = {JOURNAL_MODE}')
+    conn.execute(f'PRAGMA synchronous = {SYNCHRONOUS}')
+    conn.execute(f'PRAGMA cache_size = {CACHE_SIZE}')
+    conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT*1000}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute('pragma foreign_keys = on')
+    conn.commit()
+    compression.register(conn, path)
+    return conn
+
+def _close_pool(entries:dict, pid:int):
+    if os.getpid() != pid:
+        # inherited over a fork, the parent process still uses them
+        return
+    for conn, _ in entries.values():
+        conn.close()
+    entries.clear()
+
+class _ThreadPool:
+    """
+    The connections of one thread (path -> (connection, cursor)). It is only referenced by a
+    thread local, so it is collected when the thread ends and its connections are closed then,
+    a server starting a thread per request does not pile up open files.
+    """
     def __init__(self):
+        self.pid = os.getpid()
+        self.entries = {}
+        weakref.finalize(self, _close_pool, self.entries, self.pid)
+
+# sqlite connections must not cross a fork or a thread
+_local = threading.local()
+
+def _thread_pool() -> _ThreadPool:
+    pool = getattr(_local, 'pool', None)
+    if pool is None or pool.pid != os.getpid():
+        # connections inherited from the parent process are never touched
+        pool = _local.pool = _ThreadPool()
+    return pool
+
+def get_connection(path:str):
+    """
+    Returns the connection and cursor of the calling process and thread, opens them on first use.
+    """
+    pool = _thread_pool()
+    if path not in pool.entries:
+        conn = _connect(path)
+        pool.entries[path] = (conn, conn.cursor())
+    return pool.entries[path]
+
+def close_connection(path:str):
+    entry = _thread_pool().entries.pop(path, None)
+    if entry is not None:
+        entry[0].close()
+
+
+class DBManager:
+    """
+    Args:
+        db_path (str, optional): Database file, DB_NAME of config.json next to this module by default.
+    """
+    def __init__(self, db_path:str=None):
         path = os.path.dirname(os.path.abspath(__file__))
         conf_path = os.path.join(path, 'config.json')
         db_conf = json.load(open(conf_path))
         self.DB_NAME = db_conf['DB_NAME']
-        self.DB_PATH = os.path.join(path, self.DB_NAME)
+        self.DB_PATH = db_path or os.path.join(path, self.DB_NAME)
         self.TABLES = db_conf['TABLES']
         self.TABLE_FIELDS = db_conf['FIELDS']
+        self.PRIMARY_KEYS = db_conf.get('PRIMARY_KEYS', {})
+        self.INDEXES = db_conf.get('INDEXES', {})
+        self.COMPRESSED = db_conf.get('COMPRESSED', {})
+        self.db_conf = db_conf
 
-        self.conn = sqlite3.connect(self.DB_PATH)
+        self.closed = False
+        self._records = OrderedDict()
+        self._records_lock = threading.Lock()
         if self.conn is None:
             raise Exception(f'{red}Could not connect to database{reset}')
-        
-        self.conn.execute('pragma foreign_keys = on')
-        self.conn.commit()
-        self.c = self.conn.cursor()
 
         self.create_update_tables()
 
         self.PRAGMAS = {}
         self.VALUES = {}
         self.FIELDS_NAMES = {}
+        self.UPSERTS = {}
 
         for table in self.TABLES:
             self.FIELDS_NAMES[table] = [field['name'] for field in self.TABLE_FIELDS[table]]
@@ -43,6 +148,70 @@ class DBManager:
             if None in ordered_pragmas:
                 raise Exception(f'Could not get pragmas for table {table}')
             self.PRAGMAS[table] = ordered_pragmas
+            self.UPSERTS[table] = self.__upsert_statement(table)
+
+    def _cache_get(self, table:str, uid:str) -> dict:
+        with self._records_lock:
+            record = self._records.get((table, uid))
+            if record is None:
+                return None
+            self._records.move_to_end((table, uid))
+            # callers modify the records they get, never hand out the cached one
+            return dict(record)
+
+    def _cache_put(self, table:str, record:dict):
+        with self._records_lock:
+            self._records[(table, record['uid'])] = dict(record)
+            self._records.move_to_end((table, record['uid']))
+            while len(self._records) > RECORD_CACHE_SIZE:
+                self._records.popitem(last=False)
+
+    def _invalidate(self, table:str, uid:str=None):
+        # uid None drops all cached records of the table
+        with self._records_lock:
+            if uid is not None:
+                self._records.pop((table, uid), None)
+                return
+            for key in [key for key in self._records if key[0] == table]:
+                del self._records[key]
+
+    def _encode(self, table:str, article_json:dict, fields:list) -> tuple:
+        compressed = self.COMPRESSED.get(table, [])
+        return tuple([compression.compress(article_json[field], self.DB_PATH) if field in compressed else article_json[field] for field in fields])
+
+    def _decode(self, table:str, columns:list, rows:list) -> list:
+        # only the compressed columns that were selected are touched, projections without them cost nothing
+        positions = [i for i, column in enumerate(columns) if column in self.COMPRESSED.get(table, [])]
+        if len(positions) == 0:
+            return rows
+        decoded = []
+        for row in rows:
+            row = list(row)
+            for i in positions:
+                row[i] = compression.decompress(row[i], self.DB_PATH)
+            decoded.append(row)
+        return decoded
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # one pooled connection per process and thread, so a DBManager survives forks and worker threads
+        if self.closed:
+            return None
+        return get_connection(self.DB_PATH)[0]
+
+    @property
+    def c(self) -> sqlite3.Cursor:
+        return get_connection(self.DB_PATH)[1]
+
+    def __upsert_statement(self, table:str) -> str:
+        # conflicts are resolved on the first unique index (articles: url), else on the primary key
+        unique = [index['columns'] for index in self.INDEXES.get(table, []) if index.get('unique', False)]
+        primary_key = self.PRIMARY_KEYS.get(table)
+        conflict = unique[0] if len(unique) > 0 else [primary_key]
+        # the primary key of a stored row is never changed, matches reference articles by uid
+        updates = [field for field in self.PRAGMAS[table] if field not in conflict and field != primary_key]
+        return (f'INSERT INTO {self.TABLES[table]} ({", ".join(self.PRAGMAS[table])}) VALUES ({self.VALUES[table]}) '
+                f'ON CONFLICT({", ".join(conflict)}) DO UPDATE SET {", ".join(f"{field}=excluded.{field}" for field in updates)}')
 
     def __checkIfConnected(func):
         def wrapper(self,*args, **kwargs):
@@ -62,81 +231,331 @@ class DBManager:
 
     @__checkIfConnected
     def insert(self, article_json:dict, table_name:str):
-        # check if all fields are present
-        for field in self.FIELDS_NAMES[table_name]:
-            if field not in article_json:
-                raise Exception(f'Field {field} not in json')
-        
-        # Insert article into database
-        self.c.execute(f'INSERT INTO {self.TABLES[table_name]} VALUES ({self.VALUES[table_name]})', 
-                       tuple([article_json[field] for field in self.PRAGMAS[table_name]]))
-
-        self.conn.commit()
-        return True
+        return self.insert_many([article_json], table_name) > 0
 
     @__checkIfConnected
-    def insert_many(self, articles_json:list, table_name:str):
-        inserted = 0
+    def insert_many(self, articles_json:list, table_name:str) -> int:
+        """
+        Inserts all rows in one transaction. A row that already exists (same url for articles,
+        same uid for matches) is updated instead, its uid is kept.
+
+        Returns:
+            int: Number of rows inserted or updated.
+        """
+        # check if all fields are present
         for article_json in articles_json:
-            if self.insert(article_json, table_name):
-                print(f'{green}Inserted{reset} {article_json["url"]}')
-                inserted += 1
-            else:
-                print(f'{yellow}Rejected{reset} {article_json["url"]}')
-                pass
-        return inserted
+            for field in self.FIELDS_NAMES[table_name]:
+                if field not in article_json:
+                    raise Exception(f'Field {field} not in json')
+
+        rows = [self._encode(table_name, article_json, self.PRAGMAS[table_name]) for article_json in articles_json]
+        # one transaction, a failing row rolls back the whole batch
+        with self.conn:
+            self.c.executemany(self.UPSERTS[table_name], rows)
+            # rows of this statement only, total_changes would also count what the search index triggers write
+            written = self.c.rowcount
+            if table_name == 'articles':
+                self.__write_tags(articles_json)
+        # an upsert may have changed a stored row under a different uid
+        self._invalidate(table_name)
+        print(f'{green}Inserted{reset} {written} rows into {table_name}')
+        return written
             
+    def __write_tags(self, articles_json:list):
+        # keep article_tags in sync, upserted articles keep the uid they were stored with
+        stored = []
+        for article_json in articles_json:
+            self.c.execute(f'SELECT uid FROM {self.TABLES["articles"]} WHERE url=?', (article_json['url'],))
+            row = self.c.fetchone()
+            if row is not None:
+                stored.append((row[0], article_json['tags']))
+        migrations.write_article_tags(self.conn, stored)
+
+    @__checkIfConnected
+    def get_tag_overlaps(self, publication_date:str, since:str, min_score:float=0.0) -> list:
+        """
+        Pairs of articles sharing at least one tag, one published on publication_date and one
+        published since then, in a single query over the tag index. Includes each article paired with itself.
+
+        Args:
+            min_score (float, optional): Only pairs whose tag Jaccard index is above it.
+
+        Returns:
+            list: (uid, other_uid, shared tags, tags of uid, tags of other_uid)
+        """
+        self.c.execute(f'''
+            WITH counts AS (
+                SELECT t.article_uid, COUNT(*) AS n FROM article_tags t
+                JOIN {self.TABLES["articles"]} r ON r.uid = t.article_uid
+                WHERE r.publication_date >= ? GROUP BY t.article_uid)
+            SELECT a.article_uid, b.article_uid, COUNT(*), ca.n, cb.n
+            FROM {self.TABLES["articles"]} m
+            JOIN article_tags a ON a.article_uid = m.uid
+            JOIN article_tags b ON b.tag_id = a.tag_id
+            JOIN counts ca ON ca.article_uid = a.article_uid
+            JOIN counts cb ON cb.article_uid = b.article_uid
+            WHERE m.publication_date = ?
+            GROUP BY a.article_uid, b.article_uid
+            HAVING COUNT(*)*1.0/(ca.n+cb.n-COUNT(*)) > ?''', (since, publication_date, min_score))
+        return self.c.fetchall()
+
+    def __search(self, match:str, limit:int, since:str=None, exclude_uid:str=None, columns:list=None) -> pd.DataFrame:
+        table = self.TABLES['articles']
+        # only the requested columns are read and decompressed
+        columns = self.__projection('articles', columns)
+        where = [f'{table}_fts MATCH ?']
+        params = [match]
+        if since is not None:
+            where.append('a.publication_date >= ?')
+            params.append(since)
+        if exclude_uid is not None:
+            where.append('a.uid != ?')
+            params.append(exclude_uid)
+        self.c.execute(f'''
+            SELECT {", ".join("a."+column for column in columns)}, -bm25({table}_fts, {", ".join(str(weight) for weight in SEARCH_WEIGHTS)}) AS score
+            FROM {table}_fts JOIN {table} a ON a.rowid = {table}_fts.rowid
+            WHERE {" AND ".join(where)}
+            ORDER BY score DESC LIMIT ?''', params+[limit])
+        return pd.DataFrame(self._decode('articles', columns, self.c.fetchall()), columns=columns+['score'])
+
+    @__checkIfConnected
+    def search(self, query:str, limit:int=20, since:str=None, columns:list=None) -> pd.DataFrame:
+        """
+        Full text search over title, abstract, summary and text, ranked by BM25.
+
+        Args:
+            query (str): Words that all have to appear, a trailing * matches prefixes.
+            limit (int, optional): Maximum number of articles.
+            since (str, optional): Only articles published on or after this date.
+            columns (list, optional): Columns to return, all by default.
+
+        Returns:
+            pd.DataFrame: The articles with a score column, best match first.
+        """
+        expression = []
+        for word in query.split():
+            terms = [_match_expression([term]) for term in search_terms(word)]
+            if len(terms) > 0 and word.endswith('*'):
+                terms[-1] += '*'
+            expression += terms
+        if len(expression) == 0:
+            return pd.DataFrame(columns=self.__projection('articles', columns)+['score'])
+        return self.__search(' '.join(expression), limit, since, columns=columns)
+
+    @__checkIfConnected
+    def more_like_this(self, uid:str, limit:int=10, since:str=None, columns:list=None) -> pd.DataFrame:
+        """
+        Articles covering the same story as the article uid: its rarest terms are searched
+        for with OR, so articles sharing most of them rank first.
+
+        Args:
+            columns (list, optional): Columns to return, all by default.
+
+        Returns:
+            pd.DataFrame: The related articles with a score column, the article itself is excluded.
+        """
+        empty = pd.DataFrame(columns=self.__projection('articles', columns)+['score'])
+        # the terms come from the short columns, text and summary are not decompressed
+        self.c.execute(f'SELECT title, abstract, summary FROM {self.TABLES["articles"]} WHERE uid=?', (uid,))
+        row = self.c.fetchone()
+        if row is None:
+            return empty
+        article = dict(zip(('title', 'abstract', 'summary'), self._decode('articles', ['title', 'abstract', 'summary'], [row])[0]))
+        terms = list(dict.fromkeys(term for column in ('title', 'abstract', 'summary') for term in search_terms(article[column] or '')
+                                   if len(term) > 3 and not term.isdigit()))
+        if len(terms) == 0:
+            return empty
+
+        document_counts = {}
+        table = self.TABLES['articles']
+        for i in range(0, len(terms), MAX_VARIABLES):
+            chunk = terms[i:i+MAX_VARIABLES]
+            self.c.execute(f'SELECT term, doc FROM {table}_fts_vocab WHERE term IN ({", ".join("?"*len(chunk))})', chunk)
+            document_counts.update(self.c.fetchall())
+        # rare terms tell the story apart, common ones only add noise
+        terms = sorted((term for term in terms if term in document_counts), key=lambda term: document_counts[term])
+        return self.__search(_match_expression(terms[:MORE_LIKE_THIS_TERMS], ' OR '), limit, since, exclude_uid=uid, columns=columns)
+
     @__checkIfConnected
     def get_by_uid(self, table_name:str, uid:str) -> dict:
+        article = self._cache_get(table_name, uid)
+        if article is not None:
+            return article
+
         self.c.execute(f'SELECT * FROM {table_name} WHERE uid=?', (uid,))
         article_raw = self.c.fetchone()
 
         if article_raw is None:
             return None
         
+        article_raw = self._decode(table_name, self.PRAGMAS[table_name], [article_raw])[0]
         article = {}
         for i, field in enumerate(self.PRAGMAS[table_name]):
             article[field] = article_raw[i]
+        self._cache_put(table_name, article)
         return article
 
     @__checkIfConnected
-    def get_by_publish_date(self, newspaper_name:str, publication_date:str)->pd.DataFrame:
+    def get_by_uids(self, table_name:str, uids:list) -> list:
+        """
+        Loads many records at once, cached ones are not queried again.
+
+        Args:
+            table_name (str): Table to read from.
+            uids (list): uids of the records.
+
+        Returns:
+            list: The records in the order of uids, None for unknown uids.
+        """
+        records = {}
+        missing = []
+        for uid in dict.fromkeys(uids):
+            record = self._cache_get(table_name, uid)
+            if record is None:
+                missing.append(uid)
+            else:
+                records[uid] = record
+
+        for i in range(0, len(missing), MAX_VARIABLES):
+            chunk = missing[i:i+MAX_VARIABLES]
+            self.c.execute(f'SELECT * FROM {table_name} WHERE uid IN ({", ".join("?"*len(chunk))})', chunk)
+            for article_raw in self._decode(table_name, self.PRAGMAS[table_name], self.c.fetchall()):
+                article = dict(zip(self.PRAGMAS[table_name], article_raw))
+                self._cache_put(table_name, article)
+                records[article['uid']] = article
+
+        # every position gets its own copy, the same article can be in a list twice
+        return [dict(records[uid]) if uid in records else None for uid in uids]
+
+    def __projection(self, table:str, columns:list=None) -> list:
+        if columns is None:
+            return self.PRAGMAS[table]
+        unknown = [column for column in columns if column not in self.PRAGMAS[table]]
+        if len(unknown) > 0:
+            raise Exception(f'Columns {unknown} not in {table}')
+        return list(columns)
+
+    def __chunks(self, cursor:sqlite3.Cursor, table:str, columns:list, chunksize:int):
+        try:
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if len(rows) == 0:
+                    break
+                yield pd.DataFrame(self._decode(table, columns, rows), columns=columns)
+        finally:
+            cursor.close()
+
+    def __select(self, table:str, columns:list=None, WHERE:str=None, params:tuple=(), limit:int=None, chunksize:int=None):
+        """
+        Runs a SELECT over the given columns only. Returns a DataFrame, or with chunksize an iterator
+        of DataFrames with at most chunksize rows each, read lazily from the database.
+        """
+        columns = self.__projection(table, columns)
+        sql = f'SELECT {", ".join(columns)} FROM {table}'
+        if WHERE is not None:
+            sql += f' WHERE {WHERE}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params = tuple(params)+(limit,)
+        return self.__run_select(table, columns, sql, params, chunksize)
+
+    def __run_select(self, table:str, columns:list, sql:str, params, chunksize:int=None):
+        if chunksize is None:
+            self.c.execute(sql, params)
+            return pd.DataFrame(self._decode(table, columns, self.c.fetchall()), columns=columns)
+        # an own cursor, other queries may run while the chunks are consumed
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        return self.__chunks(cursor, table, columns, chunksize)
+
+    @__checkIfConnected
+    def query(self, table:str) -> Query:
+        """
+        Starts a parameterized query on table, see database/query.py.
+        """
+        return Query(self, table)
+
+    @__checkIfConnected
+    def fetch(self, query:Query, chunksize:int=None) -> pd.DataFrame:
+        sql, params = query.to_sql()
+        return self.__run_select(query.table, query.columns or self.PRAGMAS[query.table], sql, params, chunksize)
+
+    @__checkIfConnected
+    def delete(self, query:Query) -> int:
+        where, params = query.where_sql()
+        if where is None:
+            raise Exception(f'Refusing to delete all rows of {query.table}, add a filter')
+        self.c.execute(f'DELETE FROM {self.TABLES[query.table]} WHERE {where}', params)
+        deleted = self.c.rowcount
+        self.__after_delete(query.table)
+        return deleted
+
+    def __after_delete(self, table:str):
+        if table == 'articles':
+            self.c.execute('DELETE FROM article_tags WHERE article_uid NOT IN (SELECT uid FROM articles)')
+        self.conn.commit()
+        self._invalidate(table)
+
+    @__checkIfConnected
+    def get_by_publish_date(self, newspaper_name:str, publication_date:str, columns:list=None, chunksize:int=None)->pd.DataFrame:
+        """
+        Args:
+            newspaper_name (str): Source of the articles, None for all sources.
+            publication_date (str): Articles published on or after this date.
+            columns (list, optional): Only load these columns, all if None.
+            chunksize (int, optional): Return an iterator of DataFrames with this many rows instead.
+        """
         if newspaper_name is not None:
-            self.c.execute(f'SELECT * FROM articles WHERE publication_date >= ? AND source == ?', (publication_date, newspaper_name))
-        else:
-            self.c.execute(f'SELECT * FROM articles WHERE publication_date >= ?', (publication_date,))
-        articles = self.c.fetchall()
-        articles_df = pd.DataFrame(articles, columns=self.PRAGMAS['articles'])
-        return articles_df
+            return self.__select('articles', columns, 'publication_date >= ? AND source == ?', (publication_date, newspaper_name), chunksize=chunksize)
+        return self.__select('articles', columns, 'publication_date >= ?', (publication_date,), chunksize=chunksize)
     
     @__checkIfConnected
-    def get_by_WHERE(self, WHERE:str, table:str)->pd.DataFrame:
-        self.c.execute(f'SELECT * FROM {table} WHERE {WHERE}')
-        articles = self.c.fetchall()
-        articles_df = pd.DataFrame(articles, columns=self.PRAGMAS[table])
-        return articles_df
+    def get_by_WHERE(self, WHERE:str, table:str, columns:list=None, chunksize:int=None)->pd.DataFrame:
+        # WHERE is raw sql, never build it from scraped data, use query(table).where(...).fetch()
+        return self.__select(table, columns, WHERE, chunksize=chunksize)
     
     @__checkIfConnected
-    def get_all(self, table:str, limit:int=None)->pd.DataFrame:
-        if limit is not None:
-            self.c.execute(f'SELECT * FROM {table} LIMIT ?', (limit,))
-        else:
-            self.c.execute(f'SELECT * FROM {table}')
-        articles = self.c.fetchall()
-        articles_df = pd.DataFrame(articles, columns=self.PRAGMAS[table])
-        return articles_df
+    def get_all(self, table:str, limit:int=None, columns:list=None, chunksize:int=None)->pd.DataFrame:
+        return self.__select(table, columns, limit=limit, chunksize=chunksize)
     
     @__checkIfConnected
     def check_if_article_exists(self, url:str):
-        self.c.execute(f'SELECT * FROM articles WHERE url=?', (url,))
+        self.c.execute(f'SELECT 1 FROM articles WHERE url=? LIMIT 1', (url,))
         if self.c.fetchone() is not None:
             return True
         return False
 
+    @__checkIfConnected
+    def get_known_urls(self) -> set:
+        """
+        Returns the urls of all stored articles, the scrapers load it once and test links against it in memory.
+        """
+        self.c.execute('SELECT url FROM articles')
+        return {row[0] for row in self.c.fetchall()}
+
     @__checkIfConnected
     def create_update_tables(self):
+        """
+        Creates missing tables, migrates existing files to the current schema version and
+        brings the indexes in line with config.json.
+        """
+        for table in self.TABLES:
+            self.c.execute(migrations.table_definition(self.TABLES[table], self.TABLE_FIELDS[table], self.PRIMARY_KEYS.get(table)))
+        self.conn.commit()
+
+        migrations.migrate(self.conn, self.db_conf)
+
+        declared = set()
         for table in self.TABLES:
-            self.c.execute(f'CREATE TABLE IF NOT EXISTS {self.TABLES[table]} ({", ".join([field["name"]+" "+field["type"] for field in self.TABLE_FIELDS[table]])})')
+            for index in self.INDEXES.get(table, []):
+                self.c.execute(migrations.index_definition(self.TABLES[table], index))
+                declared.add(index['name'])
+        # drop indexes that were removed from config.json, the tag tables manage their own
+        self.c.execute(f"SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx\\_%' ESCAPE '\\' "
+                       f"AND tbl_name IN ({', '.join('?'*len(self.TABLES))})", list(self.TABLES.values()))
+        for (name,) in self.c.fetchall():
+            if name not in declared:
+                self.c.execute(f'DROP INDEX {name}')
         self.conn.commit()
 
     def get_all_tables(self):
@@ -149,7 +568,7 @@ class DBManager:
         all_data = []
         for table in self.TABLES:
             self.c.execute(f'SELECT * FROM {self.TABLES[table]}')
-            all_data += self.c.fetchall()
+            all_data += self._decode(table, self.PRAGMAS[table], self.c.fetchall())
 
         articles_df = pd.DataFrame(all_data, columns=self.PRAGMAS[table])
         return articles_df
@@ -158,13 +577,17 @@ class DBManager:
     def update(self, table:str, article_json:dict):
         uid = article_json['uid']
         set_str = ','.join([str(x)+'=?' for x in self.FIELDS_NAMES[table]])
-        self.c.execute(f'UPDATE {table} SET {set_str} WHERE uid=?', tuple([article_json[field] for field in self.FIELDS_NAMES[table]]+[uid]))
+        self.c.execute(f'UPDATE {table} SET {set_str} WHERE uid=?', self._encode(table, article_json, self.FIELDS_NAMES[table])+(uid,))
+        if table == 'articles':
+            migrations.write_article_tags(self.conn, [(uid, article_json['tags'])])
         self.conn.commit()
+        self._invalidate(table, uid)
 
     @__checkIfConnected
     def delete_by_WHERE(self, table:str, WHERE:str):
+        # WHERE is raw sql, never build it from scraped data, use query(table).where(...).delete()
         self.c.execute(f'DELETE FROM {table} WHERE {WHERE}')
-        self.conn.commit()
+        self.__after_delete(table)
 
     def update_by_fieldname(self, newspaper_name:str, article_json:dict, fieldname:str):
         if fieldname not in self.FIELDS_NAMES:
@@ -174,11 +597,29 @@ class DBManager:
         set_str = ','.join([str(x)+'=?' for x in self.FIELDS_NAMES])
         self.c.execute(f'UPDATE {self.TABLES[newspaper_name]} SET {set_str} WHERE {fieldname}=?', tuple([article_json[field] for field in self.FIELDS_NAMES]+[index]))
         self.conn.commit()
+        self._invalidate(self.TABLES[newspaper_name])
 
     def remove_by_uid(self, table:str, uid:str):
         self.c.execute(f'DELETE FROM {table} WHERE uid=?', (uid,))
+        if table == 'articles':
+            self.c.execute('DELETE FROM article_tags WHERE article_uid=?', (uid,))
         self.conn.commit()
+        self._invalidate(table, uid)
+
+    @__checkIfConnected
+    def train_compression_dictionary(self, nr_samples:int=2000) -> int:
+        """
+        Trains a zstd dictionary on the newest article texts, new values are compressed with it.
+        Values compressed before keep working, every frame names its dictionary.
+        """
+        self.c.execute(f'SELECT text, summary FROM {self.TABLES["articles"]} ORDER BY publication_date DESC LIMIT ?', (nr_samples,))
+        rows = self._decode('articles', ['text', 'summary'], self.c.fetchall())
+        samples = [value for row in rows for value in row if isinstance(value, str)]
+        dict_id = compression.train(self.conn, self.DB_PATH, samples)
+        print(f'{green}Trained{reset} compression dictionary {dict_id} on {len(rows)} articles')
+        return dict_id
 
     @__checkIfConnected
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        close_connection(self.DB_PATH)
+        self.closed = True
\ No newline at end of file
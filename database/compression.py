@@ -0,0 +1,96 @@
+"""
+zstd compression of the large text columns (article bodies, summaries, GPT input and scripts).
+
+Compressed values are stored as BLOBs starting with MAGIC, everything else (short texts,
+rows written before compression was introduced) stays plain TEXT and is returned as is.
+Dictionaries trained on our own articles live in the compression_dictionaries table of the
+database, every frame names the dictionary it was compressed with.
+"""
+import sqlite3
+import threading
+import zstandard as zstd
+
+MAGIC = b'zs1:'
+# shorter values are not worth a frame header
+MIN_SIZE = 256
+LEVEL = 6
+DICTIONARY_SIZE = 112*1024
+
+# (db path, dict id) -> dictionary, dict id 0 is no dictionary
+_dictionaries = {}
+# db path -> dict id new values are compressed with
+_current = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def create_table(conn:sqlite3.Connection):
+    conn.execute('CREATE TABLE IF NOT EXISTS compression_dictionaries (dict_id integer PRIMARY KEY, created text, data blob)')
+
+def load_dictionaries(path:str):
+    """
+    (Re)loads the dictionaries of the database at path, the newest one is used for new values.
+    """
+    # an own connection, this also runs inside sqlite functions of other connections
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        rows = conn.execute('SELECT dict_id, data FROM compression_dictionaries ORDER BY created').fetchall()
+    except sqlite3.OperationalError:
+        # database from before the compression migration
+        rows = []
+    finally:
+        conn.close()
+    with _lock:
+        _current[path] = 0
+        for dict_id, data in rows:
+            _dictionaries[(path, dict_id)] = zstd.ZstdCompressionDict(data)
+            _current[path] = dict_id
+
+def _dictionary(path:str, dict_id:int) -> zstd.ZstdCompressionDict:
+    if dict_id == 0:
+        return None
+    if (path, dict_id) not in _dictionaries:
+        # trained by another process after this one loaded them
+        load_dictionaries(path)
+    return _dictionaries[(path, dict_id)]
+
+def _compressor(path:str) -> zstd.ZstdCompressor:
+    if path not in _current:
+        load_dictionaries(path)
+    dict_id = _current[path]
+    # compressors are not thread safe and expensive to create with a dictionary, one per thread
+    compressors = _local.__dict__.setdefault('compressors', {})
+    if (path, dict_id) not in compressors:
+        compressors[(path, dict_id)] = zstd.ZstdCompressor(level=LEVEL, dict_data=_dictionary(path, dict_id))
+    return compressors[(path, dict_id)]
+
+def compress(value, path:str):
+    if not isinstance(value, str) or len(value) < MIN_SIZE:
+        return value
+    return MAGIC+_compressor(path).compress(value.encode('utf-8'))
+
+def decompress(value, path:str):
+    if not isinstance(value, bytes) or not value.startswith(MAGIC):
+        return value
+    frame = value[len(MAGIC):]
+    dict_id = zstd.get_frame_parameters(frame).dict_id
+    decompressor = zstd.ZstdDecompressor(dict_data=_dictionary(path, dict_id))
+    return decompressor.decompress(frame).decode('utf-8')
+
+def register(conn:sqlite3.Connection, path:str):
+    """
+    Makes zstd_text(value) available in SQL, the full text index reads the columns through it.
+    """
+    conn.create_function('zstd_text', 1, lambda value: decompress(value, path), deterministic=True)
+
+def train(conn:sqlite3.Connection, path:str, samples:list, size:int=DICTIONARY_SIZE) -> int:
+    """
+    Trains a dictionary on samples (texts) and stores it, new values are compressed with it.
+    Returns the dict id.
+    """
+    dictionary = zstd.train_dictionary(size, [sample.encode('utf-8') for sample in samples if sample])
+    conn.execute("INSERT OR REPLACE INTO compression_dictionaries VALUES (?, datetime('now'), ?)",
+                 (dictionary.dict_id(), dictionary.as_bytes()))
+    conn.commit()
+    load_dictionaries(path)
+    return dictionary.dict_id()
@@ -0,0 +1,194 @@
+"""
+Versioned migrations of existing database files.
+
+The schema version is kept in PRAGMA user_version, every migration runs once in its own
+transaction and bumps it. New migrations are appended to MIGRATIONS, never reordered.
+Tables, primary keys and indexes themselves are declared in config.json.
+"""
+import sqlite3
+from logUtils import info, blue, reset
+from database import compression
+
+
+def table_definition(table:str, fields:list, primary_key:str=None) -> str:
+    columns = [field['name']+' '+field['type']+(' PRIMARY KEY' if field['name'] == primary_key else '') for field in fields]
+    return f'CREATE TABLE IF NOT EXISTS {table} ({", ".join(columns)})'
+
+def index_definition(table:str, index:dict) -> str:
+    unique = 'UNIQUE ' if index.get('unique', False) else ''
+    return f'CREATE {unique}INDEX IF NOT EXISTS {index["name"]} ON {table} ({", ".join(index["columns"])})'
+
+def _primary_key(conn:sqlite3.Connection, table:str) -> str:
+    for row in conn.execute(f'PRAGMA table_info({table})'):
+        # row: cid, name, type, notnull, default, pk
+        if row[5] > 0:
+            return row[1]
+    return None
+
+def add_primary_keys(conn:sqlite3.Connection, conf:dict):
+    """
+    Rebuilds tables created before config.json declared primary keys, sqlite cannot add them in place.
+    Rows with a duplicate key are dropped, the first inserted one is kept.
+    """
+    for key, table in conf['TABLES'].items():
+        primary_key = conf.get('PRIMARY_KEYS', {}).get(key)
+        if primary_key is None or _primary_key(conn, table) == primary_key:
+            continue
+        columns = ', '.join(field['name'] for field in conf['FIELDS'][key])
+        conn.execute(table_definition(f'{table}_new', conf['FIELDS'][key], primary_key))
+        conn.execute(f'INSERT OR IGNORE INTO {table}_new ({columns}) SELECT {columns} FROM {table} ORDER BY rowid')
+        conn.execute(f'DROP TABLE {table}')
+        conn.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+
+def dedup_unique_columns(conn:sqlite3.Connection, conf:dict):
+    """
+    Removes rows that would break the unique indexes of config.json (the same article url scraped twice).
+    """
+    for key, table in conf['TABLES'].items():
+        for index in conf.get('INDEXES', {}).get(key, []):
+            if not index.get('unique', False):
+                continue
+            columns = ', '.join(index['columns'])
+            conn.execute(f'DELETE FROM {table} WHERE rowid NOT IN (SELECT MIN(rowid) FROM {table} GROUP BY {columns})')
+
+def split_tags(tags:str) -> list:
+    """
+    Splits a ';' joined tag string into normalized (lowercase, stripped, unique) tags.
+    """
+    if tags is None:
+        return []
+    return list(dict.fromkeys(tag.strip().lower() for tag in str(tags).split(';') if tag.strip() != ''))
+
+def write_article_tags(conn:sqlite3.Connection, articles:list):
+    """
+    Replaces the rows of article_tags for every (uid, tags) in articles, new tags are added to the vocabulary.
+    """
+    for uid, tags in articles:
+        names = split_tags(tags)
+        conn.execute('DELETE FROM article_tags WHERE article_uid=?', (uid,))
+        if len(names) == 0:
+            continue
+        conn.executemany('INSERT OR IGNORE INTO tags (name) VALUES (?)', [(name,) for name in names])
+        conn.execute(f'INSERT OR IGNORE INTO article_tags (article_uid, tag_id) SELECT ?, id FROM tags WHERE name IN ({", ".join("?"*len(names))})',
+                     [uid]+names)
+
+def create_tag_index(conn:sqlite3.Connection, conf:dict):
+    """
+    Interned tag vocabulary and the article <-> tag relation with indexes in both directions,
+    filled from the ';' joined articles.tags column.
+    """
+    conn.execute('CREATE TABLE IF NOT EXISTS tags (id INTEGER PRIMARY KEY, name text UNIQUE NOT NULL)')
+    conn.execute('''CREATE TABLE IF NOT EXISTS article_tags (
+        article_uid text NOT NULL, tag_id integer NOT NULL, PRIMARY KEY (article_uid, tag_id)) WITHOUT ROWID''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_article_tags_tag ON article_tags (tag_id, article_uid)')
+    write_article_tags(conn, conn.execute(f'SELECT uid, tags FROM {conf["TABLES"]["articles"]}').fetchall())
+
+# columns of articles covered by the full text index
+SEARCH_COLUMNS = ['title', 'abstract', 'summary', 'text']
+
+def create_search_index(conn:sqlite3.Connection, conf:dict):
+    """
+    FTS5 index over the text columns of articles. It is an external content table, the text
+    is only stored once in articles, triggers keep the index in sync with every write.
+    """
+    table = conf['TABLES']['articles']
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_columns = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+    old_columns = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+    conn.execute(f'''CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5({columns},
+        content='{table}', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')''')
+    # term -> number of articles containing it, used to pick the distinctive terms of an article
+    conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts_vocab USING fts5vocab({table}_fts, 'row')")
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO {table}_fts (rowid, {columns}) VALUES (new.rowid, {new_columns});
+    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_columns});
+    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_columns});
+        INSERT INTO {table}_fts (rowid, {columns}) VALUES (new.rowid, {new_columns});
+    END''')
+    conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+def compress_text_columns(conn:sqlite3.Connection, conf:dict):
+    """
+    Compresses the COMPRESSED columns of config.json in place. The search index is rebuilt on
+    a view that decompresses them, its triggers read the columns through zstd_text as well.
+    """
+    path = conn.execute('PRAGMA database_list').fetchone()[2]
+    compression.create_table(conn)
+    compressed = conf.get('COMPRESSED', {})
+
+    table = conf['TABLES']['articles']
+    for trigger in ('insert', 'delete', 'update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{trigger}')
+    conn.execute(f'DROP TABLE IF EXISTS {table}_fts_vocab')
+    conn.execute(f'DROP TABLE IF EXISTS {table}_fts')
+
+    for key, columns in compressed.items():
+        rows = conn.execute(f'SELECT rowid, {", ".join(columns)} FROM {conf["TABLES"][key]}').fetchall()
+        conn.executemany(f'UPDATE {conf["TABLES"][key]} SET {", ".join(f"{column}=?" for column in columns)} WHERE rowid=?',
+                         [tuple(compression.compress(value, path) for value in row[1:])+(row[0],) for row in rows])
+
+    def read(prefix:str, column:str) -> str:
+        return f'zstd_text({prefix}{column})' if column in compressed.get('articles', []) else f'{prefix}{column}'
+
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_columns = ', '.join(read('new.', column) for column in SEARCH_COLUMNS)
+    old_columns = ', '.join(read('old.', column) for column in SEARCH_COLUMNS)
+    # 'rebuild' and the auxiliary functions read the content table, it has to hand out plain text
+    conn.execute(f'''CREATE VIEW IF NOT EXISTS {table}_search AS
+        SELECT rowid AS article_rowid, {", ".join(read("", column)+" AS "+column for column in SEARCH_COLUMNS)} FROM {table}''')
+    conn.execute(f'''CREATE VIRTUAL TABLE {table}_fts USING fts5({columns},
+        content='{table}_search', content_rowid='article_rowid', tokenize='unicode61 remove_diacritics 2')''')
+    conn.execute(f"CREATE VIRTUAL TABLE {table}_fts_vocab USING fts5vocab({table}_fts, 'row')")
+    conn.execute(f'''CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO {table}_fts (rowid, {columns}) VALUES (new.rowid, {new_columns});
+    END''')
+    conn.execute(f'''CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_columns});
+    END''')
+    conn.execute(f'''CREATE TRIGGER {table}_fts_update AFTER UPDATE ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_columns});
+        INSERT INTO {table}_fts (rowid, {columns}) VALUES (new.rowid, {new_columns});
+    END''')
+    conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+MIGRATIONS = [
+    add_primary_keys,
+    dedup_unique_columns,
+    create_tag_index,
+    create_search_index,
+    compress_text_columns,
+]
+
+
+def get_version(conn:sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn:sqlite3.Connection, conf:dict) -> int:
+    """
+    Applies all migrations newer than the version of the database file. Returns the new version.
+    Safe when several processes open an old file at the same time, every step runs once.
+    """
+    if get_version(conn) >= len(MIGRATIONS):
+        return get_version(conn)
+    while True:
+        conn.commit()
+        # takes the write lock before the version is read, another process migrating the same
+        # file is waited for and its steps are not repeated
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = get_version(conn)
+            if version >= len(MIGRATIONS):
+                conn.rollback()
+                return version
+            migration = MIGRATIONS[version]
+            info(f'{blue}Migrating database{reset} to version {version+1}: {migration.__name__}')
+            migration(conn, conf)
+            conn.execute(f'PRAGMA user_version = {version+1}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
@@ -0,0 +1,127 @@
+"""
+Small query builder for DBManager. Column names are checked against config.json and values
+are always bound as parameters, so the same query shape always produces the same SQL text
+and sqlite reuses the prepared statement.
+
+Usage:
+    db.query('matches').where('date', '=', today_date).order_by('uid').fetch()
+    db.query('articles').select('uid', 'tags').where('publication_date', '>=', since).fetch(chunksize=1000)
+"""
+
+OPERATORS = {
+    '=': '=',
+    '!=': '!=',
+    '<': '<',
+    '<=': '<=',
+    '>': '>',
+    '>=': '>=',
+    'like': 'LIKE',
+    'in': 'IN',
+    'not in': 'NOT IN',
+    'is null': 'IS NULL',
+    'is not null': 'IS NOT NULL',
+}
+# operators without a value
+UNARY = ('is null', 'is not null')
+VALUE_TYPES = (str, int, float, bytes)
+
+
+class Query:
+    """
+    Parameterized SELECT or DELETE over one table, filters are combined with AND.
+
+    Args:
+        db (DBManager): Database the query runs on.
+        table (str): Table name as in config.json.
+    """
+    def __init__(self, db, table:str):
+        if table not in db.TABLES:
+            raise Exception(f'Table {table} not in {list(db.TABLES)}')
+        self.db = db
+        self.table = table
+        self.columns = None
+        self.filters = []
+        self.ordering = []
+        self.max_rows = None
+
+    def _check_column(self, column:str) -> str:
+        if column not in self.db.PRAGMAS[self.table]:
+            raise Exception(f'Column {column} not in {self.table}')
+        return column
+
+    def _check_value(self, value):
+        if value is not None and not isinstance(value, VALUE_TYPES):
+            raise TypeError(f'Cannot bind {type(value).__name__} in a query on {self.table}')
+        return value
+
+    def select(self, *columns:str) -> 'Query':
+        self.columns = [self._check_column(column) for column in columns]
+        return self
+
+    def where(self, column:str, operator:str, value=None) -> 'Query':
+        operator = operator.lower()
+        if operator not in OPERATORS:
+            raise Exception(f'Operator {operator} not in {list(OPERATORS)}')
+        if operator in ('in', 'not in'):
+            value = [self._check_value(item) for item in value]
+        elif operator not in UNARY:
+            value = self._check_value(value)
+        self.filters.append((self._check_column(column), operator, value))
+        return self
+
+    def order_by(self, column:str, descending:bool=False) -> 'Query':
+        self.ordering.append((self._check_column(column), descending))
+        return self
+
+    def limit(self, max_rows:int) -> 'Query':
+        self.max_rows = int(max_rows)
+        return self
+
+    def where_sql(self):
+        """
+        Returns the WHERE clause (without the keyword, None if there are no filters) and its parameters.
+        """
+        clauses = []
+        params = []
+        for column, operator, value in self.filters:
+            if operator in UNARY:
+                clauses.append(f'{column} {OPERATORS[operator]}')
+            elif operator in ('in', 'not in'):
+                if len(value) == 0:
+                    # IN () is no valid sql
+                    clauses.append('0' if operator == 'in' else '1')
+                    continue
+                clauses.append(f'{column} {OPERATORS[operator]} ({", ".join("?"*len(value))})')
+                params += value
+            else:
+                clauses.append(f'{column} {OPERATORS[operator]} ?')
+                params.append(value)
+        return (' AND '.join(clauses) if len(clauses) > 0 else None), params
+
+    def to_sql(self):
+        """
+        Returns the SELECT statement and its parameters.
+        """
+        columns = self.columns or self.db.PRAGMAS[self.table]
+        sql = f'SELECT {", ".join(columns)} FROM {self.db.TABLES[self.table]}'
+        where, params = self.where_sql()
+        if where is not None:
+            sql += f' WHERE {where}'
+        if len(self.ordering) > 0:
+            sql += ' ORDER BY ' + ', '.join(f'{column} {"DESC" if descending else "ASC"}' for column, descending in self.ordering)
+        if self.max_rows is not None:
+            sql += ' LIMIT ?'
+            params.append(self.max_rows)
+        return sql, params
+
+    def fetch(self, chunksize:int=None):
+        """
+        Runs the query, returns a DataFrame or with chunksize an iterator of DataFrames.
+        """
+        return self.db.fetch(self, chunksize)
+
+    def delete(self) -> int:
+        """
+        Deletes the matching rows, returns their number.
+        """
+        return self.db.delete(self)
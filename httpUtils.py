@@ -0,0 +1,135 @@
+import os
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from logUtils import info, blue, reset
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+# timeout for the LLM calls, answers of gpt-4 can take a while
+LLM_TIMEOUT = (CONNECT_TIMEOUT, 180)
+
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# number of hosts a keep-alive pool is held for
+POOL_CONNECTIONS = 32
+# number of keep-alive connections per host
+POOL_MAXSIZE = 16
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+# host -> base url, requests to host are sent to base_url/host/path instead (used by the benchmarks)
+HOST_OVERRIDES = {}
+
+
+def _new_stats() -> dict:
+    return {
+        'requests': 0,
+        'errors': 0,
+        'bytes': 0,
+        'latency': 0.0,
+        'max_latency': 0.0,
+    }
+
+def _count(url:str, nr_bytes:int=0, latency:float=0.0, failed:bool=False):
+    host = urlsplit(url).netloc.lower()
+    with _stats_lock:
+        if host not in _stats:
+            _stats[host] = _new_stats()
+        stats = _stats[host]
+        if failed:
+            stats['errors'] += 1
+            return
+        stats['requests'] += 1
+        stats['bytes'] += nr_bytes
+        stats['latency'] += latency
+        stats['max_latency'] = max(stats['max_latency'], latency)
+
+def _count_response(response, *args, **kwargs):
+    # streamed bodies are not read here, fall back to the announced length
+    if kwargs.get('stream'):
+        nr_bytes = int(response.headers.get('Content-Length', 0))
+    else:
+        nr_bytes = len(response.content)
+    _count(response.url, nr_bytes, response.elapsed.total_seconds())
+    return response
+
+def new_session() -> requests.Session:
+    """
+    Returns a new session with the retries, the keep-alive pool and the stats of the shared one.
+    For clients that close the sessions they are handed, like openai.
+    """
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.hooks['response'].append(_count_response)
+    return session
+
+def get_session() -> requests.Session:
+    """
+    Returns the keep-alive session of this process. A new one is created after a fork,
+    so scraper subprocesses never share sockets with the parent.
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = new_session()
+            _session_pid = os.getpid()
+        return _session
+
+def set_host_override(host:str, base_url:str):
+    HOST_OVERRIDES[host.lower()] = base_url.rstrip('/')
+
+def clear_host_overrides():
+    HOST_OVERRIDES.clear()
+
+def _override(url:str) -> str:
+    parts = urlsplit(url)
+    base_url = HOST_OVERRIDES.get(parts.netloc.lower())
+    if base_url is None:
+        return url
+    return f'{base_url}/{parts.netloc.lower()}{parts.path or "/"}' + (f'?{parts.query}' if parts.query else '')
+
+def request(method:str, url:str, **kwargs) -> requests.Response:
+    kwargs.setdefault('timeout', (CONNECT_TIMEOUT, READ_TIMEOUT))
+    if len(HOST_OVERRIDES) > 0:
+        url = _override(url)
+    try:
+        return get_session().request(method, url, **kwargs)
+    except requests.RequestException:
+        _count(url, failed=True)
+        raise
+
+def get(url:str, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
+
+def head(url:str, **kwargs) -> requests.Response:
+    kwargs.setdefault('allow_redirects', True)
+    return request('HEAD', url, **kwargs)
+
+def get_stats() -> dict:
+    with _stats_lock:
+        return {host: dict(stats) for host, stats in _stats.items()}
+
+def log_stats():
+    for host, stats in sorted(get_stats().items()):
+        avg_latency = stats['latency']/stats['requests'] if stats['requests'] > 0 else 0.0
+        info(f"{blue}{host}{reset}: {stats['requests']} requests, {stats['errors']} errors, "
+             f"{stats['bytes']/1e6:.1f} MB, avg {avg_latency*1000:.0f} ms, max {stats['max_latency']*1000:.0f} ms")
@@ -0,0 +1,375 @@
+import os
+import re
+import hashlib
+from io import BytesIO
+import sqlite3
+import threading
+from time import time
+import requests
+from PIL import Image
+import httpUtils
+from scrapers.fetch_engine import FetchEngine
+from database.DB_manager import get_connection
+from logUtils import info, warn, blue, reset
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+# valid images are rarely taken down, failed ones are tried again sooner
+VALID_MAX_AGE = 30*24*60*60
+INVALID_MAX_AGE = 24*60*60
+# image hosts are mostly CDNs, they can take more parallel requests than the news sites
+MAX_CONCURRENCY = 32
+MAX_HOST_CONCURRENCY = 8
+# servers that do not answer HEAD properly
+HEAD_FALLBACK_STATUS = (403, 405, 501)
+
+CONTENT_RANGE = re.compile(r'bytes \d+-\d+/(\d+)')
+
+IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, 'images')
+# total size of all originals and variants
+IMAGE_CACHE_MAX_SIZE = 2*1024*1024*1024
+# name -> size of the pre-resized variants, 1080p for the videos, thumb for the thumbnails
+VARIANTS = {
+    '1080p': (1920, 1080),
+    'thumb': (1280, 720),
+}
+# images whose dHashes differ in at most this many of 64 bits are treated as the same photo
+DHASH_MAX_DISTANCE = 6
+
+
+class ImageValidationCache:
+    """
+    Persistent url -> (valid, content type, size) cache for image urls.
+
+    Args:
+        path (str, optional): Directory the sqlite file is stored in.
+    """
+    def __init__(self, path:str=CACHE_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        conn = self._connection()
+        conn.execute('''CREATE TABLE IF NOT EXISTS image_checks (
+            url text PRIMARY KEY, valid integer, content_type text, size integer, checked real)''')
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # pooled per process and thread like the connections of the article database
+        return get_connection(os.path.join(self.path, 'images.db'))[0]
+
+    def get_many(self, urls:list) -> dict:
+        """
+        Returns the cached, not yet expired results of urls by url.
+        """
+        now = time()
+        results = {}
+        urls = list(urls)
+        with self._lock:
+            conn = self._connection()
+            # stay below the sqlite variable limit
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i+500]
+                rows = conn.execute(
+                    f'SELECT url, valid, content_type, size, checked FROM image_checks WHERE url IN ({",".join("?"*len(chunk))})',
+                    chunk).fetchall()
+                for url, valid, content_type, size, checked in rows:
+                    max_age = VALID_MAX_AGE if valid else INVALID_MAX_AGE
+                    if now-checked <= max_age:
+                        results[url] = {'url': url, 'valid': bool(valid), 'content_type': content_type, 'size': size}
+        return results
+
+    def put_many(self, results:list):
+        now = time()
+        with self._lock:
+            conn = self._connection()
+            conn.executemany('INSERT OR REPLACE INTO image_checks VALUES (?, ?, ?, ?, ?)',
+                             [(r['url'], int(r['valid']), r['content_type'], r['size'], now) for r in results])
+            conn.commit()
+
+
+def _size(response:requests.Response) -> int:
+    content_range = CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+    if content_range is not None:
+        return int(content_range.group(1))
+    length = response.headers.get('Content-Length')
+    return int(length) if length is not None and length.isdigit() else None
+
+def check_image(url:str) -> dict:
+    """
+    Checks if url points to an image without downloading it. Uses HEAD and falls back
+    to a GET of the first byte for servers that do not support HEAD.
+    Returns {'url', 'valid', 'content_type', 'size'}, None if the server could not be reached.
+    """
+    try:
+        response = httpUtils.head(url)
+        if response.status_code in HEAD_FALLBACK_STATUS or 'Content-Type' not in response.headers:
+            response = httpUtils.get(url, headers={'Range': 'bytes=0-0'}, stream=True)
+            response.close()
+    except requests.RequestException:
+        return None
+
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    return {
+        'url': url,
+        'valid': response.ok and content_type.startswith('image/'),
+        'content_type': content_type or None,
+        'size': _size(response),
+    }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> ImageValidationCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ImageValidationCache()
+        return _cache
+
+def validate_images(urls:list) -> dict:
+    """
+    Validates image urls concurrently, results are cached between runs.
+
+    Args:
+        urls (list): Image urls, duplicates are checked once.
+
+    Returns:
+        dict: url -> {'url', 'valid', 'content_type', 'size'}
+    """
+    urls = list(dict.fromkeys(url for url in urls if url))
+    cache = get_cache()
+    results = cache.get_many(urls)
+    missing = [(url,) for url in urls if url not in results]
+
+    checked = []
+    engine = FetchEngine(MAX_CONCURRENCY, MAX_HOST_CONCURRENCY, label='validating image')
+    for (url,), result in engine.run(check_image, missing):
+        if result is None:
+            # unreachable, not cached so the next run tries again
+            results[url] = {'url': url, 'valid': False, 'content_type': None, 'size': None}
+            continue
+        results[url] = result
+        checked.append(result)
+    cache.put_many(checked)
+
+    if len(missing) > 0:
+        info(f'{blue}Images{reset}: {len(urls)} urls, {len(urls)-len(missing)} cached, {len(checked)} checked')
+    return results
+
+
+def dhash(img:Image.Image, size:int=8) -> int:
+    """
+    Difference hash: one bit per pixel pair of a (size+1)xsize grayscale thumbnail,
+    set if the left pixel is brighter. Survives resizing, recompression and small crops.
+    """
+    pixels = list(img.convert('L').resize((size+1, size), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row*(size+1)+col]
+            right = pixels[row*(size+1)+col+1]
+            value = (value << 1) | (left > right)
+    return value
+
+def hamming_distance(a:int, b:int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class ImageCache:
+    """
+    Content-addressed cache of downloaded images and their resized variants.
+    Urls map to the sha1 of the image, so the same image behind different urls is stored once.
+
+    Args:
+        path (str, optional): Directory the images and the index are stored in.
+        max_size (int, optional): Maximum size of all files in bytes, least recently used go first.
+            It is checked whenever a file is written.
+    """
+    def __init__(self, path:str=IMAGE_CACHE_DIR, max_size:int=IMAGE_CACHE_MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        conn = self._connection()
+        conn.execute('CREATE TABLE IF NOT EXISTS image_urls (url text PRIMARY KEY, sha1 text)')
+        conn.execute('CREATE TABLE IF NOT EXISTS image_files (sha1 text PRIMARY KEY, size integer, used real)')
+        conn.execute('CREATE TABLE IF NOT EXISTS image_hashes (sha1 text PRIMARY KEY, dhash text)')
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # pooled per process and thread like the connections of the article database
+        return get_connection(os.path.join(self.path, 'index.db'))[0]
+
+    def _file(self, sha1:str, variant:str=None) -> str:
+        return os.path.join(self.path, sha1+(f'.{variant}.png' if variant is not None else '.orig'))
+
+    def _files(self, sha1:str) -> list:
+        # the original and every variant, whether they exist or not
+        return [self._file(sha1)]+[self._file(sha1, variant) for variant in VARIANTS]
+
+    def _write(self, path:str, data:bytes):
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _lookup(self, url:str) -> str:
+        with self._lock:
+            row = self._connection().execute('SELECT sha1 FROM image_urls WHERE url=?', (url,)).fetchone()
+        if row is None or not os.path.exists(self._file(row[0])):
+            return None
+        return row[0]
+
+    def _touch(self, sha1:str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute('UPDATE image_files SET used=? WHERE sha1=?', (time(), sha1))
+            conn.commit()
+
+    def _written(self, sha1:str):
+        # only the few files of this image are looked at, not the whole directory
+        size = sum(os.path.getsize(path) for path in self._files(sha1) if os.path.exists(path))
+        with self._lock:
+            conn = self._connection()
+            conn.execute('INSERT OR REPLACE INTO image_files VALUES (?, ?, ?)', (sha1, size, time()))
+            total_size = conn.execute('SELECT SUM(size) FROM image_files').fetchone()[0]
+            conn.commit()
+        if total_size > self.max_size:
+            self.evict()
+
+    def _download(self, url:str) -> str:
+        response = httpUtils.get(url)
+        response.raise_for_status()
+        # fail here and not in the video, if the body is no image
+        Image.open(BytesIO(response.content)).verify()
+        sha1 = hashlib.sha1(response.content).hexdigest()
+        with self._lock:
+            conn = self._connection()
+            conn.execute('INSERT OR REPLACE INTO image_urls VALUES (?, ?)', (url, sha1))
+            conn.commit()
+        if not os.path.exists(self._file(sha1)):
+            self._write(self._file(sha1), response.content)
+            self._written(sha1)
+        return sha1
+
+    def get(self, url:str, variant:str=None) -> str:
+        """
+        Returns the path of the cached image, downloads it on a miss.
+
+        Args:
+            url (str): Url of the image.
+            variant (str, optional): One of VARIANTS, None for the original file.
+        """
+        sha1 = self._lookup(url) or self._download(url)
+        path = self._file(sha1, variant)
+        if variant is not None and not os.path.exists(path):
+            img = Image.open(self._file(sha1)).convert('RGB')
+            img = img.resize(VARIANTS[variant], Image.LANCZOS)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            img.save(tmp_path, format='PNG')
+            os.replace(tmp_path, path)
+            self._written(sha1)
+        else:
+            self._touch(sha1)
+        return path
+
+    def dhash(self, url:str) -> int:
+        """
+        Returns the 64 bit difference hash of the image, computed once per image.
+        """
+        sha1 = self._lookup(url)
+        if sha1 is None:
+            self.get(url)
+            sha1 = self._lookup(url)
+        with self._lock:
+            row = self._connection().execute('SELECT dhash FROM image_hashes WHERE sha1=?', (sha1,)).fetchone()
+        if row is not None:
+            return int(row[0], 16)
+
+        value = dhash(Image.open(self._file(sha1)))
+        with self._lock:
+            conn = self._connection()
+            # stored as hex, sqlite integers are signed 64 bit
+            conn.execute('INSERT OR REPLACE INTO image_hashes VALUES (?, ?)', (sha1, f'{value:016x}'))
+            conn.commit()
+        return value
+
+    def prefetch(self, urls:list, variants:list=()):
+        """
+        Downloads urls and renders their variants concurrently. Failed urls are skipped.
+        """
+        def fetch(url):
+            for variant in variants or (None,):
+                self.get(url, variant)
+        for _ in FetchEngine(label='downloading image').run(fetch, [(url,) for url in dict.fromkeys(urls)]):
+            pass
+
+    def evict(self):
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute('SELECT sha1, size FROM image_files ORDER BY used DESC').fetchall()
+            total_size = 0
+            evicted = []
+            for sha1, size in rows:
+                total_size += size
+                if total_size > self.max_size:
+                    evicted.append(sha1)
+            for sha1 in evicted:
+                conn.execute('DELETE FROM image_files WHERE sha1=?', (sha1,))
+                conn.execute('DELETE FROM image_urls WHERE sha1=?', (sha1,))
+                conn.execute('DELETE FROM image_hashes WHERE sha1=?', (sha1,))
+            conn.commit()
+        for sha1 in evicted:
+            for path in self._files(sha1):
+                if not os.path.exists(path):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    warn(f'Could not remove cached image {path}')
+        if len(evicted) > 0:
+            info(f'{blue}Image cache{reset}: evicted {len(evicted)} images')
+
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+def get_image_cache() -> ImageCache:
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = ImageCache()
+            _image_cache.evict()
+        return _image_cache
+
+def dedup_images(images:list, max_distance:int=DHASH_MAX_DISTANCE) -> list:
+    """
+    Drops near-duplicate images (the same agency photo in several articles), the first one is kept.
+
+    Args:
+        images (list): [{'txt', 'url'}] as returned by textUtils.get_images.
+        max_distance (int, optional): Maximum dHash distance of two images considered equal.
+
+    Returns:
+        list: The images without duplicates, in the original order. Images that could not be
+        downloaded are kept, the video falls back on its own.
+    """
+    image_cache = get_image_cache()
+    hashes = {}
+    engine = FetchEngine(MAX_CONCURRENCY, MAX_HOST_CONCURRENCY, label='hashing image')
+    for (url,), value in engine.run(image_cache.dhash, [(url,) for url in dict.fromkeys(image['url'] for image in images)]):
+        hashes[url] = value
+
+    kept = []
+    kept_hashes = []
+    for image in images:
+        value = hashes.get(image['url'])
+        if value is not None:
+            if any(hamming_distance(value, other) <= max_distance for other in kept_hashes):
+                continue
+            kept_hashes.append(value)
+        elif image['url'] in [other['url'] for other in kept]:
+            continue
+        kept.append(image)
+
+    if len(kept) < len(images):
+        info(f'{blue}Images{reset}: dropped {len(images)-len(kept)} of {len(images)} as duplicates')
+    return kept
@@ -1,9 +1,6 @@
 import json
 from logUtils import warn, info, error, green, blue, orange, reset,yellow
-from scrapers.twentymin_scraper import scrape_20min
-from scrapers.blick_scraper import scrape_blick
-from scrapers.taggi_scraper import scrape_taggi
-from scrapers.zeit_scraper import scrape_zeit
+from scrapers.ingest import scrape_newspapers
 from datetime import datetime
 import os
 from textUtils import SummarizManager, TTSManager, UploadManager
@@ -15,17 +12,12 @@ import concurrent.futures
 import uuid
 import multiprocessing as mp
 from time import sleep
-from tqdm import tqdm
 import errno
+import httpUtils
 
 from moviepy.editor import VideoFileClip
 from pandas import DataFrame
 
-BLICK_NAME = 'Blick'
-TWENTYMIN_NAME = '20min'
-TAGI_NAME = 'Tagesanzeiger'
-ZEIT_NAME = 'die Zeit'
-
 TITEL_TEMPLATE = "News Noise CH - {}"
 
 MAX_DISCRIPTION_LENGTH = 5000
@@ -36,131 +28,20 @@ def convert_matches(matches:DataFrame, db:DBManager):
     matches['articles'] = matches['articles'].apply(lambda x: x.split(';'))
     matches['images'] = matches['images'].apply(lambda x: x.split(';'))
 
+    # load the articles of all matches with one query, get_articles then reads the record cache
+    db.get_by_uids('articles', [uid for uids in matches['articles'] for uid in uids])
     matches['articles'] = matches['articles'].apply(lambda x: get_articles(db,x))  
 
     return matches
 
-def scrape_process(queue, name, f):
-    db = DBManager()  # Create a new DBManager instance for each process
-    try:
-        res = f(db)  # Pass the db instance to the scraper function
-        info(f'{green}Scraped {len(res)} articles from {name}{reset}')
-        info(f'{blue}Put into queue: {name} with {len(res)}{reset}')
-        queue.put((name, res))
-        return
-    except Exception as e:
-        error(f'{orange}Error scraping {name}: {e}{reset}')
-        return
-
-def scrape_newspapers(db: DBManager, summarizer: SummarizManager):
-    # create scrape result dictionary
-    scrape_res_dict = {
-        TWENTYMIN_NAME: None,
-        BLICK_NAME: None,
-        TAGI_NAME: None,
-        ZEIT_NAME: None
-    }
-
-    queue = mp.Queue()
-    # Make subprocesses with the shared_db instead of db
-    scrapers = [
-        mp.Process(target=scrape_process, args=(queue, TWENTYMIN_NAME, scrape_20min)),
-        mp.Process(target=scrape_process, args=(queue, BLICK_NAME, scrape_blick)),
-        mp.Process(target=scrape_process, args=(queue, TAGI_NAME, scrape_taggi)),
-        mp.Process(target=scrape_process, args=(queue, ZEIT_NAME, scrape_zeit)),
-    ]
-
-    # start subprocesses
-    print('starting subprocesses...')
-    for proc in scrapers:
-        proc.start()
-
-    while queue.qsize() < len(scrapers):
-        sleep(1)
-    
-    # get results from queue
-    print('getting results from queue...')
-    while not queue.empty():
-        key, value = queue.get()
-        scrape_res_dict[key] = value
-
-    # wait for subprocesses to finish
-    print('waiting for subprocesses to finish...')
-    for proc in scrapers:
-        proc.join(timeout=10)
-        if proc.is_alive():
-            warn(f'{orange}Process {proc.name} is still alive!{reset}')
-            proc.terminate()
-
-    # check if all scrapers returned results
-    for key, value in scrape_res_dict.items():
-        if value is None:
-            error(f'{orange}Not all scrapers returned results!{reset}')
-            continue
-        # remove duplicates in links
-        links = [article['url'] for article in value]
-        if len(links) != len(set(links)):
-            starting_len = len(value)
-            value_buffer = []
-            links_buffer = []
-            for article in value:
-                if article['url'] not in links_buffer:
-                    value_buffer.append(article)
-                    links_buffer.append(article['url'])
-            value = value_buffer
-            warn(f'{orange}Duplicates found in {key}! reduced from {starting_len} to {len(value)}{reset}')
-
-        processed = len(value)
-        for i, article in tqdm(enumerate(value), total=len(value), desc=f'Processing {key} articles'):
-            text = article['text']
-            if not db.pass_article_filters(article, key):
-                value[i] = None
-                processed -= 1
-                continue
-            if summarizer.get_token_count(text) > 3500:
-                text = summarizer.summarize(text, 3500/summarizer.get_token_count(text))
-            article['uid'] = str(uuid.uuid4())
-            article['source'] = key
-            res = summarizer.summarize_and_tag_gpt3(text)
-            if res is None or res == {}:
-                res = {
-                    'summary': '',
-                    'tags': []
-                }
-            article['summary'] = res['summary']
-            article['tags'] = ';'.join(res['tags'])
-            value[i] = article
-
-        # remove articles that did not pass the filters
-        value = [article for article in value if article is not None]
-        inserted = db.insert_many(value, 'articles')
-        info(f'{green}{processed} Articles Processed and {inserted} Inserted from {key}{reset}')
-
-    twentymin_df = db.get_by_publish_date(TWENTYMIN_NAME, datetime.now().strftime("%Y-%m-%d"))
-    blick_df = db.get_by_publish_date(BLICK_NAME, datetime.now().strftime("%Y-%m-%d"))
-    tagi_df = db.get_by_publish_date(TAGI_NAME, datetime.now().strftime("%Y-%m-%d"))
-    zeit_df = db.get_by_publish_date(ZEIT_NAME, datetime.now().strftime("%Y-%m-%d"))
-
-    print(f'{yellow}Articles from Today: "20min": {len(twentymin_df)}, "blick": {len(blick_df)}, "tagi": {len(tagi_df)}, "zeit": {len(zeit_df)}{reset}')
-    if sum(len(df) for df in [twentymin_df, blick_df, tagi_df, zeit_df]) < 10:
-        warn(f'{orange}No articles found for today!{reset}')
-        exit(1) 
-
 def get_articles(db: DBManager, uids: list):
-    articles = []
-    for uid in uids:
-        article = db.get_by_uid('articles', uid)
-        articles.append(article)
-    return articles
+    return db.get_by_uids('articles', uids)
 
 def create_videos(db: DBManager, today_date, today_path, summarizer, tts):
     ########################## Create Videos ############################
 
     # get matches from today
-    matches = db.get_by_WHERE(
-        f'"date" = \'{today_date}\'',
-        'matches',
-    )
+    matches = db.query('matches').where('date', '=', today_date).fetch()
 
     # error if nothing found
     if len(matches) == 0:
@@ -215,10 +96,7 @@ def upload(uploadManager: UploadManager, db: DBManager, today_path: str, today_d
     relative_max_description_length = (5000-len(":".join(list(discription_links_dict.keys()))))/ len(discription_links_dict)
 
     # get matches from today
-    matches = db.get_by_WHERE(
-        f'"date" = \'{today_date}\'',
-        'matches',
-    )
+    matches = db.query('matches').where('date', '=', today_date).fetch()
 
     # error if nothing found
     if len(matches) == 0:
@@ -281,6 +159,7 @@ def main():
     mm.cross_compare(today_path, db, summarizer)
     create_videos(db, today_date, today_path, summarizer, tts)
     upload(uploadManager, db, today_path, today_date)
+    httpUtils.log_stats()
 
 if __name__ == '__main__':
     main()
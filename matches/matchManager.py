@@ -4,7 +4,9 @@ from tqdm import tqdm
 from datetime import datetime, timedelta
 from textUtils import *
 from database.DB_manager import DBManager
+from database.migrations import split_tags
 from textUtils import SummarizManager
+import imageUtils
 from thefuzz import fuzz
 from uuid import uuid4
 from transformers import GPT2TokenizerFast
@@ -55,22 +57,19 @@ def tag_matching(article1:dict, article2:dict) -> float:
 
     return score, matching_tags
 
-def compare_articles(articles:DataFrame, date:str):
+def compare_articles(db:DBManager, date:str, since:str):
     sore_map_dict = {}
-    articles_today = articles[articles['publication_date'] == date]
-
-    # go over all articles in today
-    info(f'Comparing {len(articles_today)} articles from {date}')
-    for _,article in tqdm(articles_today.iterrows(), total=len(articles_today)):
-        main_art = {}
-        # map score to uid
-        for _, article2 in articles.iterrows():
-            score, matching_tags = tag_matching(article, article2)
-            if score > THREASHHOLD:
-                main_art[article2['uid']] = score
-
-        sore_map_dict[article['uid']] = main_art
-    
+
+    # only pairs sharing a tag can score, the tag index returns exactly those
+    overlaps = db.get_tag_overlaps(date, since, THREASHHOLD)
+    info(f'Comparing articles from {date}: {len(overlaps)} pairs above {THREASHHOLD}')
+    for uid, other_uid, nr_matching_tags, nr_tags, nr_other_tags in overlaps:
+        main_art = sore_map_dict.setdefault(uid, {})
+        # ratio between the intersection and the union of the tag sets
+        score = nr_matching_tags/(nr_tags+nr_other_tags-nr_matching_tags)
+        if score > THREASHHOLD:
+            main_art[other_uid] = score
+
     return sore_map_dict
 
 def compress_comparison(data: dict):
@@ -122,17 +121,23 @@ def cross_compare(today_path: str, db: DBManager, summarizer: SummarizManager):
     date_14days = (today-timedelta(days=14)).strftime("%Y-%m-%d")
     date_today = (today).strftime("%Y-%m-%d")
 
-    articles = db.get_by_publish_date(None, date_14days)
-    articles['tags'] = articles['tags'].apply(lambda x: x.lower().split(';'))
-
-    comparison = compare_articles(articles, date_today)
+    comparison = compare_articles(db, date_today, date_14days)
     comparison = compress_comparison(comparison)
     comparison = cleanup_comparison(comparison)
 
+    # only the matched articles are loaded
+    matched_uids = list(set(comparison.keys()).union(*[set(sub_dict.keys()) for sub_dict in comparison.values()]))
+    articles = dict(zip(matched_uids, db.get_by_uids('articles', matched_uids)))
+    for article in articles.values():
+        article['tags'] = split_tags(article['tags'])
+
+    # validate the images of all matched articles in one go, get_images then reads the cache
+    imageUtils.validate_images([url for article in articles.values() for _, url in image_links(article['text'])])
+
     # create the match json
     matches = []
     for main_uid, sub_dict in comparison.items():
-        main_article = articles[articles['uid'] == main_uid].to_dict('records')[0]
+        main_article = articles[main_uid]
         
         match = {
             'title': None,
@@ -148,7 +153,7 @@ def cross_compare(today_path: str, db: DBManager, summarizer: SummarizManager):
         }
 
         for sub_uid, score in sub_dict.items():
-            sub_article = articles[articles['uid'] == sub_uid].to_dict('records')[0]
+            sub_article = articles[sub_uid]
 
             """ if score < THREASHHOLD*1.5:
                 if not gpt_compare(main_article, sub_article, summarizer):
@@ -160,6 +165,8 @@ def cross_compare(today_path: str, db: DBManager, summarizer: SummarizManager):
             match['tags'] = set(match['tags']).union(set(sub_article['tags']))
 
         match['tags'] = list(match['tags'])
+        # syndicated photos show up in several articles of a match
+        match['images'] = imageUtils.dedup_images(match['images'])
 
         if match['images'] == []:
             print(f'{red}Match {match["uid"]} has no images{reset}')
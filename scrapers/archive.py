@@ -0,0 +1,239 @@
+"""
+Append-only archive of every page the scrapers fetched.
+
+Pages are stored as independent zstd frames (a JSON header line followed by the html)
+in one file per month, an sqlite index maps url and fetch time to file and offset.
+In replay mode the scrapers read from the archive instead of the network, so
+selector fixes can be tested on old pages without crawling the sites again.
+
+Usage:
+    python -m scrapers.replay_cli <source> --from 2026-09-01 --to 2026-09-30 --out articles.jsonl
+"""
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from time import time
+from datetime import datetime, timedelta
+import zstandard as zstd
+from logUtils import warn
+from database.DB_manager import get_connection
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive')
+COMPRESSION_LEVEL = 10
+# set to 'latest' or an ISO date/time to start all scrapers in replay mode
+REPLAY_ENV = 'NEWSNOISE_REPLAY'
+
+
+class NotArchived(LookupError):
+    """
+    Raised in replay mode for a page that was not archived at the replayed time.
+    """
+
+
+class PageArchive:
+    """
+    Args:
+        path (str, optional): Directory of the data files and the index.
+    """
+    def __init__(self, path:str=ARCHIVE_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        conn = self._connection()
+        conn.execute('''CREATE TABLE IF NOT EXISTS pages (
+            url text, fetched real, source text, sha1 text, file text, offset integer, length integer)''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_url_fetched ON pages (url, fetched)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_source_fetched ON pages (source, fetched)')
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # pooled per process and thread like the connections of the article database
+        return get_connection(os.path.join(self.path, 'index.db'))[0]
+
+    def _last_sha1(self, url:str) -> str:
+        with self._lock:
+            row = self._connection().execute('SELECT sha1 FROM pages WHERE url=? ORDER BY fetched DESC LIMIT 1', (url,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _frame(self, url:str, fetched:float, source:str, sha1:str, body:bytes) -> bytes:
+        header = json.dumps({'url': url, 'fetched': fetched, 'source': source, 'sha1': sha1})
+        return zstd.ZstdCompressor(level=COMPRESSION_LEVEL).compress(header.encode('utf-8')+b'\n'+body)
+
+    def store(self, url:str, html:str, source:str=None, fetched:float=None):
+        fetched = fetched or time()
+        body = html.encode('utf-8')
+        sha1 = hashlib.sha1(body).hexdigest()
+        frame = None
+        if self._last_sha1(url) != sha1:
+            # compressed before the write lock is taken, the scraper processes only serialize on the append
+            frame = self._frame(url, fetched, source, sha1, body)
+
+        with self._lock:
+            conn = self._connection()
+            # BEGIN IMMEDIATE serializes the appends of all scraper processes
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                last = conn.execute('SELECT sha1, file, offset, length FROM pages WHERE url=? ORDER BY fetched DESC LIMIT 1', (url,)).fetchone()
+                if last is not None and last[0] == sha1:
+                    # unchanged page, only record that it was fetched again
+                    file_name, offset, length = last[1], last[2], last[3]
+                else:
+                    if frame is None:
+                        # another process stored a different version in the meantime
+                        frame = self._frame(url, fetched, source, sha1, body)
+                    file_name = 'pages-'+datetime.fromtimestamp(fetched).strftime('%Y-%m')+'.warc.zst'
+                    with open(os.path.join(self.path, file_name), 'ab') as f:
+                        offset = f.seek(0, os.SEEK_END)
+                        f.write(frame)
+                    length = len(frame)
+                conn.execute('INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)', (url, fetched, source, sha1, file_name, offset, length))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def urls(self, since:float=None) -> list:
+        """
+        Distinct urls fetched after since.
+        """
+        with self._lock:
+            rows = self._connection().execute('SELECT DISTINCT url FROM pages WHERE fetched>=?', (since or 0,)).fetchall()
+        return [row[0] for row in rows]
+
+    def changes_by_day(self, start:datetime, end:datetime):
+        """
+        Indexes the archive by day with one pass over the index: returns the urls archived before
+        start and for every day until end the urls whose content changed (a new sha1) on that day.
+        """
+        with self._lock:
+            rows = self._connection().execute('SELECT url, sha1, fetched FROM pages WHERE fetched<? ORDER BY url, fetched',
+                                              (end.timestamp(),)).fetchall()
+        before = set()
+        changed = {}
+        last_url, last_sha1 = None, None
+        for url, sha1, fetched in rows:
+            if url == last_url and sha1 == last_sha1:
+                continue
+            if fetched < start.timestamp():
+                before.add(url)
+            else:
+                changed.setdefault(datetime.fromtimestamp(fetched).date(), set()).add(url)
+            last_url, last_sha1 = url, sha1
+        return before, changed
+
+    def _read(self, file_name:str, offset:int, length:int) -> str:
+        with open(os.path.join(self.path, file_name), 'rb') as f:
+            f.seek(offset)
+            record = zstd.ZstdDecompressor().decompress(f.read(length))
+        _, body = record.split(b'\n', 1)
+        return body.decode('utf-8')
+
+    def load(self, url:str, at:float=None) -> str:
+        """
+        Returns the newest archived version of url fetched before at, None if there is none.
+        """
+        with self._lock:
+            if at is None:
+                row = self._connection().execute('SELECT file, offset, length FROM pages WHERE url=? ORDER BY fetched DESC LIMIT 1', (url,)).fetchone()
+            else:
+                row = self._connection().execute('SELECT file, offset, length FROM pages WHERE url=? AND fetched<=? ORDER BY fetched DESC LIMIT 1', (url, at)).fetchone()
+        if row is None:
+            return None
+        return self._read(*row)
+
+
+_archive = None
+_archive_lock = threading.Lock()
+# None: live crawl, 'latest' or a timestamp: replay
+_replay_at = os.environ.get(REPLAY_ENV) or None
+if _replay_at not in (None, 'latest'):
+    _replay_at = datetime.fromisoformat(_replay_at).timestamp()
+
+def get_archive() -> PageArchive:
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = PageArchive()
+        return _archive
+
+def enable_replay(at:datetime=None):
+    """
+    Serve all scraper fetches from the archive, as they were at the given time (newest if None).
+    """
+    global _replay_at
+    _replay_at = at.timestamp() if at is not None else 'latest'
+
+def disable_replay():
+    global _replay_at
+    _replay_at = None
+
+def replaying() -> bool:
+    return _replay_at is not None
+
+def replay_fetch(url:str) -> str:
+    html = get_archive().load(url, None if _replay_at == 'latest' else _replay_at)
+    if html is None:
+        raise NotArchived(f'{url} is not in the archive')
+    return html
+
+def store(url:str, html:str, source:str=None):
+    try:
+        get_archive().store(url, html, source)
+    except Exception as e:
+        # the archive must never break a live crawl
+        warn(f'Could not archive {url}: {e}')
+
+
+def _scrapers() -> dict:
+    from scrapers.blick_scraper import iter_blick
+    from scrapers.twentymin_scraper import iter_20min
+    from scrapers.taggi_scraper import iter_taggi
+    from scrapers.zeit_scraper import iter_zeit
+    return {
+        'blick': iter_blick,
+        '20min': iter_20min,
+        'tagesanzeiger': iter_taggi,
+        'zeit': iter_zeit,
+    }
+
+class _ReplayState:
+    """
+    Stands in for the database of a scraper during a replay. The urls it knows are the articles
+    already re-parsed on an earlier day whose archived page did not change since, the frontier skips them.
+    """
+    def __init__(self):
+        self.known = set()
+
+    def get_known_urls(self) -> set:
+        return self.known
+
+def replay(source:str, start:datetime, end:datetime) -> dict:
+    """
+    Re-parses the archived pages of source day by day. Returns the articles by url, newest version wins.
+    Every archived version of an article is only parsed once, days without archived pages are skipped.
+    """
+    scrape = _scrapers()[source]
+    before, changed = get_archive().changes_by_day(start, end+timedelta(days=1))
+    state = _ReplayState()
+    articles = {}
+    day = start
+    try:
+        while day <= end:
+            # the state of the archive at the end of that day
+            enable_replay(day+timedelta(days=1))
+            state.known -= changed.get(day.date(), set())
+            try:
+                for article in scrape(state):
+                    articles[article['url']] = article
+            except (NotArchived, OSError) as e:
+                # a page fetched past the archive fails like a missing one (requests errors are OSErrors)
+                warn(f'Skipping {source} on {day.date()}: {e}')
+            # everything archived until the end of the day has been seen in its current version
+            state.known |= before | changed.get(day.date(), set())
+            before = set()
+            day += timedelta(days=1)
+    finally:
+        disable_replay()
+    return articles
@@ -1,13 +1,15 @@
-import requests
-from bs4 import BeautifulSoup
 import json
 from logUtils import warn, info, error, green, blue, orange, reset, grey
 from sqlite3 import connect
 from datetime import datetime
 from sqlite3 import connect
-from newspaper import Article
+from scrapers.metadata import extract_metadata
+from scrapers.parsing import parse_html, best_image_src, ARTICLE_PARTS, CATEGORY_PARTS
+from scrapers import http_cache, crawl
 
 START_URL = 'https://www.blick.ch'
+SOURCE_NAME = 'Blick'
+FEED_URL = START_URL+'/{category}/rss.xml'
 CATEGORIES = [
     'schweiz',
     'wirtschaft',
@@ -28,8 +30,7 @@ def blick_raw2refined(article_json):
     subtitle = article_json['subTitle']
     abstract = article_json['abstract']
 
-    soup = BeautifulSoup(article_json['text'], 'html.parser')
-    article_soup = soup.find('article')
+    article_soup = article_json['article']
 
     author_soup = article_soup.findChild('a', recursive=False)
     if author_soup is None:
@@ -62,11 +63,13 @@ def blick_raw2refined(article_json):
             if len(images) > 0:
                 imgs = []
                 for img in images:
-                    pic = img.parent
-                    srcs = pic.find_all('source')[0]
+                    # the srcset candidate closest to the 1080p video
+                    src = best_image_src(img, url)
+                    if src is None:
+                        continue
                     imgs.append({
-                        "src": srcs['srcset'],
-                        "alt": img['alt']
+                        "src": src,
+                        "alt": img.get('alt')
                     })
 
                 lineup.append({
@@ -111,8 +114,7 @@ def refined2md(article_json):
             md += f"### {div_txt}\n\n"
         elif div['type'] == 'images':
             for img in div['images']:
-                src = img['src'].split('1x, ')[0]
-                md += f"![{img['alt']}]({src})\n\n"
+                md += f"![{img['alt']}]({img['src']})\n\n"
 
     return {
         'title': title,
@@ -126,17 +128,11 @@ def refined2md(article_json):
     }
 
 def scrape_article(url, category):
+    html = http_cache.fetch(url, SOURCE_NAME)
+    soup = parse_html(html, ARTICLE_PARTS)
 
-    article = Article(url)
-    article.download()
-    article.parse()
-    if article.publish_date is None:
-        publication_date = datetime.now().strftime('%Y-%m-%d')
-    else:
-        publication_date = article.publish_date.strftime('%Y-%m-%d')
-
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    # the author is read from the article body in blick_raw2refined
+    publication_date, _ = extract_metadata(soup, url, html, with_author=False)
 
     main = soup.find('main')
 
@@ -150,7 +146,8 @@ def scrape_article(url, category):
     if main.find('article') is None:
         return None
 
-    text = main.find('article').prettify()
+    # the parsed <article> is handed on as is, no need to serialize and parse it again
+    article_soup = main.find('article')
 
     article_json = {
         'url': url,
@@ -158,7 +155,7 @@ def scrape_article(url, category):
         'title': title,
         'subTitle': subTitle,
         'abstract': abstract,
-        'text': text,
+        'article': article_soup,
         'publication_date': publication_date
     }
 
@@ -168,38 +165,30 @@ def scrape_article(url, category):
     md = refined2md(refined)
     return md
 
-def scrape_blick(db)-> list:
-    articles_json = []
+def category_links(category:str) -> list:
+    """
+    Links of a category page, used when the category has no feed.
+    """
+    url = f'{START_URL}/{category}'
+    html = http_cache.fetch(url, SOURCE_NAME)
+    soup = parse_html(html, CATEGORY_PARTS)
+
+    main = soup.find('main')
+    return [ a['href'] for a in main.find_all('a', href=True)]
+
+def is_article_url(url:str) -> bool:
+    return url.endswith('.html')
+
+def iter_blick(db):
+    """
+    Yields the scraped articles one by one as soon as they are fetched.
+    Returns the number of articles that could not be fetched.
+    """
     info('Starting scraping Blick.ch')
-    for category in CATEGORIES:
-        url = f'{START_URL}/{category}'
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        main = soup.find('main')
-        all_links = [ a['href'] for a in main.find_all('a')]
-        # remove duplicates
-        all_links = list(dict.fromkeys(all_links))
-        
-        for link in all_links:
-            try:
-                url = f'{START_URL}{link}'
-                
-                if not url.endswith('.html'):
-                    continue
-                # check if article is already in database
-                if db.check_if_article_exists(url):
-                    continue
-
-                md = scrape_article(url, category)
-                if md is None:
-                    continue
-                articles_json.append(md)
-
-            except Exception as e:
-                error(f'Error scraping {url}: {e}')
-
-    return articles_json
+    return (yield from crawl.iter_source(db, SOURCE_NAME, START_URL, FEED_URL, CATEGORIES, category_links, is_article_url, scrape_article))
+
+def scrape_blick(db)-> list:
+    return list(iter_blick(db))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,56 @@
+from logUtils import warn, info
+from scrapers.fetch_engine import FetchEngine
+from scrapers import http_cache, discovery, archive
+from scrapers.frontier import Frontier, canonicalize_url
+
+
+def iter_source(db, source_name:str, start_url:str, feed_url:str, categories:list, category_links, link_filter, scrape_article):
+    """
+    Crawl shared by all scrapers: reads the feed of every category (the category page if it has none),
+    queues the new article links in a Frontier and fetches them concurrently.
+    Yields the scraped articles one by one, returns the number of articles that could not be fetched
+    because of a network or HTTP error. Articles that fail to parse are only logged, they would fail again.
+
+    Args:
+        db (DBManager): Database of the known urls, None when re-parsing the archive.
+        source_name (str): Name of the source in the logs, the http cache and the crawl state.
+        start_url (str): Links are resolved against it.
+        feed_url (str): Feed of a category, formatted with category.
+        categories (list): Categories of the source.
+        category_links (function): category -> links of the category page.
+        link_filter (function): Canonical url -> True if it is an article.
+        scrape_article (function): (url, category) -> article, None to skip it.
+    """
+    # no db when re-parsing the archive, every archived article is taken
+    frontier = Frontier(db.get_known_urls() if db is not None else None)
+    since = discovery.get_last_run(source_name)
+    for category in categories:
+        links = discovery.read_feed(feed_url.format(category=category), since, source_name)
+        if links is None:
+            # no feed for this category, fall back to the category page
+            try:
+                links = category_links(category)
+            except archive.NotArchived as e:
+                # replaying a day the category page was not archived on
+                warn(f'{source_name}: skipping {category}, {e}')
+                continue
+
+        for link in links:
+            url = canonicalize_url(link, start_url)
+            if not link_filter(url):
+                continue
+            # skips duplicates and articles already in the database
+            frontier.add(url, category)
+
+    info(f'{source_name}: {len(frontier)} new articles, {frontier.duplicates} duplicate links skipped')
+
+    # fetch all articles concurrently
+    engine = FetchEngine()
+    for _, article in engine.run(scrape_article, frontier.jobs):
+        if article is None:
+            continue
+        yield article
+
+    http_cache.log_stats(source_name)
+    # the last run is recorded by the caller once the articles are stored, failed fetches have to be found again
+    return len(engine.transient)
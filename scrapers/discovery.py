@@ -0,0 +1,136 @@
+import os
+import json
+from datetime import datetime, timezone, timedelta
+from email.utils import parsedate_to_datetime
+import xml.etree.ElementTree as ET
+from logUtils import warn, info
+from scrapers import http_cache, archive
+
+STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state')
+# entries a bit older than the last run are still taken, feeds are not updated instantly
+LASTMOD_SLACK = timedelta(hours=2)
+# how many sub sitemaps of a sitemap index are read
+MAX_SUB_SITEMAPS = 10
+
+FEED_ROOTS = ('urlset', 'sitemapindex', 'rss', 'feed', 'RDF')
+
+
+def now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _state_path(source:str) -> str:
+    return os.path.join(STATE_DIR, source.replace(' ', '_')+'.json')
+
+def get_last_run(source:str) -> datetime:
+    """
+    Start time of the last successful crawl of source, None if there was none.
+    """
+    if archive.replaying():
+        # a replay looks at everything that was archived
+        return None
+    try:
+        with open(_state_path(source)) as f:
+            return datetime.fromisoformat(json.load(f)['last_run'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+def set_last_run(source:str, started:datetime):
+    if archive.replaying():
+        return
+    os.makedirs(STATE_DIR, exist_ok=True)
+    tmp_path = _state_path(source)+f'.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'last_run': started.isoformat()}, f)
+    os.replace(tmp_path, _state_path(source))
+
+def _local_name(tag:str) -> str:
+    # '{namespace}loc' -> 'loc'
+    return tag.rsplit('}', 1)[-1]
+
+def _child_text(element, name:str) -> str:
+    for child in element.iter():
+        if _local_name(child.tag) == name and child.text is not None:
+            return child.text.strip()
+    return None
+
+def parse_feed_date(value:str) -> datetime:
+    if value is None or value == '':
+        return None
+    try:
+        date = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date
+
+def parse_feed(xml:str):
+    """
+    Reads a sitemap, sitemap index, RSS or Atom feed.
+    Returns (kind, [(url, date)]) with kind 'index' for sitemap indexes, None if xml is no feed.
+    """
+    try:
+        root = ET.fromstring(xml.encode('utf-8') if isinstance(xml, str) else xml)
+    except ET.ParseError:
+        return None
+    root_name = _local_name(root.tag)
+    if root_name not in FEED_ROOTS:
+        return None
+
+    entries = []
+    if root_name in ('urlset', 'sitemapindex'):
+        for element in root:
+            url = _child_text(element, 'loc')
+            # news sitemaps carry the publication date, normal ones only lastmod
+            date = _child_text(element, 'publication_date') or _child_text(element, 'lastmod')
+            if url is not None:
+                entries.append((url, parse_feed_date(date)))
+        return ('index' if root_name == 'sitemapindex' else 'urls'), entries
+
+    for element in root.iter():
+        name = _local_name(element.tag)
+        if name == 'item':
+            url = _child_text(element, 'link')
+            date = _child_text(element, 'pubDate') or _child_text(element, 'date')
+        elif name == 'entry':
+            link = next((child for child in element if _local_name(child.tag) == 'link'), None)
+            url = link.get('href') if link is not None else None
+            date = _child_text(element, 'published') or _child_text(element, 'updated')
+        else:
+            continue
+        if url is not None:
+            entries.append((url, parse_feed_date(date)))
+    return 'urls', entries
+
+def _is_new(date:datetime, since:datetime) -> bool:
+    return since is None or date is None or date >= since-LASTMOD_SLACK
+
+def read_feed(feed_url:str, since:datetime=None, source:str=None) -> list:
+    """
+    Returns the urls of a sitemap or feed that changed after since.
+    Returns None if the feed is not available, callers then fall back to the category page.
+    """
+    try:
+        parsed = parse_feed(http_cache.fetch(feed_url, source))
+    except Exception as e:
+        warn(f'Could not read feed {feed_url}: {e}')
+        return None
+    if parsed is None:
+        return None
+
+    kind, entries = parsed
+    if kind == 'index':
+        urls = []
+        sub_sitemaps = [url for url, date in entries if _is_new(date, since)]
+        for sub_url in sub_sitemaps[:MAX_SUB_SITEMAPS]:
+            sub_urls = read_feed(sub_url, since, source)
+            if sub_urls is not None:
+                urls += sub_urls
+        return urls
+
+    urls = [url for url, date in entries if _is_new(date, since)]
+    info(f'{feed_url}: {len(urls)} of {len(entries)} entries are new')
+    return urls
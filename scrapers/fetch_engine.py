@@ -0,0 +1,101 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+from logUtils import error
+
+# how many articles are fetched at the same time in total
+MAX_CONCURRENCY = 16
+# how many articles are fetched at the same time from the same host
+MAX_HOST_CONCURRENCY = 4
+# errors a job may not hit on the next try, requests errors are OSErrors
+TRANSIENT_ERRORS = (OSError,)
+
+
+def _host(url:str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class FetchEngine:
+    """
+    Bounded thread pool the scrapers feed their article urls into.
+
+    Jobs are only submitted when a slot is free, both in total and for their host, so at most
+    max_concurrency jobs (and their results) are in flight. jobs is read lazily, a job whose host
+    is saturated waits in a buffer of at most max_concurrency jobs while other hosts go ahead.
+
+    Args:
+        max_concurrency (int, optional): Number of jobs running at the same time.
+        max_host_concurrency (int, optional): Number of jobs running at the same time against one host.
+        label (str, optional): What the jobs do, failed jobs are logged as 'Error <label> <url>'.
+    """
+    def __init__(self, max_concurrency:int=MAX_CONCURRENCY, max_host_concurrency:int=MAX_HOST_CONCURRENCY, label:str='scraping'):
+        self.max_concurrency = max_concurrency
+        self.max_host_concurrency = max_host_concurrency
+        self.label = label
+        # jobs that raised
+        self.failed = []
+        # failed jobs that hit a network or HTTP error, a parse error fails the same way next time
+        self.transient = []
+
+    def run(self, func, jobs):
+        """
+        Calls func(url, *args) for every job (url, *args) and yields (job, result) as soon as a job finishes.
+        Jobs that raise are logged, skipped and collected in failed, those that hit a TRANSIENT_ERRORS also in transient.
+        jobs can be any iterable, it is consumed as slots free up.
+        """
+        jobs = iter(jobs)
+        exhausted = False
+        # host -> jobs waiting for a slot of their host
+        waiting = {}
+        waiting_count = 0
+        # future -> job
+        running = {}
+        host_running = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+        def submit(job):
+            host = _host(job[0])
+            host_running[host] = host_running.get(host, 0)+1
+            running[executor.submit(func, job[0], *job[1:])] = job
+
+        def host_free(host:str) -> bool:
+            return host_running.get(host, 0) < self.max_host_concurrency
+
+        try:
+            while True:
+                for host, queue in waiting.items():
+                    while len(queue) > 0 and host_free(host) and len(running) < self.max_concurrency:
+                        submit(queue.popleft())
+                        waiting_count -= 1
+                while not exhausted and len(running) < self.max_concurrency and waiting_count < self.max_concurrency:
+                    try:
+                        job = next(jobs)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    host = _host(job[0])
+                    if host_free(host) and len(waiting.get(host, ())) == 0:
+                        submit(job)
+                    else:
+                        waiting.setdefault(host, deque()).append(job)
+                        waiting_count += 1
+                # a job only waits while its host has running jobs
+                if len(running) == 0:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    host_running[_host(job[0])] -= 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        error(f'Error {self.label} {job[0]}: {e}')
+                        self.failed.append(job)
+                        if isinstance(e, TRANSIENT_ERRORS):
+                            self.transient.append(job)
+                        continue
+                    yield job, result
+        finally:
+            # drop jobs that did not start yet if the consumer stops early
+            executor.shutdown(wait=True, cancel_futures=True)
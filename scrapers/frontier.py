@@ -0,0 +1,65 @@
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {
+    'http': 80,
+    'https': 443,
+}
+
+
+def canonicalize_url(url:str, base:str=None) -> str:
+    """
+    Normalizes an article url so the same article always maps to the same string:
+    resolves it against base, lowercases scheme and host, drops default ports,
+    duplicate and trailing slashes, the query and the fragment.
+    """
+    url = url.strip()
+    if base is not None:
+        url = urljoin(base, url)
+    parts = urlsplit(url)
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+
+    path = parts.path
+    while '//' in path:
+        path = path.replace('//', '/')
+    if len(path) > 1:
+        path = path.rstrip('/')
+    if path == '':
+        path = '/'
+
+    return urlunsplit((scheme, host, path, '', ''))
+
+
+class Frontier:
+    """
+    Collects the article urls of all categories of a source before anything is fetched.
+    Every url is canonicalized and only queued once, urls already in the database are skipped.
+
+    Args:
+        known_urls (set, optional): Urls already stored in the database.
+    """
+    def __init__(self, known_urls:set=None):
+        self.known = {canonicalize_url(url) for url in known_urls} if known_urls is not None else set()
+        self.seen = set()
+        self.jobs = []
+        self.duplicates = 0
+
+    def add(self, url:str, *args) -> bool:
+        """
+        Queues (canonical url, *args) as a job. Returns False if the url was seen or is known.
+        """
+        canonical = canonicalize_url(url)
+        if canonical in self.seen:
+            self.duplicates += 1
+            return False
+        self.seen.add(canonical)
+        if canonical in self.known:
+            return False
+        self.jobs.append((canonical, *args))
+        return True
+
+    def __len__(self):
+        return len(self.jobs)
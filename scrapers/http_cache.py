@@ -0,0 +1,162 @@
+import os
+import json
+import hashlib
+import threading
+from time import time
+import httpUtils
+from scrapers import archive
+from logUtils import info, blue, reset
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+# entries not revalidated for this long are dropped
+MAX_AGE = 7*24*60*60
+# total size of all cached bodies
+MAX_SIZE = 500*1024*1024
+
+
+class HttpCache:
+    """
+    Persistent cache for pages that come with an ETag or Last-Modified header.
+    Cached pages are revalidated with a conditional GET and served from disk on 304.
+
+    Args:
+        path (str, optional): Directory the bodies and their meta files are stored in.
+        max_age (int, optional): Seconds after which an unused entry is evicted.
+        max_size (int, optional): Maximum size of all bodies in bytes, least recently used go first.
+    """
+    def __init__(self, path:str=CACHE_DIR, max_age:int=MAX_AGE, max_size:int=MAX_SIZE):
+        self.path = path
+        self.max_age = max_age
+        self.max_size = max_size
+        self.stats = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def _paths(self, url:str):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, key+'.body'), os.path.join(self.path, key+'.json')
+
+    def _count(self, source:str, key:str):
+        with self._lock:
+            if source not in self.stats:
+                self.stats[source] = {'hits': 0, 'misses': 0}
+            self.stats[source][key] += 1
+
+    def _load_meta(self, meta_path:str) -> dict:
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path:str, data, mode:str):
+        # write to a temp file first so concurrent readers never see half a file
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, mode) as f:
+            if mode == 'w':
+                json.dump(data, f)
+            else:
+                f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, url:str, source:str=None) -> str:
+        body_path, meta_path = self._paths(url)
+        meta = self._load_meta(meta_path)
+
+        headers = {}
+        if meta is not None and os.path.exists(body_path):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = httpUtils.get(url, headers=headers)
+
+        if response.status_code == 304 and len(headers) > 0:
+            try:
+                with open(body_path, 'rb') as f:
+                    content = f.read()
+                meta['used'] = time()
+                self._write(meta_path, meta, 'w')
+                self._count(source, 'hits')
+                return content.decode(meta.get('encoding') or 'utf-8', errors='replace')
+            except OSError:
+                # entry was evicted in the meantime
+                response = httpUtils.get(url)
+
+        if response.status_code in httpUtils.RETRY_STATUS:
+            # still failing after the retries of the session, the page is tried again on the next run
+            response.raise_for_status()
+
+        self._count(source, 'misses')
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code == 200 and (etag or last_modified):
+            self._write(body_path, response.content, 'wb')
+            self._write(meta_path, {
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'encoding': response.encoding,
+                'size': len(response.content),
+                'used': time(),
+            }, 'w')
+        return response.text
+
+    def evict(self):
+        now = time()
+        entries = []
+        for file_name in os.listdir(self.path):
+            if not file_name.endswith('.json'):
+                continue
+            meta_path = os.path.join(self.path, file_name)
+            meta = self._load_meta(meta_path)
+            body_path = meta_path[:-len('.json')]+'.body'
+            if meta is None or now-meta.get('used', 0) > self.max_age:
+                self._remove(body_path, meta_path)
+                continue
+            entries.append((meta.get('used', 0), meta.get('size', 0), body_path, meta_path))
+
+        total_size = sum(entry[1] for entry in entries)
+        for _, size, body_path, meta_path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self._remove(body_path, meta_path)
+            total_size -= size
+
+    def _remove(self, *paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def log_stats(self, source:str):
+        stats = self.stats.get(source, {'hits': 0, 'misses': 0})
+        info(f"{blue}HTTP cache {source}{reset}: {stats['hits']} hits, {stats['misses']} misses")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> HttpCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache()
+            _cache.evict()
+        return _cache
+
+def fetch(url:str, source:str=None) -> str:
+    """
+    Drop-in for httpUtils.get(url).text in the scrapers.
+    Every fetched page is archived, in replay mode pages come from the archive only.
+    """
+    if archive.replaying():
+        return archive.replay_fetch(url)
+    html = get_cache().get(url, source)
+    archive.store(url, html, source)
+    return html
+
+def log_stats(source:str):
+    get_cache().log_stats(source)
@@ -0,0 +1,127 @@
+from datetime import datetime
+import uuid
+from tqdm import tqdm
+from logUtils import warn, info, error, green, orange, reset, yellow
+from scrapers.twentymin_scraper import iter_20min
+from scrapers.blick_scraper import iter_blick
+from scrapers.taggi_scraper import iter_taggi
+from scrapers.zeit_scraper import iter_zeit
+from scrapers.scrape_pool import ScraperPool
+from scrapers import discovery
+from database.DB_manager import DBManager
+
+BLICK_NAME = 'Blick'
+TWENTYMIN_NAME = '20min'
+TAGI_NAME = 'Tagesanzeiger'
+ZEIT_NAME = 'die Zeit'
+
+# articles waiting for summarization, the scrapers block when it is full
+SCRAPE_QUEUE_SIZE = 64
+# seconds a source may work before it is cancelled, waiting on the full queue does not count
+SCRAPE_DEADLINES = {
+    TWENTYMIN_NAME: 45*60,
+    BLICK_NAME: 45*60,
+    TAGI_NAME: 45*60,
+    ZEIT_NAME: 45*60,
+}
+# articles written to the database at once
+INSERT_BATCH_SIZE = 10
+
+def process_article(article:dict, key:str, db:DBManager, summarizer) -> dict:
+    text = article['text']
+    if not db.pass_article_filters(article, key):
+        return None
+    if summarizer.get_token_count(text) > 3500:
+        text = summarizer.summarize(text, 3500/summarizer.get_token_count(text))
+    article['uid'] = str(uuid.uuid4())
+    article['source'] = key
+    res = summarizer.summarize_and_tag_gpt3(text)
+    if res is None or res == {}:
+        res = {
+            'summary': '',
+            'tags': []
+        }
+    article['summary'] = res['summary']
+    article['tags'] = ';'.join(res['tags'])
+    return article
+
+def insert_articles(db: DBManager, articles: list, key: str) -> int:
+    """
+    Writes a batch of articles of one source, returns the number of rows actually written.
+    A failing batch is logged and returns None, the other sources go on.
+    """
+    try:
+        return db.insert_many(articles, 'articles')
+    except Exception as e:
+        error(f'{orange}Error inserting {len(articles)} articles from {key}: {e}{reset}')
+        return None
+
+def scrape_newspapers(db: DBManager, summarizer):
+    pool = ScraperPool({
+            TWENTYMIN_NAME: iter_20min,
+            BLICK_NAME: iter_blick,
+            TAGI_NAME: iter_taggi,
+            ZEIT_NAME: iter_zeit,
+        },
+        deadlines=SCRAPE_DEADLINES,
+        queue_size=SCRAPE_QUEUE_SIZE,
+    )
+
+    # summarize and insert articles while the scrapers are still crawling,
+    # the scrapers fetch through a bounded FetchEngine and block on the bounded queue meanwhile
+    received = {key: 0 for key in pool.scrapers}
+    processed = {key: 0 for key in pool.scrapers}
+    inserted = {key: 0 for key in pool.scrapers}
+    # batches are kept per source to count the rows insert_many really wrote for each
+    pending = {key: [] for key in pool.scrapers}
+    insert_failed = set()
+
+    def flush(key):
+        written = insert_articles(db, pending[key], key)
+        pending[key] = []
+        if written is None:
+            insert_failed.add(key)
+        else:
+            inserted[key] += written
+
+    # the feeds are read from the last run on, taken before any scraper starts
+    started = discovery.now()
+    progress = tqdm(desc='Processing articles')
+    print('starting subprocesses...')
+    for key, article in pool.run():
+        received[key] += 1
+        progress.update(1)
+
+        article = process_article(article, key, db, summarizer)
+        if article is None:
+            continue
+        processed[key] += 1
+        pending[key].append(article)
+        if len(pending[key]) >= INSERT_BATCH_SIZE:
+            flush(key)
+    progress.close()
+
+    for key in pool.scrapers:
+        if len(pending[key]) > 0:
+            flush(key)
+
+    pool.log_status()
+    for key in pool.scrapers:
+        info(f'{green}{processed[key]} Articles Processed and {inserted[key]} Inserted from {key}{reset}')
+        # only advance the feed window if everything the source could fetch is stored, otherwise the
+        # missing articles would fall out of it for good. Articles that do not parse do not hold it back.
+        status = pool.status[key]
+        if status['state'] == 'done' and status['failed'] == 0 and key not in insert_failed:
+            discovery.set_last_run(key, started)
+        else:
+            warn(f'{orange}Not advancing the last run of {key}, its articles are looked for again next time{reset}')
+
+    twentymin_df = db.get_by_publish_date(TWENTYMIN_NAME, datetime.now().strftime("%Y-%m-%d"), columns=['uid'])
+    blick_df = db.get_by_publish_date(BLICK_NAME, datetime.now().strftime("%Y-%m-%d"), columns=['uid'])
+    tagi_df = db.get_by_publish_date(TAGI_NAME, datetime.now().strftime("%Y-%m-%d"), columns=['uid'])
+    zeit_df = db.get_by_publish_date(ZEIT_NAME, datetime.now().strftime("%Y-%m-%d"), columns=['uid'])
+
+    print(f'{yellow}Articles from Today: "20min": {len(twentymin_df)}, "blick": {len(blick_df)}, "tagi": {len(tagi_df)}, "zeit": {len(zeit_df)}{reset}')
+    if sum(len(df) for df in [twentymin_df, blick_df, tagi_df, zeit_df]) < 10:
+        warn(f'{orange}No articles found for today!{reset}')
+        exit(1) 
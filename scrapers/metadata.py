@@ -0,0 +1,134 @@
+import json
+from datetime import datetime
+
+# <meta> tags that carry the publication date, checked in order
+DATE_META_TAGS = [
+    ('property', 'article:published_time'),
+    ('itemprop', 'datePublished'),
+    ('name', 'publish-date'),
+    ('name', 'date'),
+    ('name', 'DC.date.issued'),
+]
+# <meta> tags that carry the author, checked in order
+AUTHOR_META_TAGS = [
+    ('name', 'author'),
+    ('property', 'article:author'),
+    ('name', 'twitter:creator'),
+]
+
+
+def parse_date(value) -> str:
+    """
+    Converts an ISO-8601 like date string into 'YYYY-MM-DD'. Returns None if it is not a date.
+    """
+    if not isinstance(value, str) or value.strip() == '':
+        return None
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).strftime('%Y-%m-%d')
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(value.split('T')[0][:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+def json_ld_objects(soup) -> list:
+    objects = []
+    for script in soup.find_all('script', {'type': 'application/ld+json'}):
+        try:
+            data = json.loads(script.string or '')
+        except ValueError:
+            continue
+        stack = data if isinstance(data, list) else [data]
+        while stack:
+            obj = stack.pop(0)
+            if isinstance(obj, list):
+                stack.extend(obj)
+            elif isinstance(obj, dict):
+                objects.append(obj)
+                if '@graph' in obj:
+                    stack.extend(obj['@graph'] if isinstance(obj['@graph'], list) else [obj['@graph']])
+    return objects
+
+def _author_name(author) -> str:
+    if isinstance(author, list):
+        for entry in author:
+            name = _author_name(entry)
+            if name is not None:
+                return name
+        return None
+    if isinstance(author, dict):
+        author = author.get('name')
+    if isinstance(author, str) and author.strip() != '':
+        return author.strip()
+    return None
+
+def _meta_content(soup, tags:list) -> str:
+    for attr, value in tags:
+        meta = soup.find('meta', {attr: value})
+        if meta is not None and meta.get('content'):
+            return meta['content']
+    return None
+
+def extract_publication_date(soup) -> str:
+    for obj in json_ld_objects(soup):
+        date = parse_date(obj.get('datePublished'))
+        if date is not None:
+            return date
+
+    date = parse_date(_meta_content(soup, DATE_META_TAGS))
+    if date is not None:
+        return date
+
+    for time_tag in soup.find_all('time'):
+        date = parse_date(time_tag.get('datetime'))
+        if date is not None:
+            return date
+    return None
+
+def extract_author(soup) -> str:
+    for obj in json_ld_objects(soup):
+        author = _author_name(obj.get('author'))
+        if author is not None:
+            return author
+
+    author = _meta_content(soup, AUTHOR_META_TAGS)
+    if author is not None and not author.startswith('http'):
+        return author.strip()
+    return None
+
+def newspaper_metadata(url:str, html:str):
+    """
+    Fallback for pages without structured metadata. Parses the already downloaded html with newspaper3k.
+    Returns (publication_date, author).
+    """
+    # imported lazily, newspaper3k is slow to import and only needed for the fallback
+    from newspaper import Article
+    article = Article(url)
+    article.download(input_html=html)
+    article.parse()
+    publication_date = article.publish_date.strftime('%Y-%m-%d') if article.publish_date is not None else None
+    author = article.authors[0] if len(article.authors) > 0 else None
+    return publication_date, author
+
+def extract_metadata(soup, url:str, html:str, with_author:bool=True):
+    """
+    Reads publication date and author from JSON-LD, <meta> and <time> tags of the parsed page.
+    newspaper3k is only used if one of them is missing. The date falls back to today.
+    Returns (publication_date, author).
+    """
+    publication_date = extract_publication_date(soup)
+    author = extract_author(soup) if with_author else None
+
+    if publication_date is None or (with_author and author is None):
+        try:
+            fallback_date, fallback_author = newspaper_metadata(url, html)
+        except Exception:
+            fallback_date, fallback_author = None, None
+        publication_date = publication_date or fallback_date
+        author = author or fallback_author
+
+    if publication_date is None:
+        publication_date = datetime.now().strftime('%Y-%m-%d')
+    return publication_date, author
@@ -0,0 +1,114 @@
+import re
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+try:
+    import lxml
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+
+# everything scrape_article needs: the body and the metadata tags (JSON-LD lives in <script>)
+ARTICLE_PARTS = SoupStrainer(['main', 'article', 'meta', 'time', 'script'])
+# category pages only need the links inside <main>
+CATEGORY_PARTS = SoupStrainer('main')
+
+
+def parse_html(html:str, only=None, parser:str=None) -> BeautifulSoup:
+    """
+    Parses html with the fastest available backend (lxml, html.parser as fallback).
+
+    Args:
+        html (str): The page to parse.
+        only (str | list | SoupStrainer, optional): Only build the tree for the matching top level tags.
+        parser (str, optional): Overrides the backend.
+    """
+    if only is not None and not isinstance(only, SoupStrainer):
+        only = SoupStrainer(only)
+    return BeautifulSoup(html, parser or PARSER, parse_only=only)
+
+
+# width of the rendered video, images are picked as close to it as possible
+TARGET_IMAGE_WIDTH = 1920
+# assumed css width of an article image if neither sizes nor width tell it
+DEFAULT_IMAGE_CSS_WIDTH = 960
+
+SIZES_PX = re.compile(r'(\d+(?:\.\d+)?)px\s*$')
+SRCSET_URL = re.compile(r'[\s,]*(\S*)')
+
+
+def parse_srcset(srcset:str) -> list:
+    """
+    Splits a srcset into (url, width, density), width or density is None depending on the descriptor.
+    Urls may contain commas (image CDNs use them in parameters), so it is not simply split on ','.
+    """
+    candidates = []
+    position = 0
+    while position < len(srcset):
+        match = SRCSET_URL.match(srcset, position)
+        url = match.group(1)
+        position = match.end()
+        if url == '':
+            break
+        if url.endswith(','):
+            # candidate without descriptor
+            descriptor = '1x'
+            url = url.rstrip(',')
+        else:
+            end = srcset.find(',', position)
+            end = len(srcset) if end == -1 else end
+            descriptor = srcset[position:end].strip() or '1x'
+            position = end+1
+        try:
+            if descriptor.endswith('w'):
+                candidates.append((url, int(descriptor[:-1]), None))
+            elif descriptor.endswith('x'):
+                candidates.append((url, None, float(descriptor[:-1])))
+        except ValueError:
+            continue
+    return candidates
+
+def _css_width(img:Tag, sizes:str=None) -> float:
+    # the last entry of sizes is the width without media condition
+    if sizes:
+        match = SIZES_PX.search(sizes.split(',')[-1].strip())
+        if match is not None:
+            return float(match.group(1))
+    width = img.get('width', '')
+    if width.isdigit():
+        return float(width)
+    return DEFAULT_IMAGE_CSS_WIDTH
+
+def best_image_src(img:Tag, base_url:str=None, target_width:int=TARGET_IMAGE_WIDTH) -> str:
+    """
+    Picks the candidate of an <img> (its srcset and the <source>s of a surrounding <picture>)
+    closest to target_width: the smallest one at least as wide, else the widest. None if there is none.
+
+    Args:
+        img (Tag): The <img> element.
+        base_url (str, optional): Page url relative candidates are resolved against.
+        target_width (int, optional): Width the image is rendered at.
+    """
+    sources = [img]
+    # lxml does not know <source> is a void element and nests the <img> inside it
+    picture = img.find_parent('picture')
+    if picture is not None:
+        sources = picture.find_all('source') + sources
+
+    candidates = []
+    for source in sources:
+        srcset = source.get('srcset') or source.get('data-srcset')
+        if not srcset:
+            continue
+        css_width = _css_width(img, source.get('sizes') or img.get('sizes'))
+        for url, width, density in parse_srcset(srcset):
+            candidates.append((url, width if width is not None else density*css_width))
+
+    if len(candidates) == 0:
+        src = img.get('src') or img.get('data-src')
+        return urljoin(base_url, src) if src and base_url else src
+
+    wide_enough = [candidate for candidate in candidates if candidate[1] >= target_width]
+    url = min(wide_enough, key=lambda c: c[1])[0] if wide_enough else max(candidates, key=lambda c: c[1])[0]
+    return urljoin(base_url, url) if base_url else url
@@ -0,0 +1,41 @@
+"""
+Re-parses the archived pages of a source without network access.
+
+Usage:
+    python -m scrapers.replay_cli <source> --from 2026-09-01 --to 2026-09-30 --out articles.jsonl
+
+Kept out of scrapers/archive.py: run with -m that module would be loaded a second time as __main__,
+and the replay mode set there would not be seen by http_cache and discovery.
+"""
+import json
+import argparse
+from time import time
+from datetime import datetime
+from scrapers import archive
+from logUtils import info, green, reset
+
+SOURCES = ['blick', '20min', 'tagesanzeiger', 'zeit']
+
+
+def main(argv:list=None):
+    parser = argparse.ArgumentParser(description='Re-parse archived pages without network access')
+    parser.add_argument('source', choices=SOURCES)
+    parser.add_argument('--from', dest='start', required=True, help='first day, YYYY-MM-DD')
+    parser.add_argument('--to', dest='end', default=None, help='last day, YYYY-MM-DD (default: first day)')
+    parser.add_argument('--out', default=None, help='write the articles as json lines')
+    args = parser.parse_args(argv)
+
+    start = datetime.fromisoformat(args.start)
+    end = datetime.fromisoformat(args.end) if args.end is not None else start
+    started = time()
+    articles = archive.replay(args.source, start, end)
+    info(f'{green}Re-parsed {len(articles)} articles of {args.source} in {time()-started:.1f}s{reset}')
+    if args.out is not None:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            for article in articles.values():
+                f.write(json.dumps(article, ensure_ascii=False)+'\n')
+    return articles
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+import multiprocessing as mp
+import queue as queue_module
+from time import time
+import httpUtils
+from logUtils import warn, info, error, green, orange, reset
+from database.DB_manager import DBManager
+
+# time a source may take before it is cancelled, time blocked on the full queue does not count
+DEFAULT_DEADLINE = 45*60
+# time a cancelled scraper gets to stop on its own before it is terminated
+CANCEL_GRACE = 15
+QUEUE_SIZE = 64
+
+
+def _put(queue, stop_event, message, blocked=None) -> bool:
+    try:
+        queue.put_nowait(message)
+        return True
+    except queue_module.Full:
+        pass
+    # blocked: [seconds blocked so far, start of the current block], shared with the parent
+    if blocked is not None:
+        blocked[1] = time()
+    try:
+        # never block forever on a full queue, the parent may have given up on this source
+        while True:
+            try:
+                queue.put(message, timeout=1)
+                return True
+            except queue_module.Full:
+                if stop_event.is_set():
+                    return False
+    finally:
+        if blocked is not None:
+            with blocked.get_lock():
+                blocked[0] += time()-blocked[1]
+                blocked[1] = 0
+
+def _worker(queue, stop_event, blocked, name, func):
+    db = DBManager()  # Create a new DBManager instance for each process
+    scraped = 0
+    failed = 0
+    try:
+        articles = func(db)
+        while True:
+            try:
+                article = next(articles)
+            except StopIteration as stop:
+                # the scrapers return the number of articles they could not fetch
+                failed = stop.value or 0
+                break
+            if stop_event.is_set() or not _put(queue, stop_event, ('article', name, article), blocked):
+                break
+            scraped += 1
+        if stop_event.is_set():
+            # the parent keeps reading until this process exits, the queued articles are flushed
+            return
+        httpUtils.log_stats()
+        _put(queue, stop_event, ('done', name, (scraped, failed)), blocked)
+    except Exception as e:
+        _put(queue, stop_event, ('error', name, f'{type(e).__name__}: {e}'), blocked)
+    finally:
+        db.close()
+
+
+class ScraperPool:
+    """
+    Runs every scraper in its own process and streams their articles back.
+    Every source ends with a status (done, error, timeout or crashed), a broken or slow
+    source costs at most its deadline and the articles it delivered until then are kept.
+    The deadline only counts the time a scraper works, not the time it waits for the
+    consumer on the full queue.
+
+    Args:
+        scrapers (dict): Source name to generator function taking a DBManager, it may return the number of failed articles.
+        deadlines (dict, optional): Source name to deadline in seconds.
+        queue_size (int, optional): Number of articles buffered between scrapers and consumer.
+    """
+    def __init__(self, scrapers:dict, deadlines:dict=None, queue_size:int=QUEUE_SIZE):
+        self.scrapers = scrapers
+        self.deadlines = {name: DEFAULT_DEADLINE for name in scrapers}
+        if deadlines is not None:
+            self.deadlines.update(deadlines)
+        self.queue = mp.Queue(maxsize=queue_size)
+        self.processes = {}
+        self.stop_events = {}
+        self.started = {}
+        self.blocked = {}
+        # cancelled source -> time it is terminated if it did not stop by then
+        self.cancelling = {}
+        self.status = {name: {'state': 'pending', 'articles': 0, 'failed': 0, 'error': None} for name in scrapers}
+
+    def _finish(self, name:str, state:str, error_msg:str=None):
+        self.status[name]['state'] = state
+        self.status[name]['error'] = error_msg
+
+    def cancel(self, name:str):
+        """
+        Asks the scraper to stop, it is terminated if it does not within CANCEL_GRACE.
+        Its queue is read on meanwhile, the articles it already queued are kept.
+        """
+        self.stop_events[name].set()
+        self.cancelling[name] = time()+CANCEL_GRACE
+
+    def _check_cancelled(self):
+        now = time()
+        for name, grace_end in list(self.cancelling.items()):
+            proc = self.processes[name]
+            if not proc.is_alive():
+                del self.cancelling[name]
+            elif now > grace_end:
+                warn(f'{orange}Terminating scraper {name}{reset}')
+                proc.terminate()
+                proc.join()
+                del self.cancelling[name]
+
+    def active_time(self, name:str, now:float=None) -> float:
+        """
+        Seconds the scraper has been running, minus the time it was blocked on the full queue.
+        """
+        now = time() if now is None else now
+        blocked = self.blocked[name]
+        with blocked.get_lock():
+            seconds, since = blocked[0], blocked[1]
+        if since > 0:
+            seconds += now-since
+        return now-self.started[name]-seconds
+
+    def _check_deadlines(self, pending:set):
+        now = time()
+        for name in list(pending):
+            if self.active_time(name, now) > self.deadlines[name]:
+                error(f'{orange}Scraper {name} exceeded its deadline of {self.deadlines[name]}s{reset}')
+                pending.discard(name)
+                self._finish(name, 'timeout', f'deadline of {self.deadlines[name]}s exceeded')
+                self.cancel(name)
+
+    def _check_crashed(self, pending:set):
+        # only called when the queue was empty, but a process may have sent 'done' and exited since
+        dead = [name for name in pending if not self.processes[name].is_alive()]
+        if len(dead) == 0:
+            return
+        while True:
+            try:
+                message = self.queue.get(timeout=0.1)
+            except queue_module.Empty:
+                break
+            yield from self._handle(message, pending)
+        for name in dead:
+            if name in pending:
+                proc = self.processes[name]
+                error(f'{orange}Scraper {name} died with exit code {proc.exitcode}{reset}')
+                pending.discard(name)
+                self._finish(name, 'crashed', f'exit code {proc.exitcode}')
+
+    def _handle(self, message:tuple, pending:set):
+        kind, name, payload = message
+        if kind == 'article':
+            # articles a source queued before it was cancelled are kept
+            self.status[name]['articles'] += 1
+            yield name, payload
+        elif name not in pending:
+            # late status of a cancelled source
+            return
+        elif kind == 'done':
+            pending.discard(name)
+            self._finish(name, 'done')
+            scraped, self.status[name]['failed'] = payload
+            info(f'{green}Scraped {scraped} articles from {name}{reset}')
+        elif kind == 'error':
+            pending.discard(name)
+            self._finish(name, 'error', payload)
+            error(f'{orange}Error scraping {name}: {payload}{reset}')
+
+    def run(self):
+        """
+        Starts all scrapers and yields (source name, article) until every source is finished.
+        """
+        for name, func in self.scrapers.items():
+            self.stop_events[name] = mp.Event()
+            self.blocked[name] = mp.Array('d', 2)
+            self.processes[name] = mp.Process(target=_worker, args=(self.queue, self.stop_events[name], self.blocked[name], name, func), name=f'scraper-{name}')
+            self.started[name] = time()
+            self.status[name]['state'] = 'running'
+            self.processes[name].start()
+
+        pending = set(self.scrapers)
+        try:
+            while len(pending) > 0 or len(self.cancelling) > 0:
+                self._check_deadlines(pending)
+                self._check_cancelled()
+                try:
+                    message = self.queue.get(timeout=1)
+                except queue_module.Empty:
+                    yield from self._check_crashed(pending)
+                    continue
+                yield from self._handle(message, pending)
+            yield from self._drain()
+        finally:
+            # also reached if the consumer stops early
+            for name in pending:
+                self._finish(name, 'cancelled')
+            self.shutdown()
+
+    def _drain(self):
+        # a cancelled source that exited may have left articles in the queue, finished sources sent theirs before 'done'
+        if all(status['state'] != 'timeout' for status in self.status.values()):
+            return
+        while True:
+            try:
+                kind, name, payload = self.queue.get(timeout=0.1)
+            except queue_module.Empty:
+                return
+            if kind == 'article':
+                self.status[name]['articles'] += 1
+                yield name, payload
+
+    def shutdown(self):
+        for name, proc in self.processes.items():
+            self.stop_events[name].set()
+        for name, proc in self.processes.items():
+            proc.join(timeout=CANCEL_GRACE)
+            if proc.is_alive():
+                warn(f'{orange}Process {proc.name} is still alive!{reset}')
+                proc.terminate()
+
+    def log_status(self):
+        for name, status in self.status.items():
+            msg = f"{name}: {status['state']} after {status['articles']} articles"
+            if status['failed'] > 0:
+                msg += f", {status['failed']} could not be fetched"
+            if status['error'] is not None:
+                msg += f" ({status['error']})"
+            if status['state'] == 'done':
+                info(f'{green}{msg}{reset}')
+            else:
+                warn(f'{orange}{msg}{reset}')
@@ -1,13 +1,15 @@
-import requests
-from bs4 import BeautifulSoup
 import json
 from logUtils import warn, info, error, green, blue, orange, reset, grey
 from sqlite3 import connect
 from datetime import datetime
 from sqlite3 import connect
-from newspaper import Article
+from scrapers.metadata import extract_metadata
+from scrapers.parsing import parse_html, best_image_src, ARTICLE_PARTS, CATEGORY_PARTS
+from scrapers import http_cache, crawl
 
 START_URL = 'https://www.tagesanzeiger.ch'
+SOURCE_NAME = 'Tagesanzeiger'
+FEED_URL = 'https://partner-feeds.publishing.tamedia.ch/rss/tagesanzeiger/{category}'
 CATEGORIES = [
     'wirtschaft',
     'meinungen',
@@ -35,10 +37,11 @@ def scrape2markdown(article_json):
             md += f'## {div["div"]}\n\n'
         elif div['type'] == 'image':
             img = div['div']
-            try:
-                md += f"![{img['alt']}]({img['src']})\n"
-            except KeyError:
-                md += f"![None]({img['src']})\n"
+            # the srcset candidate closest to the 1080p video
+            src = best_image_src(img, url)
+            if src is None:
+                continue
+            md += f"![{img.get('alt')}]({src})\n"
 
     return {
         'title': title,
@@ -53,23 +56,12 @@ def scrape2markdown(article_json):
 
 
 def scrape_article(url, category):
-    article = Article(url)
-    article.download()
-    article.parse()
-
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    html = http_cache.fetch(url, SOURCE_NAME)
+    soup = parse_html(html, ARTICLE_PARTS)
 
     main = soup.find('main')
 
-    if article.publish_date is None:
-        date_tag = main.find('time')
-        if date_tag is None:
-            publication_date = datetime.now().strftime('%Y-%m-%d')
-        else:
-            publication_date = date_tag['datetime'].split('T')[0]
-    else:
-        publication_date = article.publish_date.strftime('%Y-%m-%d')
+    publication_date, author = extract_metadata(soup, url, html)
 
     title = main.find('h2').text.replace('\n','')
     abstract = main.find('h3').text
@@ -104,7 +96,7 @@ def scrape_article(url, category):
         'title': title,
         'url': url,
         'category': category,
-        'author': article.authors[0] if len(article.authors) > 0 else None,
+        'author': author,
         'abstract': abstract,
         'publication_date': publication_date,
         'article_layout': article_layout
@@ -113,40 +105,32 @@ def scrape_article(url, category):
     return scrape2markdown(article_json)
 
 
-def scrape_taggi(db):
-    articles_json = []
+def category_links(category:str) -> list:
+    """
+    Links of a category page, used when the category has no feed.
+    """
+    url = f'{START_URL}/{category}'
+    html = http_cache.fetch(url, SOURCE_NAME)
+    soup = parse_html(html, CATEGORY_PARTS)
+
+    main = soup.find('main')
+    if main is None:
+        raise Exception(f'Error scraping {url}')
+    return [ a['href'] for a in main.find_all('a', href=True)]
+
+def is_article_url(url:str) -> bool:
+    return url.split('-')[-1].isnumeric()
+
+def iter_taggi(db):
+    """
+    Yields the scraped articles one by one as soon as they are fetched.
+    Returns the number of articles that could not be fetched.
+    """
     info('Starting scraping tagesanzeiger.ch')
-    for category in CATEGORIES:
-        url = f'{START_URL}/{category}'
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        main = soup.find('main')
-        if main is None:
-            raise Exception(f'Error scraping {url}')
-            continue
-        all_links = [ a['href'] for a in main.find_all('a')]
-        # remove duplicates
-        all_links = list(dict.fromkeys(all_links))
-        
-        for link in all_links:
-            try:
-                url = f'{START_URL}{link}'
-
-                if not url.split('-')[-1].isnumeric():
-                    continue
-                # check if article is already in database
-                if db.check_if_article_exists(url):
-                    continue
-
-                md = scrape_article(url, category)
-
-                articles_json.append(md)
-
-            except Exception as e:
-                error(f'Error scraping {url}: {e}')
-
-    return articles_json
+    return (yield from crawl.iter_source(db, SOURCE_NAME, START_URL, FEED_URL, CATEGORIES, category_links, is_article_url, scrape_article))
+
+def scrape_taggi(db):
+    return list(iter_taggi(db))
 
 
 
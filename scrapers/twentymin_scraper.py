@@ -1,13 +1,15 @@
-import requests
-from bs4 import BeautifulSoup
 import json
 from logUtils import warn, info, error, green, blue, orange, reset, grey
 from sqlite3 import connect
 from datetime import datetime
 from newspaper import Article
+from scrapers.parsing import parse_html, best_image_src, ARTICLE_PARTS
+from scrapers import http_cache, crawl
 
 
 START_URL = 'https://www.20min.ch'
+SOURCE_NAME = '20min'
+FEED_URL = 'https://partner-feeds.20min.ch/rss/20minuten/{category}'
 CATEGORIES = [
     'schweiz',
     'wirtschaft',
@@ -25,7 +27,7 @@ CATEGORIES = [
 ]
 
 def refine_article(article_json):
-    article_soup = BeautifulSoup(article_json['text'], 'html.parser')
+    article_soup = article_json['article']
 
     header_data = article_soup.find('header')
     header_json = {}
@@ -71,7 +73,7 @@ def refine_article(article_json):
         article_lineup.append(
             {
                 'class': element_class, 
-                'div': div.text if element_class == 'paragraph' or element_class == 'subheader' else div.prettify()
+                'div': div.text if element_class == 'paragraph' or element_class == 'subheader' else div
             }
         )
         
@@ -87,17 +89,19 @@ def refine_article(article_json):
 
 def process_other(div):
     text = ''
-    soup = BeautifulSoup(div, 'html.parser').findChildren('div', recursive=False)[0]
+    # div is the already parsed element of the article
+    soup = div
 
     if 'Slideshow' in soup.get('class')[0]:
         images = soup.find_all('img')
         if len(images) == 0:
             return ''
         for image in images:
-            try:
-                text += f"![{image['alt']}]({image['src']})\n"
-            except KeyError:
-                text += f"![None]({image['src']})\n"
+            # the srcset candidate closest to the 1080p video
+            src = best_image_src(image, START_URL)
+            if src is None:
+                continue
+            text += f"![{image.get('alt')}]({src})\n"
     else:
         pass
     
@@ -134,8 +138,8 @@ def article_refined2md(article):
     }
 
 def scrape_article(article_url, category):
-    art_response = requests.get(article_url)
-    art_soup = BeautifulSoup(art_response.text, 'html.parser', from_encoding='utf-8')
+    art_html = http_cache.fetch(article_url, SOURCE_NAME)
+    art_soup = parse_html(art_html, ARTICLE_PARTS)
     full_article = art_soup.find('article')
     if full_article is None:
         return None
@@ -153,7 +157,7 @@ def scrape_article(article_url, category):
         'abstract': summary,
         'url': article_url,
         'category': category,
-        'text': str(full_article)
+        'article': full_article
     }
 
     article_refined = refine_article(article_json)
@@ -163,30 +167,31 @@ def scrape_article(article_url, category):
     
     return article_md
 
-def scrape_20min(db):
+def category_links(category:str) -> list:
+    """
+    Links of a category page, used when the category has no feed.
+    """
+    url = f'{START_URL}/{category}'
+    html = http_cache.fetch(url, SOURCE_NAME)
+    soup = parse_html(html, 'article')
+
+    links = []
+    for article in soup.find_all('article'):
+        link = article.find('a', href=True)
+        if link is not None:
+            links.append(link['href'])
+    return links
+
+def is_article_url(url:str) -> bool:
+    return '/story/' in url
+
+def iter_20min(db):
+    """
+    Yields the scraped articles one by one as soon as they are fetched.
+    Returns the number of articles that could not be fetched.
+    """
     info('Starting scraping 20min.ch')
-    articles_json = []
-    for category in CATEGORIES:
-        url = f'{START_URL}/{category}'
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        for article in soup.find_all('article'):
-            part_url = article.find('a')['href']
-
-            if '/story/' not in part_url:
-                continue
-
-            article_url = START_URL+ part_url
+    return (yield from crawl.iter_source(db, SOURCE_NAME, START_URL, FEED_URL, CATEGORIES, category_links, is_article_url, scrape_article))
 
-            # check if article is already in database
-            if db.check_if_article_exists(article_url):
-                continue
-
-            article_md = scrape_article(article_url, category)
-            if article_md is None:
-                continue
-            articles_json.append(article_md)
-
-    return articles_json
-          
\ No newline at end of file
+def scrape_20min(db):
+    return list(iter_20min(db))
@@ -0,0 +1,36 @@
+import json
+import os
+import pytest
+from database.DB_manager import DBManager
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'config.json')
+
+
+@pytest.fixture
+def db_conf() -> dict:
+    with open(CONFIG) as f:
+        return json.load(f)
+
+@pytest.fixture
+def db(tmp_path):
+    db = DBManager(str(tmp_path/'news2noise.db'))
+    yield db
+    db.close()
+
+def make_article(i:int, **fields) -> dict:
+    article = {
+        'uid': f'uid-{i}',
+        'source': 'Blick',
+        'scrape_date': '2026-10-18',
+        'publication_date': '2026-10-18',
+        'category': 'schweiz',
+        'title': f'Artikel {i}',
+        'abstract': f'Zusammenfassung {i}',
+        'url': f'https://www.blick.ch/schweiz/artikel-id{i}.html',
+        'author': 'Anna Muster',
+        'text': f'Text des Artikels {i}. '*40,
+        'summary': f'Kurz {i}',
+        'tags': 'bundesrat;schweiz',
+    }
+    article.update(fields)
+    return article
@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import runpy
+import sqlite3
+import threading
+from datetime import datetime
+import pytest
+import requests
+import httpUtils
+from scrapers import archive, blick_scraper, http_cache
+from scrapers.archive import PageArchive
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'blick_article.html')
+CATEGORY_URL = 'https://www.blick.ch/schweiz'
+ARTICLE_URL = 'https://www.blick.ch/schweiz/bundesrat-beschliesst-neue-regeln-id123.html'
+CATEGORY_PAGE = '<html><body><main><a href="/schweiz/bundesrat-beschliesst-neue-regeln-id123.html">Bundesrat</a></main></body></html>'
+
+
+def at(day:int, hour:int=10) -> float:
+    return datetime(2026, 10, day, hour).timestamp()
+
+
+@pytest.fixture
+def page_archive(tmp_path, monkeypatch):
+    page_archive = PageArchive(str(tmp_path))
+    monkeypatch.setattr(archive, '_archive', page_archive)
+    monkeypatch.setattr(http_cache, 'log_stats', lambda source: None)
+    yield page_archive
+    archive.disable_replay()
+
+@pytest.fixture
+def no_network(monkeypatch):
+    def request(method, url, **kwargs):
+        raise requests.ConnectionError(f'no network for {url}')
+    monkeypatch.setattr(httpUtils, 'request', request)
+
+@pytest.fixture
+def article_html():
+    with open(FIXTURE, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_store_and_load(page_archive):
+    page_archive.store('https://a.example/1', 'first', 'A', fetched=at(1))
+    page_archive.store('https://a.example/1', 'second', 'A', fetched=at(2))
+    assert page_archive.load('https://a.example/1') == 'second'
+    assert page_archive.load('https://a.example/1', at(1, 12)) == 'first'
+    assert page_archive.load('https://a.example/1', at(1, 8)) is None
+
+def test_index_uses_the_pooled_connections(page_archive):
+    assert page_archive._connection() is page_archive._connection()
+    assert page_archive._connection().execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    threads = [threading.Thread(target=page_archive.store, args=(f'https://a.example/{i}', f'page {i}', 'A')) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [page_archive.load(f'https://a.example/{i}') for i in range(8)] == [f'page {i}' for i in range(8)]
+
+def test_pages_are_compressed_outside_the_write_lock(page_archive, monkeypatch):
+    compressor = archive.zstd.ZstdCompressor
+    locked = []
+    class Compressor:
+        def __init__(self, **kwargs):
+            self.compressor = compressor(**kwargs)
+
+        def compress(self, data):
+            # fails with 'database is locked' while a store holds the write transaction
+            conn = sqlite3.connect(os.path.join(page_archive.path, 'index.db'), timeout=0)
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.rollback()
+                locked.append(False)
+            except sqlite3.OperationalError:
+                locked.append(True)
+            finally:
+                conn.close()
+            return self.compressor.compress(data)
+    monkeypatch.setattr(archive.zstd, 'ZstdCompressor', Compressor)
+
+    page_archive.store('https://a.example/1', 'first', 'A', fetched=at(1))
+    page_archive.store('https://a.example/1', 'first', 'A', fetched=at(2))
+    page_archive.store('https://a.example/1', 'second', 'A', fetched=at(3))
+    assert locked == [False, False]
+    assert page_archive.load('https://a.example/1', at(2)) == 'first'
+    assert page_archive.load('https://a.example/1') == 'second'
+
+def test_store_compresses_a_version_stored_in_the_meantime(page_archive, monkeypatch):
+    page_archive.store('https://a.example/1', 'first', 'A', fetched=at(1))
+    # another process archived this very version after the check
+    monkeypatch.setattr(page_archive, '_last_sha1', lambda url: None)
+    page_archive.store('https://a.example/1', 'first', 'A', fetched=at(2))
+    monkeypatch.setattr(page_archive, '_last_sha1', lambda url: archive.hashlib.sha1(b'second').hexdigest())
+    page_archive.store('https://a.example/1', 'second', 'A', fetched=at(3))
+    assert page_archive.load('https://a.example/1', at(2)) == 'first'
+    assert page_archive.load('https://a.example/1') == 'second'
+    assert len(set(row[0] for row in page_archive._connection().execute('SELECT offset FROM pages'))) == 2
+
+def test_changes_by_day(page_archive):
+    page_archive.store('https://a.example/old', 'old', fetched=at(1))
+    page_archive.store('https://a.example/1', 'v1', fetched=at(2))
+    # fetched again unchanged, not a change
+    page_archive.store('https://a.example/1', 'v1', fetched=at(3))
+    page_archive.store('https://a.example/1', 'v2', fetched=at(4))
+    before, changed = page_archive.changes_by_day(datetime(2026, 10, 2), datetime(2026, 10, 5))
+    assert before == {'https://a.example/old'}
+    assert changed == {datetime(2026, 10, 2).date(): {'https://a.example/1'}, datetime(2026, 10, 4).date(): {'https://a.example/1'}}
+
+def test_replay_parses_every_version_once(page_archive, article_html, monkeypatch):
+    page_archive.store(CATEGORY_URL, CATEGORY_PAGE, 'Blick', fetched=at(1))
+    page_archive.store(ARTICLE_URL, article_html, 'Blick', fetched=at(1))
+    page_archive.store(ARTICLE_URL, article_html.replace('neue Regeln</div>', 'strengere Regeln</div>'), 'Blick', fetched=at(3))
+
+    parsed = []
+    scrape_article = blick_scraper.scrape_article
+    def counting_scrape_article(url, category):
+        parsed.append(url)
+        return scrape_article(url, category)
+    monkeypatch.setattr(blick_scraper, 'scrape_article', counting_scrape_article)
+
+    # starts before the first archived day, every category page is missing on it
+    articles = archive.replay('blick', datetime(2026, 9, 30), datetime(2026, 10, 3))
+    assert parsed == [ARTICLE_URL, ARTICLE_URL]
+    assert list(articles) == [ARTICLE_URL]
+    assert articles[ARTICLE_URL]['title'] == 'Bundesrat beschliesst strengere Regeln'
+    assert not archive.replaying()
+
+def test_replay_skips_days_that_are_not_archived(page_archive, monkeypatch):
+    def source(db):
+        html = http_cache.fetch('https://a.example/index')
+        yield {'url': 'https://a.example/index', 'text': html}
+    monkeypatch.setattr(archive, '_scrapers', lambda: {'a': source})
+    page_archive.store('https://a.example/index', 'index', fetched=at(2))
+
+    articles = archive.replay('a', datetime(2026, 10, 1), datetime(2026, 10, 2))
+    assert articles == {'https://a.example/index': {'url': 'https://a.example/index', 'text': 'index'}}
+
+def test_replay_treats_network_errors_as_not_archived(page_archive, no_network, monkeypatch):
+    def source(db):
+        # fetched past the archive
+        yield {'url': 'https://a.example/live', 'text': httpUtils.get('https://a.example/live').text}
+    monkeypatch.setattr(archive, '_scrapers', lambda: {'a': source})
+
+    assert archive.replay('a', datetime(2026, 10, 1), datetime(2026, 10, 2)) == {}
+    assert not archive.replaying()
+
+def test_replay_cli_reads_the_archive_only(page_archive, article_html, no_network, tmp_path, monkeypatch):
+    page_archive.store(CATEGORY_URL, CATEGORY_PAGE, 'Blick', fetched=at(1))
+    page_archive.store(ARTICLE_URL, article_html, 'Blick', fetched=at(1))
+    out = tmp_path/'articles.jsonl'
+
+    # run like python -m, the module is executed as __main__
+    monkeypatch.setattr(sys, 'argv', ['replay_cli', 'blick', '--from', '2026-10-01', '--out', str(out)])
+    sys.modules.pop('scrapers.replay_cli', None)
+    runpy.run_module('scrapers.replay_cli', run_name='__main__')
+
+    with open(out, encoding='utf-8') as f:
+        articles = [json.loads(line) for line in f]
+    assert [article['url'] for article in articles] == [ARTICLE_URL]
+    assert articles[0]['title'] == 'Bundesrat beschliesst neue Regeln'
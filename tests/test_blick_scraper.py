@@ -0,0 +1,27 @@
+import os
+import pytest
+from scrapers import blick_scraper, parsing
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'blick_article.html')
+URL = 'https://www.blick.ch/schweiz/bundesrat-beschliesst-neue-regeln-id123.html'
+
+
+@pytest.fixture
+def article_page(monkeypatch):
+    with open(FIXTURE, encoding='utf-8') as f:
+        html = f.read()
+    monkeypatch.setattr(blick_scraper.http_cache, 'fetch', lambda url, source_name: html)
+
+
+# lxml nests the <img> inside the <source> of a <picture>, html.parser does not
+@pytest.mark.parametrize('parser', ['lxml', 'html.parser'])
+def test_scrape_article_with_picture(article_page, monkeypatch, parser):
+    monkeypatch.setattr(parsing, 'PARSER', parser)
+    article = blick_scraper.scrape_article(URL, 'schweiz')
+
+    assert article['title'] == 'Bundesrat beschliesst neue Regeln'
+    assert article['author'] == 'Anna Muster'
+    assert article['publication_date'] == '2026-10-17'
+    assert '### Was sich ändert' in article['text']
+    # the 2x candidate (2048px) is the smallest one covering the 1080p video
+    assert '![Der Bundesrat in Bern](https://img.blick.ch/image/bundesrat.jpg?imwidth=2048&ratio=16_9)' in article['text']
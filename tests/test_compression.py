@@ -0,0 +1,45 @@
+import random
+import zstandard as zstd
+from database import compression
+from conftest import make_article
+
+WORDS = ['Bundesrat', 'Kanton', 'Zürich', 'Parlament', 'Abstimmung', 'Energie', 'Gesetz', 'Franken',
+         'Schweiz', 'Regierung', 'Wahlen', 'Gemeinde', 'Initiative', 'Vorlage', 'Partei', 'Budget']
+
+def article_text(rng:random.Random) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(80, 200)))+'.'
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path/'plain.db')
+    text = 'Der Bundesrat hat entschieden. '*20
+    value = compression.compress(text, path)
+    assert isinstance(value, bytes) and value.startswith(compression.MAGIC)
+    assert len(value) < len(text.encode('utf-8'))
+    assert compression.decompress(value, path) == text
+
+def test_short_and_other_values_stay_as_they_are(tmp_path):
+    path = str(tmp_path/'plain.db')
+    assert compression.compress('kurz', path) == 'kurz'
+    assert compression.compress(None, path) is None
+    assert compression.decompress('plain text from before the migration', path) == 'plain text from before the migration'
+    assert compression.decompress(b'\x89PNG', path) == b'\x89PNG'
+
+def test_dictionary_training_keeps_old_frames_readable(db):
+    rng = random.Random(1)
+    old_text = article_text(rng)
+    db.insert_many([make_article(0, text=old_text)], 'articles')
+    db.insert_many([make_article(i, text=article_text(rng)) for i in range(1, 400)], 'articles')
+
+    dict_id = db.train_compression_dictionary()
+    assert dict_id != 0
+    new_text = article_text(rng)+' Gotthardtunnel'
+    db.insert_many([make_article(400, text=new_text)], 'articles')
+
+    stored = db.conn.execute("SELECT text FROM articles WHERE uid='uid-400'").fetchone()[0]
+    assert zstd.get_frame_parameters(stored[len(compression.MAGIC):]).dict_id == dict_id
+    assert db.get_by_uid('articles', 'uid-400')['text'] == new_text
+    # compressed without a dictionary before it was trained
+    assert db.get_by_uid('articles', 'uid-0')['text'] == old_text
+    # the search index reads the columns through zstd_text
+    assert list(db.search('gotthardtunnel', columns=['uid'])['uid']) == ['uid-400']
@@ -0,0 +1,69 @@
+import gc
+import multiprocessing as mp
+import sqlite3
+import threading
+import pytest
+from database import DB_manager
+from database.DB_manager import get_connection
+from conftest import make_article
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    connections = []
+    connect = DB_manager._connect
+    def recording_connect(path):
+        conn = connect(path)
+        connections.append(conn)
+        return conn
+    monkeypatch.setattr(DB_manager, '_connect', recording_connect)
+    return connections
+
+def is_closed(conn:sqlite3.Connection) -> bool:
+    try:
+        conn.execute('SELECT 1')
+        return False
+    except sqlite3.ProgrammingError:
+        return True
+
+
+def test_one_connection_per_thread(db):
+    assert get_connection(db.DB_PATH) is get_connection(db.DB_PATH)
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_connection(db.DB_PATH)[0]))
+    thread.start()
+    thread.join()
+    assert other[0] is not db.conn
+
+def test_connections_are_closed_when_their_thread_ends(db, opened):
+    db.insert_many([make_article(i) for i in range(3)], 'articles')
+    counts = []
+    def request():
+        counts.append(len(db.get_all('articles', columns=['uid'])))
+
+    threads = [threading.Thread(target=request) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    del threads, thread
+    gc.collect()
+
+    assert counts == [3]*20
+    assert len(opened) == 20
+    assert all(is_closed(conn) for conn in opened)
+    # the connection of this thread is still open
+    assert not is_closed(db.conn)
+
+def _count_in_child(db, result):
+    result.put(len(db.get_all('articles', columns=['uid'])))
+
+def test_forked_process_opens_its_own_connection(db):
+    db.insert_many([make_article(1)], 'articles')
+    result = mp.get_context('fork').Queue()
+    process = mp.get_context('fork').Process(target=_count_in_child, args=(db, result))
+    process.start()
+    assert result.get(timeout=30) == 1
+    process.join()
+    # the child neither used nor closed the connection of the parent
+    assert len(db.get_all('articles', columns=['uid'])) == 1
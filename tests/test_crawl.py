@@ -0,0 +1,68 @@
+import pytest
+import requests
+from scrapers import crawl, discovery, archive, http_cache
+
+START_URL = 'https://news.example'
+FEEDS = {
+    'https://news.example/feed/inland': ['/inland/a-1', '/inland/a-2', 'https://news.example/inland/a-1/', '/inland/broken-4', '/about'],
+}
+CATEGORY_PAGES = {
+    'ausland': ['/ausland/b-1', '/inland/a-2', '/ausland/skip-3'],
+}
+
+
+class DB:
+    def get_known_urls(self) -> set:
+        return {'https://news.example/inland/a-2'}
+
+
+@pytest.fixture
+def source(monkeypatch):
+    read = []
+    def read_feed(feed_url, since, source):
+        read.append((feed_url, since, source))
+        return FEEDS.get(feed_url)
+    monkeypatch.setattr(discovery, 'read_feed', read_feed)
+    monkeypatch.setattr(discovery, 'get_last_run', lambda source: None)
+    monkeypatch.setattr(http_cache, 'log_stats', lambda source: None)
+    return read
+
+def category_links(category):
+    if category not in CATEGORY_PAGES:
+        raise archive.NotArchived(f'{category} is not in the archive')
+    return CATEGORY_PAGES[category]
+
+def scrape_article(url, category):
+    if url.endswith('-1'):
+        return {'url': url, 'category': category}
+    if 'skip' in url:
+        return None
+    if url.endswith('-2'):
+        raise requests.ConnectionError(url)
+    raise ValueError(url)
+
+def run(db, categories):
+    articles = crawl.iter_source(db, 'News', START_URL, START_URL+'/feed/{category}', categories,
+                                 category_links, lambda url: url.split('-')[-1].isnumeric(), scrape_article)
+    results = []
+    while True:
+        try:
+            results.append(next(articles))
+        except StopIteration as stop:
+            return sorted(results, key=lambda article: article['url']), stop.value
+
+def test_iter_source(source):
+    articles, failed = run(DB(), ['inland', 'ausland', 'missing'])
+    assert articles == [
+        {'url': 'https://news.example/ausland/b-1', 'category': 'ausland'},
+        {'url': 'https://news.example/inland/a-1', 'category': 'inland'},
+    ]
+    # a-2 is known, skip-3 is parsed to None, nothing failed
+    assert failed == 0
+    assert [feed_url for feed_url, _, _ in source] == [START_URL+'/feed/inland', START_URL+'/feed/ausland', START_URL+'/feed/missing']
+
+def test_iter_source_only_counts_fetch_failures(source):
+    articles, failed = run(None, ['inland'])
+    assert [article['url'] for article in articles] == ['https://news.example/inland/a-1']
+    # a-2 could not be fetched, broken-4 does not parse and would not next time either
+    assert failed == 1
@@ -0,0 +1,25 @@
+from database import DB_manager
+from conftest import make_article
+
+
+def test_get_by_uids_keeps_order_and_duplicates(db):
+    db.insert_many([make_article(i) for i in range(3)], 'articles')
+    records = db.get_by_uids('articles', ['uid-2', 'unknown', 'uid-0', 'uid-2'])
+    assert [record['uid'] if record else None for record in records] == ['uid-2', None, 'uid-0', 'uid-2']
+    # every position is its own copy
+    records[0]['title'] = 'changed'
+    assert records[3]['title'] == 'Artikel 2'
+
+def test_get_by_uids_queries_in_chunks(db, monkeypatch):
+    monkeypatch.setattr(DB_manager, 'MAX_VARIABLES', 2)
+    db.insert_many([make_article(i) for i in range(5)], 'articles')
+    uids = [f'uid-{i}' for i in range(5)]
+    assert [record['uid'] for record in db.get_by_uids('articles', uids)] == uids
+
+def test_record_cache_is_invalidated_on_write(db):
+    db.insert_many([make_article(1)], 'articles')
+    assert db.get_by_uid('articles', 'uid-1')['title'] == 'Artikel 1'
+    db.insert_many([make_article(1, title='Neuer Titel')], 'articles')
+    assert db.get_by_uids('articles', ['uid-1'])[0]['title'] == 'Neuer Titel'
+    db.remove_by_uid('articles', 'uid-1')
+    assert db.get_by_uid('articles', 'uid-1') is None
@@ -0,0 +1,34 @@
+import pytest
+from conftest import make_article
+
+
+def test_upsert_keeps_the_stored_uid(db):
+    db.insert_many([make_article(1), make_article(2)], 'articles')
+    # the same url scraped again under a new uid
+    db.insert_many([make_article(9, url=make_article(1)['url'], title='Neuer Titel')], 'articles')
+
+    assert len(db.get_all('articles', columns=['uid'])) == 2
+    assert db.get_by_uid('articles', 'uid-1')['title'] == 'Neuer Titel'
+    assert db.get_by_uid('articles', 'uid-9') is None
+
+def test_failing_batch_is_rolled_back(db):
+    broken = make_article(2)
+    del broken['tags']
+    with pytest.raises(Exception):
+        db.insert_many([make_article(1), broken], 'articles')
+    assert len(db.get_all('articles', columns=['uid'])) == 0
+
+def test_matches_upsert_on_uid(db):
+    match = {'uid': 'm1', 'date': '2026-10-18', 'articles': 'uid-1;uid-2', 'images': '', 'tags': 'bundesrat',
+             'input': 'input', 'title': 'Titel', 'script': 'script'}
+    db.insert_many([match], 'matches')
+    db.insert_many([dict(match, title='Neuer Titel')], 'matches')
+    matches = db.get_all('matches')
+    assert list(matches['title']) == ['Neuer Titel']
+
+def test_written_counts_only_the_upserted_rows(db):
+    # the search index triggers and the tag tables write rows as well, they are not counted
+    assert db.insert_many([make_article(i) for i in range(3)], 'articles') == 3
+    assert db.insert_many([make_article(1, title='Neuer Titel')], 'articles') == 1
+    assert db.insert_many([make_article(3), make_article(4)], 'articles') == 2
+    assert db.insert(make_article(5), 'articles')
@@ -0,0 +1,51 @@
+from datetime import datetime, timezone, timedelta
+import pytest
+from scrapers import discovery, archive
+
+SITEMAP = '''<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<url><loc>https://www.zeit.de/politik/new</loc><lastmod>2026-10-18T06:00:00Z</lastmod></url>
+<url><loc>https://www.zeit.de/politik/old</loc><lastmod>2026-10-10T06:00:00Z</lastmod></url>
+<url><loc>https://www.zeit.de/politik/undated</loc></url>
+</urlset>'''
+
+RSS = '''<?xml version="1.0"?>
+<rss version="2.0"><channel>
+<item><link>https://www.blick.ch/a-id1.html</link><pubDate>Sun, 18 Oct 2026 06:00:00 +0000</pubDate></item>
+</channel></rss>'''
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(discovery, 'STATE_DIR', str(tmp_path))
+    monkeypatch.setattr(archive, '_replay_at', None)
+    return tmp_path
+
+
+def test_last_run_round_trip(state_dir):
+    assert discovery.get_last_run('die Zeit') is None
+    started = datetime(2026, 10, 18, 6, 0, tzinfo=timezone.utc)
+    discovery.set_last_run('die Zeit', started)
+    assert discovery.get_last_run('die Zeit') == started
+
+def test_last_run_is_not_touched_in_replay(state_dir, monkeypatch):
+    monkeypatch.setattr(archive, '_replay_at', 'latest')
+    discovery.set_last_run('Blick', discovery.now())
+    assert list(state_dir.iterdir()) == []
+
+def test_read_feed_filters_by_lastmod(monkeypatch):
+    monkeypatch.setattr(discovery.http_cache, 'fetch', lambda url, source=None: SITEMAP)
+    since = datetime(2026, 10, 17, tzinfo=timezone.utc)
+    assert discovery.read_feed('https://www.zeit.de/sitemap.xml', since) == [
+        'https://www.zeit.de/politik/new', 'https://www.zeit.de/politik/undated']
+    # entries within the slack before the last run are still taken
+    since = datetime(2026, 10, 10, 6, 0, tzinfo=timezone.utc)+discovery.LASTMOD_SLACK-timedelta(minutes=1)
+    assert 'https://www.zeit.de/politik/old' in discovery.read_feed('https://www.zeit.de/sitemap.xml', since)
+
+def test_parse_rss():
+    kind, entries = discovery.parse_feed(RSS)
+    assert kind == 'urls'
+    assert entries == [('https://www.blick.ch/a-id1.html', datetime(2026, 10, 18, 6, 0, tzinfo=timezone.utc))]
+
+def test_no_feed():
+    assert discovery.parse_feed('<html><body>not found</body></html>') is None
@@ -0,0 +1,89 @@
+import threading
+import time
+from scrapers import fetch_engine
+from scrapers.fetch_engine import FetchEngine
+
+
+class Probe:
+    """
+    Job function that records how many calls run at the same time, in total and per host.
+    """
+    def __init__(self, delay:float=0.02):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = 0
+        self.host_running = {}
+        self.max_running = 0
+        self.max_host_running = {}
+
+    def __call__(self, url:str, value=None):
+        host = url.split('/')[2]
+        with self.lock:
+            self.running += 1
+            self.host_running[host] = self.host_running.get(host, 0)+1
+            self.max_running = max(self.max_running, self.running)
+            self.max_host_running[host] = max(self.max_host_running.get(host, 0), self.host_running[host])
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+            self.host_running[host] -= 1
+        if value == 'fail':
+            raise ValueError(url)
+        if value == 'offline':
+            raise ConnectionError(url)
+        return url
+
+
+def test_all_jobs_are_yielded_once():
+    jobs = [(f'https://a.example/{i}',) for i in range(20)]
+    results = [result for _, result in FetchEngine(8, 4).run(Probe(0), jobs)]
+    assert sorted(results) == sorted(job[0] for job in jobs)
+
+def test_failing_jobs_are_skipped():
+    jobs = [('https://a.example/1', None), ('https://a.example/2', 'fail'), ('https://a.example/3', None)]
+    engine = FetchEngine(4, 4)
+    results = [job[0] for job, _ in engine.run(Probe(0), jobs)]
+    assert sorted(results) == ['https://a.example/1', 'https://a.example/3']
+    assert engine.failed == [('https://a.example/2', 'fail')]
+    assert engine.transient == []
+
+def test_network_errors_are_transient():
+    jobs = [('https://a.example/1', 'offline'), ('https://a.example/2', 'fail'), ('https://a.example/3', None)]
+    engine = FetchEngine(4, 4)
+    list(engine.run(Probe(0), jobs))
+    assert sorted(engine.failed) == [('https://a.example/1', 'offline'), ('https://a.example/2', 'fail')]
+    assert engine.transient == [('https://a.example/1', 'offline')]
+
+def test_host_and_total_limits():
+    probe = Probe()
+    jobs = [(f'https://{host}.example/{i}',) for i in range(12) for host in ('a', 'b', 'c')]
+    assert len(list(FetchEngine(5, 2).run(probe, jobs))) == len(jobs)
+    assert probe.max_running <= 5
+    assert all(peak <= 2 for peak in probe.max_host_running.values())
+
+def test_single_host_uses_its_slots():
+    probe = Probe()
+    jobs = [(f'https://a.example/{i}',) for i in range(16)]
+    list(FetchEngine(16, 4).run(probe, jobs))
+    assert probe.max_host_running['a.example'] == 4
+
+def test_jobs_are_read_lazily():
+    pulled = []
+    def jobs():
+        for i in range(1000):
+            pulled.append(i)
+            yield (f'https://a.example/{i}',)
+
+    results = FetchEngine(4, 2).run(Probe(0), jobs())
+    for _ in range(3):
+        next(results)
+    # the running jobs plus the buffer of jobs waiting for their host, not the whole iterable
+    assert len(pulled) <= 3+4+4
+    results.close()
+
+def test_failures_are_logged_with_the_label(monkeypatch):
+    logged = []
+    monkeypatch.setattr(fetch_engine, 'error', logged.append)
+    list(FetchEngine(4, 4).run(Probe(0), [('https://a.example/1', 'fail')]))
+    list(FetchEngine(4, 4, label='hashing image').run(Probe(0), [('https://a.example/2', 'fail')]))
+    assert logged == ['Error scraping https://a.example/1: https://a.example/1', 'Error hashing image https://a.example/2: https://a.example/2']
@@ -0,0 +1,33 @@
+import pytest
+from scrapers.frontier import Frontier, canonicalize_url
+
+
+@pytest.mark.parametrize('url, base, expected', [
+    ('https://www.blick.ch/schweiz/a-id1.html', None, 'https://www.blick.ch/schweiz/a-id1.html'),
+    ('HTTPS://WWW.Blick.CH/schweiz/a-id1.html', None, 'https://www.blick.ch/schweiz/a-id1.html'),
+    ('https://www.blick.ch:443/schweiz/a-id1.html', None, 'https://www.blick.ch/schweiz/a-id1.html'),
+    ('https://www.blick.ch:8443/a.html', None, 'https://www.blick.ch:8443/a.html'),
+    ('https://www.blick.ch//schweiz///a-id1.html/', None, 'https://www.blick.ch/schweiz/a-id1.html'),
+    ('https://www.blick.ch/schweiz/a-id1.html?utm_source=rss#comments', None, 'https://www.blick.ch/schweiz/a-id1.html'),
+    ('/schweiz/a-id1.html', 'https://www.blick.ch', 'https://www.blick.ch/schweiz/a-id1.html'),
+    ('  a-id1.html ', 'https://www.blick.ch/schweiz/', 'https://www.blick.ch/schweiz/a-id1.html'),
+    ('https://www.blick.ch.', None, 'https://www.blick.ch/'),
+])
+def test_canonicalize_url(url, base, expected):
+    assert canonicalize_url(url, base) == expected
+
+def test_frontier_dedups_across_categories():
+    frontier = Frontier()
+    assert frontier.add('https://www.zeit.de/politik/a', 'politik')
+    assert not frontier.add('https://www.zeit.de/politik/a/?utm_medium=feed', 'wirtschaft')
+    assert frontier.add('https://www.zeit.de/politik/b', 'wirtschaft')
+    assert frontier.jobs == [('https://www.zeit.de/politik/a', 'politik'), ('https://www.zeit.de/politik/b', 'wirtschaft')]
+    assert frontier.duplicates == 1
+    assert len(frontier) == 2
+
+def test_frontier_skips_known_urls():
+    # stored urls from before canonicalization still match
+    frontier = Frontier({'https://WWW.zeit.de/politik/a/'})
+    assert not frontier.add('https://www.zeit.de/politik/a')
+    assert frontier.duplicates == 0
+    assert len(frontier) == 0
@@ -0,0 +1,71 @@
+import pytest
+import requests
+from scrapers import http_cache
+from scrapers.http_cache import HttpCache
+
+URL = 'https://www.blick.ch/schweiz'
+
+
+class Response:
+    def __init__(self, status_code:int, text:str='', headers:dict=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.encoding = 'utf-8'
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} error')
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """
+    Answers with the current page and its ETag, 304 if the client already has it.
+    """
+    state = {'page': '<main>v1</main>', 'etag': '"v1"', 'requests': []}
+    def get(url, headers=None, **kwargs):
+        headers = headers or {}
+        state['requests'].append(headers)
+        if state['etag'] is not None and headers.get('If-None-Match') == state['etag']:
+            return Response(304)
+        return Response(200, state['page'], {'ETag': state['etag']} if state['etag'] else {})
+    monkeypatch.setattr(http_cache.httpUtils, 'get', get)
+    return state
+
+
+def test_conditional_get(tmp_path, server):
+    cache = HttpCache(str(tmp_path))
+    assert cache.get(URL, 'Blick') == '<main>v1</main>'
+    assert cache.get(URL, 'Blick') == '<main>v1</main>'
+    assert server['requests'][1] == {'If-None-Match': '"v1"'}
+    assert cache.stats['Blick'] == {'hits': 1, 'misses': 1}
+
+    server['page'], server['etag'] = '<main>v2</main>', '"v2"'
+    assert cache.get(URL, 'Blick') == '<main>v2</main>'
+    assert cache.stats['Blick'] == {'hits': 1, 'misses': 2}
+
+def test_pages_without_validators_are_not_stored(tmp_path, server):
+    server['etag'] = None
+    cache = HttpCache(str(tmp_path))
+    cache.get(URL)
+    cache.get(URL)
+    assert server['requests'] == [{}, {}]
+    assert list(tmp_path.iterdir()) == []
+
+def test_evict_by_size(tmp_path, server):
+    cache = HttpCache(str(tmp_path), max_size=len('<main>v1</main>')+1)
+    cache.get(URL)
+    cache.get(URL+'/politik')
+    cache.evict()
+    assert len([path for path in tmp_path.iterdir() if path.suffix == '.body']) == 1
+
+def test_server_errors_raise(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache.httpUtils, 'get', lambda url, **kwargs: Response(503, 'busy'))
+    cache = HttpCache(str(tmp_path))
+    with pytest.raises(requests.HTTPError):
+        cache.get(URL)
+    # a missing page is a page like any other, the scraper decides
+    monkeypatch.setattr(http_cache.httpUtils, 'get', lambda url, **kwargs: Response(404, 'not found'))
+    assert cache.get(URL) == 'not found'
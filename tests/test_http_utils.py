@@ -0,0 +1,38 @@
+import pytest
+import httpUtils
+
+
+@pytest.fixture(autouse=True)
+def fresh_session(monkeypatch):
+    monkeypatch.setattr(httpUtils, '_session', None)
+    monkeypatch.setattr(httpUtils, '_session_pid', None)
+
+
+def test_session_retries_and_pool():
+    adapter = httpUtils.get_session().get_adapter('https://www.blick.ch/')
+    retry = adapter.max_retries
+    assert retry.total == httpUtils.MAX_RETRIES
+    assert retry.backoff_factor == httpUtils.BACKOFF_FACTOR
+    assert set(retry.status_forcelist) == set(httpUtils.RETRY_STATUS)
+    # POSTs are never retried
+    assert retry.allowed_methods == frozenset(['GET', 'HEAD'])
+    assert not retry.raise_on_status
+    assert adapter._pool_connections == httpUtils.POOL_CONNECTIONS
+    assert adapter._pool_maxsize == httpUtils.POOL_MAXSIZE
+    assert httpUtils.get_session().get_adapter('http://www.blick.ch/') is adapter
+
+def test_session_is_shared_per_process(monkeypatch):
+    session = httpUtils.get_session()
+    assert httpUtils.get_session() is session
+    # after a fork
+    monkeypatch.setattr(httpUtils, '_session_pid', -1)
+    assert httpUtils.get_session() is not session
+
+def test_new_sessions_are_independent():
+    shared = httpUtils.get_session()
+    session = httpUtils.new_session()
+    assert session is not shared
+    assert session.get_adapter('https://www.blick.ch/') is not shared.get_adapter('https://www.blick.ch/')
+    assert session.get_adapter('https://api.openai.com/').max_retries.total == httpUtils.MAX_RETRIES
+    session.close()
+    assert httpUtils.get_session() is shared
@@ -0,0 +1,101 @@
+import os
+from io import BytesIO
+import pytest
+from PIL import Image
+import imageUtils
+from scrapers import fetch_engine
+from imageUtils import ImageCache
+
+
+def png(color:tuple, size:tuple=(64, 48)) -> bytes:
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+IMAGES = {
+    'https://img.example/red.png': png((255, 0, 0)),
+    'https://img.example/red-copy.png': png((255, 0, 0)),
+    'https://img.example/green.png': png((0, 255, 0)),
+    'https://img.example/blue.png': png((0, 0, 255)),
+}
+
+
+class Response:
+    def __init__(self, content:bytes):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    downloaded = []
+    def get(url, **kwargs):
+        downloaded.append(url)
+        if url not in IMAGES:
+            raise OSError(url)
+        return Response(IMAGES[url])
+    monkeypatch.setattr(imageUtils.httpUtils, 'get', get)
+    return downloaded
+
+def recorded_size(cache:ImageCache) -> int:
+    return cache._connection().execute('SELECT SUM(size) FROM image_files').fetchone()[0]
+
+def files_size(cache:ImageCache) -> int:
+    return sum(os.path.getsize(os.path.join(cache.path, name)) for name in os.listdir(cache.path) if not name.startswith('index.db'))
+
+
+def test_same_image_is_stored_once(tmp_path, downloads):
+    cache = ImageCache(str(tmp_path))
+    red = cache.get('https://img.example/red.png')
+    assert cache.get('https://img.example/red-copy.png') == red
+    assert cache.get('https://img.example/red.png') == red
+    assert downloads == ['https://img.example/red.png', 'https://img.example/red-copy.png']
+
+def test_variants_are_resized_and_counted(tmp_path, downloads):
+    cache = ImageCache(str(tmp_path))
+    path = cache.get('https://img.example/green.png', 'thumb')
+    assert Image.open(path).size == imageUtils.VARIANTS['thumb']
+    assert recorded_size(cache) == files_size(cache)
+
+def test_hits_do_not_scan_the_directory(tmp_path, downloads, monkeypatch):
+    cache = ImageCache(str(tmp_path))
+    cache.get('https://img.example/green.png', 'thumb')
+    def listdir(path):
+        raise AssertionError('listdir on a cache hit')
+    monkeypatch.setattr(imageUtils.os, 'listdir', listdir)
+    cache.get('https://img.example/green.png', 'thumb')
+    cache.get('https://img.example/green.png')
+
+def test_budget_is_checked_on_write(tmp_path, downloads):
+    one_image = len(IMAGES['https://img.example/red.png'])
+    cache = ImageCache(str(tmp_path), max_size=2*one_image+one_image//2)
+    cache.get('https://img.example/red.png')
+    cache.get('https://img.example/green.png')
+    # red is used again, green is now the least recently used
+    cache.get('https://img.example/red.png')
+    cache.get('https://img.example/blue.png')
+
+    assert recorded_size(cache) <= cache.max_size
+    assert recorded_size(cache) == files_size(cache)
+    assert cache._lookup('https://img.example/green.png') is None
+    assert cache._lookup('https://img.example/red.png') is not None
+    assert cache._lookup('https://img.example/blue.png') is not None
+
+def test_prefetch(tmp_path, downloads, monkeypatch):
+    logged = []
+    monkeypatch.setattr(fetch_engine, 'error', logged.append)
+    cache = ImageCache(str(tmp_path))
+    cache.prefetch(['https://img.example/red.png', 'https://img.example/missing.png', 'https://img.example/red.png'], ['thumb'])
+    assert sorted(downloads) == ['https://img.example/missing.png', 'https://img.example/red.png']
+    assert os.path.exists(cache.get('https://img.example/red.png', 'thumb'))
+    assert len(logged) == 1 and logged[0].startswith('Error downloading image https://img.example/missing.png')
+
+def test_index_uses_the_pooled_connections(tmp_path, downloads):
+    cache = ImageCache(str(tmp_path))
+    assert cache._connection() is cache._connection()
+    assert cache._connection().execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    # written from the engine threads, each with its own connection
+    cache.prefetch(['https://img.example/red.png', 'https://img.example/green.png', 'https://img.example/blue.png'], ['thumb'])
+    assert recorded_size(cache) == files_size(cache)
@@ -0,0 +1,80 @@
+from io import BytesIO
+import pytest
+from PIL import Image
+import imageUtils
+from scrapers import fetch_engine
+from imageUtils import ImageCache, dhash, hamming_distance
+
+
+def gradient(size:tuple=(90, 60), reverse:bool=False) -> Image.Image:
+    img = Image.new('L', size)
+    img.putdata([(255-x*255//size[0]) if reverse else x*255//size[0] for y in range(size[1]) for x in range(size[0])])
+    return img.convert('RGB')
+
+def checkerboard(size:tuple=(90, 60)) -> Image.Image:
+    img = Image.new('L', size)
+    img.putdata([255*((x//10+y//10) % 2) for y in range(size[1]) for x in range(size[0])])
+    return img.convert('RGB')
+
+def encode(img:Image.Image, fmt:str) -> bytes:
+    buffer = BytesIO()
+    img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+IMAGES = {
+    'https://a.example/photo.png': encode(gradient(), 'PNG'),
+    # the same agency photo, smaller and recompressed on another site
+    'https://b.example/photo-small.jpg': encode(gradient((45, 30)), 'JPEG'),
+    'https://a.example/other.png': encode(gradient(reverse=True), 'PNG'),
+    'https://a.example/board.png': encode(checkerboard(), 'PNG'),
+}
+
+
+def test_dhash_survives_resizing_and_recompression():
+    original = dhash(gradient())
+    copy = dhash(Image.open(BytesIO(IMAGES['https://b.example/photo-small.jpg'])))
+    assert hamming_distance(original, copy) <= imageUtils.DHASH_MAX_DISTANCE
+    assert hamming_distance(original, dhash(gradient(reverse=True))) > imageUtils.DHASH_MAX_DISTANCE
+    assert hamming_distance(0b1011, 0b0110) == 3
+
+
+class Response:
+    def __init__(self, content:bytes):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def image_cache(tmp_path, monkeypatch):
+    def get(url, **kwargs):
+        if url not in IMAGES:
+            raise OSError(url)
+        return Response(IMAGES[url])
+    monkeypatch.setattr(imageUtils.httpUtils, 'get', get)
+    cache = ImageCache(str(tmp_path))
+    monkeypatch.setattr(imageUtils, 'get_image_cache', lambda: cache)
+    return cache
+
+def test_dedup_images(image_cache, monkeypatch):
+    logged = []
+    monkeypatch.setattr(fetch_engine, 'error', logged.append)
+    images = [
+        {'txt': 'photo', 'url': 'https://a.example/photo.png'},
+        {'txt': 'board', 'url': 'https://a.example/board.png'},
+        {'txt': 'photo again', 'url': 'https://b.example/photo-small.jpg'},
+        {'txt': 'other', 'url': 'https://a.example/other.png'},
+        {'txt': 'broken', 'url': 'https://a.example/missing.png'},
+        {'txt': 'broken again', 'url': 'https://a.example/missing.png'},
+        {'txt': 'photo twice', 'url': 'https://a.example/photo.png'},
+    ]
+    assert [image['txt'] for image in imageUtils.dedup_images(images)] == ['photo', 'board', 'other', 'broken']
+    assert len(logged) == 1 and logged[0].startswith('Error hashing image https://a.example/missing.png')
+
+def test_hashes_are_stored(image_cache):
+    url = 'https://a.example/board.png'
+    value = image_cache.dhash(url)
+    assert value == dhash(checkerboard())
+    row = image_cache._connection().execute('SELECT dhash FROM image_hashes').fetchone()
+    assert int(row[0], 16) == value
@@ -0,0 +1,83 @@
+import threading
+import pytest
+import requests
+import imageUtils
+from scrapers import fetch_engine
+from imageUtils import ImageValidationCache
+
+
+class Response:
+    def __init__(self, status_code:int, headers:dict):
+        self.status_code = status_code
+        self.headers = headers
+        self.ok = status_code < 400
+
+    def close(self):
+        pass
+
+# url -> (HEAD answer, ranged GET answer)
+SERVER = {
+    'https://img.example/a.jpg': (Response(200, {'Content-Type': 'image/jpeg', 'Content-Length': '1234'}), None),
+    'https://img.example/page.html': (Response(200, {'Content-Type': 'text/html; charset=utf-8'}), None),
+    'https://img.example/no-head.png': (Response(405, {}), Response(206, {'Content-Type': 'image/png', 'Content-Range': 'bytes 0-0/5678'})),
+    'https://img.example/gone.jpg': (Response(404, {'Content-Type': 'text/html'}), None),
+}
+
+
+@pytest.fixture
+def requests_made(tmp_path, monkeypatch):
+    made = []
+    def head(url, **kwargs):
+        made.append(('HEAD', url))
+        if url == 'https://down.example/x.jpg':
+            raise requests.ConnectionError(url)
+        return SERVER[url][0]
+    def get(url, **kwargs):
+        made.append(('GET', url))
+        return SERVER[url][1]
+    monkeypatch.setattr(imageUtils.httpUtils, 'head', head)
+    monkeypatch.setattr(imageUtils.httpUtils, 'get', get)
+    monkeypatch.setattr(imageUtils, '_cache', ImageValidationCache(str(tmp_path)))
+    return made
+
+
+def test_check_image(requests_made):
+    assert imageUtils.check_image('https://img.example/a.jpg') == \
+        {'url': 'https://img.example/a.jpg', 'valid': True, 'content_type': 'image/jpeg', 'size': 1234}
+    assert imageUtils.check_image('https://img.example/page.html')['valid'] is False
+    assert imageUtils.check_image('https://img.example/gone.jpg')['valid'] is False
+    # HEAD not allowed, the first byte is fetched instead
+    assert imageUtils.check_image('https://img.example/no-head.png') == \
+        {'url': 'https://img.example/no-head.png', 'valid': True, 'content_type': 'image/png', 'size': 5678}
+    assert ('GET', 'https://img.example/no-head.png') in requests_made
+
+def test_results_are_cached_but_unreachable_urls_are_not(requests_made):
+    urls = list(SERVER)+['https://down.example/x.jpg', 'https://img.example/a.jpg']
+    results = imageUtils.validate_images(urls)
+    assert {url for url, result in results.items() if result['valid']} == {'https://img.example/a.jpg', 'https://img.example/no-head.png'}
+    assert len([r for r in requests_made if r[0] == 'HEAD']) == 5
+
+    requests_made.clear()
+    assert imageUtils.validate_images(urls) == results
+    assert requests_made == [('HEAD', 'https://down.example/x.jpg')]
+
+def test_failures_are_not_logged_as_scraping(requests_made, monkeypatch):
+    logged = []
+    monkeypatch.setattr(fetch_engine, 'error', logged.append)
+    # not a request error, the engine catches it
+    monkeypatch.setattr(imageUtils, 'check_image', lambda url: int(url))
+    assert imageUtils.validate_images(['https://img.example/a.jpg']) == {}
+    assert len(logged) == 1 and logged[0].startswith('Error validating image https://img.example/a.jpg')
+
+def test_cache_uses_the_pooled_connections(tmp_path):
+    cache = ImageValidationCache(str(tmp_path))
+    assert cache._connection() is cache._connection()
+    assert cache._connection().execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    other = []
+    def lookup():
+        cache.get_many(['https://img.example/a.jpg'])
+        other.append(cache._connection())
+    thread = threading.Thread(target=lookup)
+    thread.start()
+    thread.join()
+    assert other[0] is not cache._connection()
@@ -0,0 +1,87 @@
+import time
+from datetime import datetime
+import pytest
+from conftest import make_article
+from scrapers import ingest, scrape_pool, discovery
+
+TODAY = datetime.now().strftime('%Y-%m-%d')
+
+
+class NoDB:
+    def close(self):
+        pass
+
+class Summarizer:
+    def get_token_count(self, text:str) -> int:
+        return len(text.split())
+
+    def summarize(self, text:str, ratio:float) -> str:
+        raise AssertionError('the test articles are short')
+
+    def summarize_and_tag_gpt3(self, text:str) -> dict:
+        return {'summary': text[:50], 'tags': ['schweiz', 'test']}
+
+
+def articles(source:str, count:int):
+    for i in range(count):
+        # slow enough for the sources to interleave
+        time.sleep(0.01)
+        yield make_article(i, url=f'https://{source}.example/{i}', publication_date=TODAY, text=f'Text {source} {i}. '*80)
+
+def twelve(db):
+    yield from articles('twentymin', 12)
+
+def five_and_one_failed(db):
+    yield from articles('blick', 5)
+    return 1
+
+def twelve_not_stored(db):
+    yield from articles('taggi', 12)
+
+def nothing(db):
+    return
+    yield
+
+def two_then_error(db):
+    yield from articles('zeit', 2)
+    raise ValueError('layout changed')
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    # the scrapers run in forked processes, they inherit the patched modules
+    monkeypatch.setattr(scrape_pool, 'DBManager', NoDB)
+    monkeypatch.setattr(ingest, 'iter_20min', twelve)
+    monkeypatch.setattr(ingest, 'iter_blick', five_and_one_failed)
+    monkeypatch.setattr(ingest, 'iter_taggi', twelve_not_stored)
+    monkeypatch.setattr(ingest, 'iter_zeit', two_then_error)
+    advanced = []
+    monkeypatch.setattr(discovery, 'set_last_run', lambda source, started: advanced.append(source))
+    return advanced
+
+def test_scrape_newspapers(db, runs, monkeypatch):
+    batches = []
+    insert_many = db.insert_many
+    def failing_insert_many(rows, table_name):
+        batches.append({row['source'] for row in rows})
+        if rows[0]['source'] == ingest.TAGI_NAME:
+            raise RuntimeError('disk full')
+        return insert_many(rows, table_name)
+    monkeypatch.setattr(db, 'insert_many', failing_insert_many)
+
+    ingest.scrape_newspapers(db, Summarizer())
+
+    # every batch holds the articles of one source, even though the sources arrive interleaved
+    assert all(len(sources) == 1 for sources in batches)
+    assert len(batches) == 2+1+2+1
+    stored = {source: len(db.get_by_publish_date(source, TODAY, columns=['uid'])) for source in ingest.SCRAPE_DEADLINES}
+    assert stored == {ingest.TWENTYMIN_NAME: 12, ingest.BLICK_NAME: 5, ingest.TAGI_NAME: 0, ingest.ZEIT_NAME: 2}
+    # blick could not fetch an article, taggi could not store its, zeit broke off
+    assert runs == [ingest.TWENTYMIN_NAME]
+
+def test_too_few_articles_today(db, runs, monkeypatch):
+    monkeypatch.setattr(ingest, 'iter_20min', nothing)
+    monkeypatch.setattr(ingest, 'iter_taggi', nothing)
+    # 7 articles, the run stops before matching
+    with pytest.raises(SystemExit):
+        ingest.scrape_newspapers(db, Summarizer())
@@ -0,0 +1,16 @@
+from scrapers.frontier import Frontier
+from conftest import make_article
+
+
+def test_known_urls_and_exists(db):
+    db.insert_many([make_article(1), make_article(2)], 'articles')
+    assert db.get_known_urls() == {make_article(1)['url'], make_article(2)['url']}
+    assert db.check_if_article_exists(make_article(1)['url'])
+    assert not db.check_if_article_exists(make_article(3)['url'])
+
+def test_scrapers_skip_stored_articles(db):
+    db.insert_many([make_article(1)], 'articles')
+    frontier = Frontier(db.get_known_urls())
+    assert not frontier.add(make_article(1)['url'], 'schweiz')
+    assert frontier.add(make_article(2)['url'], 'schweiz')
+    assert frontier.jobs == [(make_article(2)['url'], 'schweiz')]
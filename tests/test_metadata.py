@@ -0,0 +1,36 @@
+import pytest
+from scrapers.metadata import extract_metadata, parse_date
+from scrapers.parsing import parse_html
+
+URL = 'https://www.20min.ch/story/artikel-123'
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2026-10-17T08:15:00+02:00', '2026-10-17'),
+    ('2026-10-17T06:15:00Z', '2026-10-17'),
+    ('2026-10-17', '2026-10-17'),
+    ('2026-10-17T08:15:00.123+0200', '2026-10-17'),
+    ('gestern', None),
+    ('', None),
+    (None, None),
+])
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+def test_json_ld_graph():
+    html = '''<html><head><script type="application/ld+json">
+    {"@context": "https://schema.org", "@graph": [{"@type": "WebPage"},
+     {"@type": "NewsArticle", "datePublished": "2026-10-16T20:00:00Z", "author": [{"@type": "Person", "name": "Anna Muster"}]}]}
+    </script></head><body></body></html>'''
+    assert extract_metadata(parse_html(html), URL, html) == ('2026-10-16', 'Anna Muster')
+
+def test_meta_and_time_tags():
+    html = '''<html><head><meta name="author" content="Beat Beispiel">
+    <meta name="author" content="https://www.20min.ch/autor"></head>
+    <body><time datetime="2026-10-15T10:00:00+02:00">vor 3 Tagen</time></body></html>'''
+    assert extract_metadata(parse_html(html), URL, html) == ('2026-10-15', 'Beat Beispiel')
+
+def test_broken_json_ld_is_skipped():
+    html = '''<html><head><script type="application/ld+json">{not json</script>
+    <meta property="article:published_time" content="2026-10-14T10:00:00Z"></head></html>'''
+    assert extract_metadata(parse_html(html), URL, html, with_author=False) == ('2026-10-14', None)
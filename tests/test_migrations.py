@@ -0,0 +1,76 @@
+import sqlite3
+import threading
+import time
+from database import migrations
+from database.DB_manager import DBManager
+from conftest import make_article
+
+
+def test_concurrent_migrations_run_once(tmp_path, db_conf, monkeypatch):
+    calls = []
+    def step(name):
+        def migration(conn, conf):
+            calls.append(name)
+            # long enough for the other connection to try the same step
+            time.sleep(0.2)
+        migration.__name__ = name
+        return migration
+    monkeypatch.setattr(migrations, 'MIGRATIONS', [step('first'), step('second')])
+
+    path = str(tmp_path/'old.db')
+    sqlite3.connect(path).close()
+    barrier = threading.Barrier(2)
+    versions = []
+    def open_old_file():
+        conn = sqlite3.connect(path, timeout=30)
+        barrier.wait()
+        versions.append(migrations.migrate(conn, db_conf))
+        conn.close()
+
+    threads = [threading.Thread(target=open_old_file) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ['first', 'second']
+    assert versions == [2, 2]
+
+def test_failing_migration_keeps_the_version(tmp_path, db_conf, monkeypatch):
+    def broken(conn, conf):
+        conn.execute('CREATE TABLE half_done (x)')
+        raise ValueError('broken')
+    monkeypatch.setattr(migrations, 'MIGRATIONS', [broken])
+    conn = sqlite3.connect(str(tmp_path/'old.db'))
+    try:
+        migrations.migrate(conn, db_conf)
+        assert False, 'migrate did not raise'
+    except ValueError:
+        pass
+    assert migrations.get_version(conn) == 0
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name='half_done'").fetchone()[0] == 0
+
+def test_old_database_is_upgraded(tmp_path, db_conf):
+    # the schema before config.json declared primary keys and indexes
+    path = str(tmp_path/'news2noise.db')
+    conn = sqlite3.connect(path)
+    for key, table in db_conf['TABLES'].items():
+        conn.execute(migrations.table_definition(table, db_conf['FIELDS'][key]))
+    fields = [field['name'] for field in db_conf['FIELDS']['articles']]
+    articles = [make_article(1), make_article(2), make_article(3, url=make_article(1)['url'])]
+    conn.executemany(f'INSERT INTO articles VALUES ({", ".join("?"*len(fields))})', [tuple(a[f] for f in fields) for a in articles])
+    conn.commit()
+    conn.close()
+
+    db = DBManager(path)
+    try:
+        assert migrations.get_version(db.conn) == len(migrations.MIGRATIONS)
+        # the article scraped twice is only kept once, the first one wins
+        assert sorted(db.get_known_urls()) == sorted(a['url'] for a in articles[:2])
+        assert db.conn.execute("SELECT pk FROM pragma_table_info('articles') WHERE name='uid'").fetchone()[0] == 1
+        assert db.conn.execute('SELECT COUNT(*) FROM article_tags').fetchone()[0] == 4
+        # the long text is stored compressed and read back as is
+        assert db.conn.execute("SELECT typeof(text) FROM articles WHERE uid='uid-1'").fetchone()[0] == 'blob'
+        assert db.get_by_uid('articles', 'uid-1')['text'] == articles[0]['text']
+        assert list(db.search('Artikels 2')['uid']) == ['uid-2']
+    finally:
+        db.close()
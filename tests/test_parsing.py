@@ -0,0 +1,41 @@
+import pytest
+from scrapers.parsing import parse_html, parse_srcset, best_image_src
+
+
+@pytest.mark.parametrize('srcset, expected', [
+    ('a.jpg 640w, b.jpg 1280w', [('a.jpg', 640, None), ('b.jpg', 1280, None)]),
+    ('a.jpg 1x,b.jpg 2x', [('a.jpg', None, 1.0), ('b.jpg', None, 2.0)]),
+    ('a.jpg', [('a.jpg', None, 1.0)]),
+    ('a.jpg, b.jpg 2x', [('a.jpg', None, 1.0), ('b.jpg', None, 2.0)]),
+    # image CDNs put commas into their parameters
+    ('https://cdn.example/img/w_640,h_360/a.jpg 640w, https://cdn.example/img/w_1920,h_1080/a.jpg 1920w',
+     [('https://cdn.example/img/w_640,h_360/a.jpg', 640, None), ('https://cdn.example/img/w_1920,h_1080/a.jpg', 1920, None)]),
+    ('a.jpg 640q, b.jpg 2x', [('b.jpg', None, 2.0)]),
+    ('', []),
+])
+def test_parse_srcset(srcset, expected):
+    assert parse_srcset(srcset) == expected
+
+def img(html:str):
+    return parse_html(html).find('img')
+
+def test_smallest_candidate_covering_the_target():
+    tag = img('<img src="s.jpg" srcset="a.jpg 640w, b.jpg 2048w, c.jpg 4096w">')
+    assert best_image_src(tag) == 'b.jpg'
+
+def test_widest_candidate_if_none_is_wide_enough():
+    tag = img('<img src="s.jpg" srcset="a.jpg 640w, b.jpg 1280w">')
+    assert best_image_src(tag) == 'b.jpg'
+
+def test_density_uses_sizes():
+    # 2x of a 1000px slot is 2000px, 1x is not wide enough
+    tag = img('<img srcset="a.jpg 1x, b.jpg 2x, c.jpg 3x" sizes="(max-width: 600px) 100vw, 1000px">')
+    assert best_image_src(tag) == 'b.jpg'
+
+def test_picture_sources_and_relative_urls():
+    tag = img('<picture><source srcset="/a.jpg 1x, /b.jpg 2x"><img src="/s.jpg" alt=""></picture>')
+    assert best_image_src(tag, 'https://www.blick.ch/schweiz/x.html') == 'https://www.blick.ch/b.jpg'
+
+def test_src_without_srcset():
+    assert best_image_src(img('<img data-src="/lazy.jpg">'), 'https://www.zeit.de/a') == 'https://www.zeit.de/lazy.jpg'
+    assert best_image_src(img('<img alt="no source">')) is None
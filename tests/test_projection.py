@@ -0,0 +1,34 @@
+import pandas as pd
+from conftest import make_article
+
+
+def test_columns_are_projected(db):
+    db.insert_many([make_article(i) for i in range(3)], 'articles')
+    today = db.get_by_publish_date('Blick', '2026-10-18', columns=['uid', 'title'])
+    assert list(today.columns) == ['uid', 'title']
+    assert sorted(today['uid']) == ['uid-0', 'uid-1', 'uid-2']
+    assert list(db.get_all('articles', limit=1).columns) == db.PRAGMAS['articles']
+
+def test_unknown_column_is_rejected(db):
+    try:
+        db.get_all('articles', columns=['uid', 'uid; DROP TABLE articles'])
+        assert False, 'unknown column accepted'
+    except Exception as e:
+        assert 'not in articles' in str(e)
+
+def test_chunked_iteration(db):
+    db.insert_many([make_article(i) for i in range(7)], 'articles')
+    chunks = list(db.get_all('articles', columns=['uid', 'text'], chunksize=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    everything = pd.concat(chunks)
+    assert sorted(everything['uid']) == [f'uid-{i}' for i in range(7)]
+    # compressed columns are decompressed chunk by chunk
+    assert set(everything['text']) == {make_article(i)['text'] for i in range(7)}
+
+def test_queries_run_while_chunks_are_consumed(db):
+    db.insert_many([make_article(i) for i in range(4)], 'articles')
+    seen = []
+    for chunk in db.get_all('articles', columns=['uid'], chunksize=2):
+        for uid in chunk['uid']:
+            seen.append(db.get_by_uid('articles', uid)['uid'])
+    assert sorted(seen) == [f'uid-{i}' for i in range(4)]
@@ -0,0 +1,63 @@
+import pytest
+from conftest import make_article
+
+
+def match(uid:str, date:str='2026-10-18', title:str='Titel') -> dict:
+    return {'uid': uid, 'date': date, 'articles': 'uid-1;uid-2', 'images': '', 'tags': 'bundesrat',
+            'input': 'Eingabe '*50, 'title': title, 'script': 'Skript '*50}
+
+@pytest.fixture
+def matches(db):
+    db.insert_many([match('m1'), match('m2', title='Zweiter'), match('m3', date='2026-10-17')], 'matches')
+    return db
+
+
+def test_to_sql_binds_every_value(db):
+    sql, params = db.query('matches').select('uid').where('date', '=', '2026-10-18').where('uid', 'in', ['m1', 'm2']) \
+        .order_by('uid', descending=True).limit(5).to_sql()
+    assert sql == 'SELECT uid FROM matches WHERE date = ? AND uid IN (?, ?) ORDER BY uid DESC LIMIT ?'
+    assert params == ['2026-10-18', 'm1', 'm2', 5]
+
+def test_fetch(matches):
+    today = matches.query('matches').where('date', '=', '2026-10-18').order_by('uid').fetch()
+    assert list(today['uid']) == ['m1', 'm2']
+    # compressed columns come back as text
+    assert today['script'][0] == 'Skript '*50
+    assert list(matches.query('matches').where('title', 'like', 'Zw%').select('uid').fetch()['uid']) == ['m2']
+    assert len(matches.query('matches').where('uid', 'in', []).fetch()) == 0
+    assert len(matches.query('matches').where('uid', 'not in', []).fetch()) == 3
+
+def test_fetch_chunks(matches):
+    chunks = list(matches.query('matches').select('uid').order_by('uid').fetch(chunksize=2))
+    assert [list(chunk['uid']) for chunk in chunks] == [['m1', 'm2'], ['m3']]
+
+def test_values_are_never_sql(matches):
+    assert len(matches.query('matches').where('date', '=', "2026-10-18' OR '1'='1").fetch()) == 0
+    assert len(matches.query('matches').fetch()) == 3
+
+def test_delete(matches):
+    assert matches.query('matches').where('date', '<', '2026-10-18').delete() == 1
+    assert sorted(matches.query('matches').fetch()['uid']) == ['m1', 'm2']
+    with pytest.raises(Exception):
+        matches.query('matches').delete()
+
+def test_delete_articles_cleans_up_tags(db):
+    db.insert_many([make_article(1), make_article(2)], 'articles')
+    assert db.query('articles').where('uid', '=', 'uid-1').delete() == 1
+    assert db.conn.execute("SELECT COUNT(*) FROM article_tags WHERE article_uid='uid-1'").fetchone()[0] == 0
+    assert db.get_by_uid('articles', 'uid-1') is None
+
+@pytest.mark.parametrize('build, error', [
+    (lambda q: q.where('uid; DROP TABLE matches', '=', 'x'), Exception),
+    (lambda q: q.where('uid', 'or', 'x'), Exception),
+    (lambda q: q.where('uid', '=', ['x']), TypeError),
+    (lambda q: q.select('nope'), Exception),
+    (lambda q: q.order_by('uid DESC; --'), Exception),
+])
+def test_invalid_queries_are_rejected(db, build, error):
+    with pytest.raises(error):
+        build(db.query('matches'))
+
+def test_unknown_table(db):
+    with pytest.raises(Exception):
+        db.query('sqlite_master')
@@ -0,0 +1,118 @@
+import os
+import time
+import pytest
+from scrapers import scrape_pool
+from scrapers.scrape_pool import ScraperPool
+
+
+class NoDB:
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def no_database(monkeypatch):
+    # the scrapers run in forked processes, they inherit the patched module
+    monkeypatch.setattr(scrape_pool, 'DBManager', NoDB)
+    monkeypatch.setattr(scrape_pool, 'CANCEL_GRACE', 1)
+
+
+def five_articles(db):
+    for i in range(5):
+        yield {'url': f'https://a.example/{i}'}
+
+def three_then_hang(db):
+    for i in range(3):
+        yield {'url': f'https://b.example/{i}'}
+    while True:
+        time.sleep(0.05)
+
+def two_of_three(db):
+    yield {'url': 'https://d.example/0'}
+    yield {'url': 'https://d.example/1'}
+    return 1
+
+def broken(db):
+    yield {'url': 'https://c.example/0'}
+    raise ValueError('layout changed')
+
+
+def test_blocked_time_does_not_count_against_the_deadline():
+    pool = ScraperPool({'a': five_articles}, deadlines={'a': 1}, queue_size=1)
+    received = []
+    for name, article in pool.run():
+        received.append(article['url'])
+        # a slow consumer, the scraper spends most of the time blocked on the full queue
+        time.sleep(0.5)
+    assert len(received) == 5
+    assert pool.status['a']['state'] == 'done'
+
+def test_cancelled_source_keeps_queued_articles():
+    pool = ScraperPool({'b': three_then_hang}, deadlines={'b': 0.5})
+    received = []
+    for name, article in pool.run():
+        received.append(article['url'])
+        if len(received) == 1:
+            # the deadline passes while the other two articles wait in the queue
+            time.sleep(1)
+    assert received == [f'https://b.example/{i}' for i in range(3)]
+    assert pool.status['b']['state'] == 'timeout'
+    assert pool.status['b']['articles'] == 3
+
+def test_error_status_and_partial_results():
+    pool = ScraperPool({'a': five_articles, 'c': broken})
+    received = [name for name, _ in pool.run()]
+    assert received.count('a') == 5 and received.count('c') == 1
+    assert pool.status['a']['state'] == 'done'
+    assert pool.status['c']['state'] == 'error'
+    assert 'layout changed' in pool.status['c']['error']
+
+def test_failed_fetches_are_reported():
+    pool = ScraperPool({'d': two_of_three})
+    assert len(list(pool.run())) == 2
+    assert pool.status['d']['state'] == 'done'
+    assert pool.status['d']['failed'] == 1
+
+class LateQueue:
+    """
+    Times out on the first get until every scraper exited, like a worker that sends 'done'
+    and exits between the timeout of the parent and its liveness check.
+    """
+    def __init__(self, queue, pool):
+        self.queue = queue
+        self.pool = pool
+        self.delayed = False
+
+    def put_nowait(self, message):
+        self.queue.put_nowait(message)
+
+    def put(self, message, timeout=None):
+        self.queue.put(message, timeout=timeout)
+
+    def get(self, timeout=None):
+        if not self.delayed:
+            self.delayed = True
+            for proc in self.pool.processes.values():
+                proc.join()
+            raise scrape_pool.queue_module.Empty
+        return self.queue.get(timeout=timeout)
+
+def test_exit_right_after_done_is_not_a_crash():
+    pool = ScraperPool({'a': five_articles, 'd': two_of_three})
+    pool.queue = LateQueue(pool.queue, pool)
+    received = [name for name, _ in pool.run()]
+    assert received.count('a') == 5 and received.count('d') == 2
+    assert pool.status['a']['state'] == 'done'
+    assert pool.status['d']['state'] == 'done'
+    assert pool.status['d']['failed'] == 1
+
+def test_dead_scraper_without_status_crashed():
+    def dies(db):
+        yield {'url': 'https://e.example/0'}
+        # let the queue flush the article, then die without a status
+        time.sleep(0.2)
+        os._exit(3)
+    pool = ScraperPool({'e': dies})
+    assert len(list(pool.run())) == 1
+    assert pool.status['e']['state'] == 'crashed'
+    assert pool.status['e']['error'] == 'exit code 3'
@@ -0,0 +1,63 @@
+import os
+import sys
+import json
+import queue
+import types
+import hashlib
+import pytest
+import httpUtils
+from scrapers import http_cache, archive, discovery
+from benchmarks import scraper_benchmark
+from benchmarks.fixture_server import FixtureServer
+
+PAGES = {
+    'https://news.example/a': '<main>a</main>',
+    'https://news.example/b': '<main>b</main>',
+}
+
+
+@pytest.fixture
+def fixture_server(tmp_path):
+    fixture_dir = tmp_path/'fixtures'
+    os.makedirs(fixture_dir/'pages')
+    index = {}
+    for url, html in PAGES.items():
+        index[url] = hashlib.sha1(url.encode('utf-8')).hexdigest()+'.html'
+        (fixture_dir/'pages'/index[url]).write_text(html, encoding='utf-8')
+    (fixture_dir/'index.json').write_text(json.dumps(index))
+    server = FixtureServer(str(fixture_dir)).start()
+    yield server
+    server.stop()
+    httpUtils.clear_host_overrides()
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    # _run_source normally owns its process, put back what it replaces
+    for module, name in ((httpUtils, 'request'), (http_cache, 'fetch'), (http_cache, '_cache'), (archive, '_archive'), (discovery, 'STATE_DIR')):
+        monkeypatch.setattr(module, name, getattr(module, name))
+    monkeypatch.setattr(scraper_benchmark.tempfile, 'mkdtemp', lambda prefix: str(tmp_path/'work'))
+
+    module = types.ModuleType('benchmark_source')
+    def scrape_article(url, category):
+        return {'url': url, 'text': http_cache.fetch(url)}
+    def iter_source(db):
+        # the feed was never recorded, the source falls back to its article list
+        http_cache.fetch('https://news.example/feed.xml')
+        for url in PAGES:
+            yield module.scrape_article(url, 'news')
+    module.scrape_article = scrape_article
+    module.iter_source = iter_source
+    monkeypatch.setitem(sys.modules, 'benchmark_source', module)
+    monkeypatch.setitem(scraper_benchmark.SOURCES, 'news', ('benchmark_source', 'iter_source'))
+
+def test_missing_pages_do_not_count_as_loaded(fixture_server, source):
+    results = queue.Queue()
+    scraper_benchmark._run_source('news', fixture_server.base_url, fixture_server.hosts, results)
+    name, stats = results.get_nowait()
+    assert name == 'news'
+    assert stats['articles'] == 2
+    assert stats['pages'] == 2
+    assert stats['missing_pages'] == 1
+    # seconds is rounded to ms
+    assert stats['pages_per_sec'] == pytest.approx(2/stats['seconds'], rel=0.1)
+    assert fixture_server.served == 2 and fixture_server.missing == 1
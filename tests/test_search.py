@@ -0,0 +1,71 @@
+from conftest import make_article
+
+
+def uids(results) -> list:
+    return list(results['uid'])
+
+
+def test_search_ranks_title_hits_first(db):
+    db.insert_many([
+        make_article(1, title='Wetter in Bern', text='Auch der Bundesrat spricht über das Wetter. '+'Es regnet. '*40),
+        make_article(2, title='Bundesrat entscheidet', text='Der Entscheid des Bundesrats fiel am Freitag. '*20),
+        make_article(3, title='Sport', text='Fussball am Wochenende. '*20),
+    ]+[make_article(i) for i in range(4, 10)], 'articles')
+    assert uids(db.search('bundesrat')) == ['uid-2', 'uid-1']
+    assert uids(db.search('bundesrat fussball')) == []
+
+def test_search_prefix_accents_and_quotes(db):
+    db.insert_many([make_article(1, title='Zürich wählt'), make_article(2, title='Basel')], 'articles')
+    assert uids(db.search('zurich')) == ['uid-1']
+    assert uids(db.search('wäh*')) == ['uid-1']
+    # fts query syntax in user input is searched for literally
+    assert uids(db.search('"zürich OR basel')) == []
+    assert uids(db.search('  ')) == []
+
+def test_search_index_follows_writes(db):
+    db.insert_many([make_article(1, title='Alter Titel')], 'articles')
+    db.insert_many([make_article(1, title='Neuer Titel')], 'articles')
+    assert uids(db.search('alter')) == []
+    assert uids(db.search('neuer')) == ['uid-1']
+    db.remove_by_uid('articles', 'uid-1')
+    assert uids(db.search('neuer')) == []
+    # raises if the index and the articles disagree
+    db.conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('integrity-check')")
+
+def test_search_since(db):
+    db.insert_many([make_article(1, title='Bundesrat', publication_date='2026-10-01'),
+                    make_article(2, title='Bundesrat', publication_date='2026-10-18')], 'articles')
+    assert uids(db.search('bundesrat', since='2026-10-10')) == ['uid-2']
+
+def test_more_like_this(db):
+    db.insert_many([
+        make_article(1, title='Bundesrat beschliesst Energiegesetz', abstract='Solaranlagen Pflicht', summary='Energiegesetz Solaranlagen'),
+        make_article(2, title='Energiegesetz: Kritik an Solaranlagen Pflicht', abstract='Parteien reagieren'),
+        make_article(3, title='Fussball Cup', abstract='Basel gewinnt'),
+    ], 'articles')
+    assert uids(db.more_like_this('uid-1')) == ['uid-2']
+    assert uids(db.more_like_this('unknown')) == []
+
+def count_decompressions(monkeypatch) -> list:
+    from database import compression
+    calls = []
+    decompress = compression.decompress
+    def counting_decompress(value, path):
+        if isinstance(value, bytes) and value.startswith(compression.MAGIC):
+            calls.append(value)
+        return decompress(value, path)
+    monkeypatch.setattr(compression, 'decompress', counting_decompress)
+    return calls
+
+def test_projected_search_does_not_decompress(db, monkeypatch):
+    db.insert_many([make_article(1, title='Bundesrat', summary='Der Bundesrat hat entschieden. '*20),
+                    make_article(2, title='Energiegesetz Bundesrat')], 'articles')
+    calls = count_decompressions(monkeypatch)
+    results = db.search('bundesrat', columns=['uid', 'title'])
+    assert list(results.columns) == ['uid', 'title', 'score']
+    assert len(results) == 2
+    related = db.more_like_this('uid-2', columns=['uid', 'title'])
+    assert list(related.columns) == ['uid', 'title', 'score']
+    assert calls == []
+    # all columns, decompressed
+    assert db.search('bundesrat')['text'][0] == make_article(1)['text']
@@ -0,0 +1,38 @@
+from database import migrations
+from conftest import make_article
+
+
+def jaccard(a:str, b:str) -> float:
+    a, b = set(migrations.split_tags(a)), set(migrations.split_tags(b))
+    return len(a & b)/len(a | b)
+
+
+def test_split_tags():
+    assert migrations.split_tags(' Bundesrat;schweiz ;; BUNDESRAT;Bern') == ['bundesrat', 'schweiz', 'bern']
+    assert migrations.split_tags(None) == []
+
+def test_tag_overlaps_match_the_python_jaccard(db):
+    tags = ['bundesrat;schweiz;bern', 'bundesrat;bern', 'fussball;schweiz', 'wetter', 'Bundesrat;Wahlen']
+    articles = [make_article(i, tags=t, publication_date='2026-10-18' if i < 3 else '2026-10-17') for i, t in enumerate(tags)]
+    db.insert_many(articles, 'articles')
+
+    overlaps = {(uid, other): shared/(n+n_other-shared) for uid, other, shared, n, n_other in
+                db.get_tag_overlaps('2026-10-18', '2026-10-17')}
+    expected = {}
+    for a in articles:
+        if a['publication_date'] != '2026-10-18':
+            continue
+        for b in articles:
+            score = jaccard(a['tags'], b['tags'])
+            if score > 0:
+                expected[(a['uid'], b['uid'])] = score
+    assert overlaps == expected
+
+def test_min_score_and_updates(db):
+    db.insert_many([make_article(1, tags='a;b'), make_article(2, tags='a;c;d')], 'articles')
+    assert {(u, o) for u, o, *_ in db.get_tag_overlaps('2026-10-18', '2026-10-18', 0.5)} == {('uid-1', 'uid-1'), ('uid-2', 'uid-2')}
+    # the tags of a rescraped article replace the old ones
+    db.insert_many([make_article(2, tags='x')], 'articles')
+    assert {(u, o) for u, o, *_ in db.get_tag_overlaps('2026-10-18', '2026-10-18')} == {('uid-1', 'uid-1'), ('uid-2', 'uid-2')}
+    db.remove_by_uid('articles', 'uid-2')
+    assert db.conn.execute("SELECT COUNT(*) FROM article_tags WHERE article_uid='uid-2'").fetchone()[0] == 0
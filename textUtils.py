@@ -10,10 +10,13 @@ from random import choice
 from mysecrets.mysecrets import AZURE_KEY, AZURE_REGION, OPENAI_KEY, GOOGLE_APPLICATION_CREDENTIALS, GOOGLE_AUTH
 import json
 from transformers import GPT2TokenizerFast
-import urllib.request 
+import httpUtils
+import imageUtils
 tokenizer = GPT2TokenizerFast.from_pretrained('gpt2')
 
 openai.api_key = OPENAI_KEY
+# openai closes and replaces the sessions it is handed, it gets its own instead of the shared one
+openai.requestssession = httpUtils.new_session
 os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = GOOGLE_APPLICATION_CREDENTIALS
 
 ALLOWED_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZäöüÄÖÜß .,;:!?-&()[]{}#\""
@@ -162,7 +165,8 @@ class SummarizManager:
             try:
                 response = openai.ChatCompletion.create(
                     model="gpt-3.5-turbo",
-                    messages=chat
+                    messages=chat,
+                    request_timeout=httpUtils.LLM_TIMEOUT
                 )
                 resp_json = json.loads(response['choices'][0]['message']['content'])
                 if "summary" in resp_json and "tags" in resp_json:
@@ -194,7 +198,8 @@ class SummarizManager:
         for _ in range(5):
             response = openai.ChatCompletion.create(
                 model="gpt-4",
-                messages=chat
+                messages=chat,
+                request_timeout=httpUtils.LLM_TIMEOUT
             )
             answer = response['choices'][0]['message']['content'] 
             try:
@@ -222,7 +227,8 @@ class SummarizManager:
                             {"role": "user", "content": GPT_PRIMER},
                             {"role": "assistant", "content": "ACK"},
                             {"role": "user", "content": text}
-                        ]
+                        ],
+                    request_timeout=httpUtils.LLM_TIMEOUT
                     )
                 answer = response['choices'][0]['message']['content']
                 answer_js = json.loads(answer)
@@ -251,7 +257,8 @@ class SummarizManager:
                     messages=[
                             {"role": "system", "content": """Du bist ein helfender Assistent."""},
                             {"role": "user", "content": sys_template+text}
-                        ]
+                        ],
+                    request_timeout=httpUtils.LLM_TIMEOUT
                     )
                 tags = response['choices'][0]['message']['content'].split(',')
                 return tags
@@ -272,7 +279,8 @@ class SummarizManager:
                             {"role": "user", "content": primer},
                             {"role": "assistant", "content": "ACK"},
                             {"role": "user", "content": skripts}
-                        ]
+                        ],
+                    request_timeout=httpUtils.LLM_TIMEOUT
                     )
                 return response['choices'][0]['message']['content']
             except Exception as e:
@@ -291,7 +299,8 @@ class SummarizManager:
                     messages=[
                             {"role": "system", "content": """Du bist ein helfender Assistent."""},
                             {"role": "user", "content": sys_template+text}
-                        ]
+                        ],
+                    request_timeout=httpUtils.LLM_TIMEOUT
                     )
                 return response['choices'][0]['message']['content']
             except Exception as e:
@@ -376,27 +385,30 @@ def medium_cleanup(text: str)->str:
     text = [line for line in text.split('\n') if (line != '') or ('# ' in line)]
     return '\n'.join(text)
 
-def get_images(text: str) -> list:
-    split_text = str(text).split('\n')
-    images = []
-    for line in split_text:
-        if '![' in line:
-            images.append(line)
-    
-    imag_map = []
-    for image in images:
+def image_links(text: str) -> list:
+    """
+    Returns (alt text, url) of every markdown image in text.
+    """
+    links = []
+    for line in str(text).split('\n'):
+        if '![' not in line:
+            continue
         # get text from [...]
-        image_text = image[image.find('[')+1:image.find(']')]
+        image_text = line[line.find('[')+1:line.find(']')]
         # get image url from (...)
-        image_url = image[image.find('(')+1:image.find(')')]
+        image_url = line[line.find('(')+1:line.find(')')]
+        links.append((image_text, image_url))
+    return links
 
-        # try to download image to check if it is valid
-        try:
-            urllib.request.urlretrieve(image_url, 'temp.jpg')
-            os.remove('temp.jpg')
-        except:
+def get_images(text: str) -> list:
+    links = image_links(text)
+    # checked concurrently with HEAD requests, results are cached between runs
+    checks = imageUtils.validate_images([image_url for _, image_url in links])
+
+    imag_map = []
+    for image_text, image_url in links:
+        if image_url not in checks or not checks[image_url]['valid']:
             continue
-        
         imag_map.append({'txt':image_text, 'url':image_url})
 
     return imag_map
@@ -1,7 +1,7 @@
 import json
 from logUtils import warn, green, reset, red, yellow, info, blue
 from textUtils import *
-import requests
+import imageUtils
 from time import sleep
 from transformers import GPT2TokenizerFast
 tokenizer = GPT2TokenizerFast.from_pretrained('gpt2')
@@ -11,6 +11,7 @@ from moviepy.editor import AudioFileClip, ImageClip, concatenate_videoclips, Vid
 import os
 import imgkit
 import random
+import shutil
 
 from textUtils import GPT_PRIMER
 
@@ -134,22 +135,22 @@ def create_video(image_list, title, base_path, audio_file='audio.mp3', output_fi
     if len(image_list) == 0:
         image_list = ['https://upload.wikimedia.org/wikipedia/commons/1/14/No_Image_Available.jpg']
     
-    # download images
+    # load the 1080p versions from the image cache
     clips = []
+    image_cache = imageUtils.get_image_cache()
     for i, image in enumerate(image_list):
         try:
-            response = requests.get(image)
-            temp_img_id = random.randint(0, 1000000000)
-            with open(f'temp/temp_image{temp_img_id}.png', 'wb') as temp_file:
-                temp_file.write(response.content)
-                img = Image.open(temp_file.name)
-                # resize it to 1080p
-                img = img.resize((1920, 1080), Image.ANTIALIAS)
-                img.save(temp_file.name)
-                if i == 0:
-                    render_html_template(title, image_path=temp_file.name)
-                clips.append(ImageClip(temp_file.name))
-            os.remove(f'temp/temp_image{temp_img_id}.png')
+            image_path = image_cache.get(image, '1080p')
+            if i == 0:
+                # the title is rendered into the image, work on a copy to keep the cache clean
+                temp_img_id = random.randint(0, 1000000000)
+                temp_path = f'temp/temp_image{temp_img_id}.png'
+                shutil.copy(image_path, temp_path)
+                render_html_template(title, image_path=temp_path)
+                clips.append(ImageClip(temp_path))
+                os.remove(temp_path)
+            else:
+                clips.append(ImageClip(image_path))
         except Exception as e:
             warn(e)
 
@@ -257,12 +258,13 @@ def create_thumbnail(images, tags, today_path):
         return base_image
 
     random_front = random.choice(images)
+    image_cache = imageUtils.get_image_cache()
 
-    # download image
+    # load image
     found = False
     for i in range(100):
         try:
-            response = requests.get(random_front)
+            image_path = image_cache.get(random_front, 'thumb')
             found = True
         except:
             random_front = random.choice(images)
@@ -272,20 +274,11 @@ def create_thumbnail(images, tags, today_path):
     
     if not found:
         random_front = 'https://upload.wikimedia.org/wikipedia/commons/1/14/No_Image_Available.jpg'
-        response = requests.get(random_front)
-
-    temp_image_id = random.randint(0, 100000)
-    with open(f'temp/temp_image{temp_image_id}.png', 'wb') as temp_file:
-        temp_file.write(response.content)
-        img = Image.open(temp_file.name)
-
-    # remove temp file
-    try:
-        os.remove(f'temp/temp_image{temp_image_id}.png')
-    except:
-        warn('Could not remove temp file!!')
-    
-    img = img.resize(base_image.size)
+        image_path = image_cache.get(random_front, 'thumb')
+
+    img = Image.open(image_path)
+    if img.size != base_image.size:
+        img = img.resize(base_image.size)
     img = img.convert('RGBA')
 
     # create thumbnail
@@ -306,12 +299,14 @@ def create_final_thumbnail(images, today_date, today_path, title):
         raise Exception('No images found!!')
     # get random image
     random_front = random.choice(images)
+    image_cache = imageUtils.get_image_cache()
     found = False
-    # download image
+    # load image
     for _ in range(len(images)):
         try:
-            response = requests.get(random_front)
+            image_path = image_cache.get(random_front, 'thumb')
             found = True
+            break
         except:
             random_front = random.choice(images)
 
@@ -323,19 +318,9 @@ def create_final_thumbnail(images, today_date, today_path, title):
 
     info('Found image!! ' + random_front)
 
-    temp_image_id = random.randint(0, 100000)
-    with open(f'temp/temp_image{temp_image_id}.jpg', 'wb') as temp_file:
-        temp_file.write(response.content)
-        img = Image.open(temp_file.name)
-
-    # remove temp file
-    try:
-        os.remove(f'temp/temp_image{temp_image_id}.jpg')
-    except Exception as e:
-        warn('Could not remove temp file!!')
-        warn(e)
-    
-    img = img.resize(base_image.size)
+    img = Image.open(image_path)
+    if img.size != base_image.size:
+        img = img.resize(base_image.size)
     img = img.convert('RGBA')
 
     # create thumbnail
@@ -403,6 +388,9 @@ def process_match(db, match:dict, summarizer: SummarizManager, tts:TTSManager):
     tts.syntisize(skript_js["skript"], f'{MEDIA_PATH}{match["uid"]}/audio.mp3')
     sleep(10)
 
+    # download all images of the match at once, thumbnail and video read them from the cache
+    imageUtils.get_image_cache().prefetch(match['images'], ['thumb', '1080p'])
+
     info(f"Creating thumbnail for {match['uid']}")
     create_thumbnail(match['images'], tags, f'{MEDIA_PATH}{match["uid"]}/')
 